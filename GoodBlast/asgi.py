@@ -13,4 +13,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'GoodBlast.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from leaderboard.live import websocket_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket' and scope['path'] == '/api/leaderboard/live':
+        await websocket_application(scope, receive, send)
+    elif scope['type'] == 'websocket':
+        await send({'type': 'websocket.close'})
+    else:
+        await django_application(scope, receive, send)
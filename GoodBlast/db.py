@@ -0,0 +1,44 @@
+from django.db import connections, transaction
+from django.db.models.sql import UpdateQuery
+
+
+def update_returning(queryset, returning, **values):
+    """
+    Runs queryset.update(**values) and returns the `returning` fields of every
+    updated row, in one UPDATE ... RETURNING statement on PostgreSQL.
+    """
+    connection = connections[queryset.db]
+    model = queryset.model
+
+    if connection.vendor != 'postgresql':
+        with transaction.atomic(using=queryset.db):
+            pks = list(queryset.select_for_update().values_list('pk', flat=True))
+            model._base_manager.using(queryset.db).filter(pk__in=pks).update(**values)
+            return list(model._base_manager.using(queryset.db).filter(pk__in=pks).values_list(*returning))
+
+    query = queryset.query.chain(UpdateQuery)
+    query.add_update_values(values)
+    sql, params = query.get_compiler(queryset.db).as_sql()
+
+    columns = ", ".join(connection.ops.quote_name(model._meta.get_field(field).column) for field in returning)
+    with connection.cursor() as cursor:
+        cursor.execute(f"{sql} RETURNING {columns}", params)
+        return cursor.fetchall()
+
+
+def filter_row(queryset, fields, operator, values):
+    """
+    Filters queryset on the row comparison (fields) operator (values), e.g.
+    (score, user_id) < (10, 4). Unlike the equivalent OR of column conditions,
+    PostgreSQL answers it with a single range of an index on those columns.
+    """
+    connection = connections[queryset.db]
+    model = queryset.model
+
+    table = connection.ops.quote_name(model._meta.db_table)
+    columns = ", ".join(
+        f"{table}.{connection.ops.quote_name(model._meta.get_field(field).column)}" for field in fields
+    )
+    placeholders = ", ".join(["%s"] * len(values))
+
+    return queryset.extra(where=[f"({columns}) {operator} ({placeholders})"], params=list(values))
@@ -0,0 +1,66 @@
+import json
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder = JSONEncoder()
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data, default=_encoder.default, option=orjson.OPT_NON_STR_KEYS)
+
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+class FastJSONRenderer(renderers.BaseRenderer):
+    """
+    Compact JSON renderer on orjson when it is installed, the standard
+    library otherwise. Values orjson does not know are encoded like DRF does.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        return dumps(data)
+
+
+class FastRenderingMixin:
+    """
+    Puts FastJSONRenderer in front of the configured renderers when
+    FAST_JSON_RENDERER is set.
+    """
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if settings.FAST_JSON_RENDERER:
+            renderers.insert(0, FastJSONRenderer())
+
+        return renderers
+
+
+def stream_json_list(rows, headers=None):
+    """
+    Streams a list of JSON values in chunks of JSON_STREAM_CHUNK_SIZE rows.
+    """
+    chunk_size = settings.JSON_STREAM_CHUNK_SIZE
+
+    def chunks():
+        yield b'['
+        for start in range(0, len(rows), chunk_size):
+            chunk = dumps(rows[start:start + chunk_size])[1:-1]
+            yield chunk if start == 0 else b',' + chunk
+        yield b']'
+
+    return StreamingHttpResponse(chunks(), content_type='application/json', headers=headers)
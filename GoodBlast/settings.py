@@ -60,6 +60,7 @@ INSTALLED_APPS = [
 
     'user',
     'tournament',
+    'leaderboard',
 
     'rest_framework',
     'rest_framework_simplejwt',
@@ -67,14 +68,105 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'user.authentication.ClaimsJWTAuthentication',
     )
 }
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=30),
+    "TOKEN_OBTAIN_SERIALIZER": "user.serializers.ClaimsTokenObtainPairSerializer",
 }
 
+# The first hasher hashes new passwords, the others verify older hashes, which are rehashed with the first one on
+# the next login. Costs of the user.hashers hashers are read from the PASSWORD_* settings below; hashing runs in a
+# pool of PASSWORD_HASHING_WORKERS threads per process, one per core when it is 0. user.hashers.Argon2PasswordHasher
+# needs argon2-cffi, which is not a requirement, so it is only enabled by listing it here.
+PASSWORD_HASHERS = env.list("PASSWORD_HASHERS", default=[
+    "user.hashers.ScryptPasswordHasher",
+    "user.hashers.PBKDF2PasswordHasher",
+])
+PASSWORD_PBKDF2_ITERATIONS = env.int("PASSWORD_PBKDF2_ITERATIONS", default=600000)
+PASSWORD_SCRYPT_WORK_FACTOR = env.int("PASSWORD_SCRYPT_WORK_FACTOR", default=2 ** 14)
+PASSWORD_SCRYPT_BLOCK_SIZE = env.int("PASSWORD_SCRYPT_BLOCK_SIZE", default=8)
+PASSWORD_SCRYPT_PARALLELISM = env.int("PASSWORD_SCRYPT_PARALLELISM", default=1)
+PASSWORD_ARGON2_TIME_COST = env.int("PASSWORD_ARGON2_TIME_COST", default=2)
+PASSWORD_ARGON2_MEMORY_COST = env.int("PASSWORD_ARGON2_MEMORY_COST", default=102400)
+PASSWORD_ARGON2_PARALLELISM = env.int("PASSWORD_ARGON2_PARALLELISM", default=8)
+PASSWORD_HASHING_WORKERS = env.int("PASSWORD_HASHING_WORKERS", default=0)
+
+# Interval at which users deleted by other processes are read from the deletion log, see user.revocation.
+REVOCATION_REFRESH_INTERVAL_MS = env.int("REVOCATION_REFRESH_INTERVAL_MS", default=2000)
+
+# Runs the tournament scheduler in web processes, one of which is elected leader with a PostgreSQL advisory lock,
+# see tournament.scheduler. Set to False when it runs as its own process with `python manage.py run_scheduler`.
+SCHEDULER_IN_PROCESS = env.bool("SCHEDULER_IN_PROCESS", default=True)
+SCHEDULER_LEADER_CHECK_SECONDS = env.int("SCHEDULER_LEADER_CHECK_SECONDS", default=30)
+
+# Empty tournament groups created per level bucket ahead of the entry window, sized from the most entries the bucket
+# had in the last TOURNAMENT_GROUP_PROVISION_DAYS, and topped up to TOURNAMENT_GROUP_SPARES every
+# TOURNAMENT_GROUP_TOP_UP_SECONDS while entry is open, see TournamentGroup.provision.
+TOURNAMENT_GROUP_PROVISION_DAYS = env.int("TOURNAMENT_GROUP_PROVISION_DAYS", default=7)
+TOURNAMENT_GROUP_PROVISION_RATIO = env.float("TOURNAMENT_GROUP_PROVISION_RATIO", default=1.0)
+TOURNAMENT_GROUP_SPARES = env.int("TOURNAMENT_GROUP_SPARES", default=5)
+TOURNAMENT_GROUP_TOP_UP_SECONDS = env.int("TOURNAMENT_GROUP_TOP_UP_SECONDS", default=60)
+
+# Shared secret for internal endpoints such as bulk tournament entry, sent as X-Internal-Api-Key.
+INTERNAL_API_KEY = env("INTERNAL_API_KEY", default=None)
+
+# Dotted path of a leaderboard.backends class, e.g. leaderboard.backends.RedisBackend.
+# Leaderboards are read straight from the database when it is not set.
+LEADERBOARD_BACKEND = env("LEADERBOARD_BACKEND", default=None)
+LEADERBOARD_REDIS_URL = env("LEADERBOARD_REDIS_URL", default=None)
+
+# Tournament group rank histograms kept per process, see leaderboard.ranking. A histogram lags the writes of other
+# workers by at most RANK_CACHE_TTL seconds.
+RANK_CACHE_SIZE = env.int("RANK_CACHE_SIZE", default=10000)
+RANK_CACHE_TTL = env.int("RANK_CACHE_TTL", default=5)
+
+# Buffers tournament score increments per process and writes them in batches, see tournament.buffer.
+SCORE_WRITE_BEHIND = env.bool("SCORE_WRITE_BEHIND", default=False)
+SCORE_BUFFER_FLUSH_INTERVAL_MS = env.int("SCORE_BUFFER_FLUSH_INTERVAL_MS", default=500)
+SCORE_BUFFER_MAX_ENTRIES = env.int("SCORE_BUFFER_MAX_ENTRIES", default=5000)
+
+# Queues tournament entries and assigns groups in batches in the background, see tournament.queue.
+TOURNAMENT_ENTRY_QUEUE = env.bool("TOURNAMENT_ENTRY_QUEUE", default=False)
+ENTRY_QUEUE_IN_PROCESS_WORKER = env.bool("ENTRY_QUEUE_IN_PROCESS_WORKER", default=True)
+ENTRY_QUEUE_BATCH_SIZE = env.int("ENTRY_QUEUE_BATCH_SIZE", default=1000)
+ENTRY_QUEUE_POLL_INTERVAL_MS = env.int("ENTRY_QUEUE_POLL_INTERVAL_MS", default=200)
+
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
+# Cache alias that shares the current tournament between workers, see tournament.current.
+CURRENT_TOURNAMENT_SHARED_CACHE = env("CURRENT_TOURNAMENT_SHARED_CACHE", default=None)
+CURRENT_TOURNAMENT_MISS_TTL = env.int("CURRENT_TOURNAMENT_MISS_TTL", default=5)
+
+# Tournament entries of users, cached per process and in an optional shared cache alias, see tournament.membership.
+MEMBERSHIP_CACHE_SIZE = env.int("MEMBERSHIP_CACHE_SIZE", default=100000)
+MEMBERSHIP_CACHE_TTL = env.int("MEMBERSHIP_CACHE_TTL", default=300)
+MEMBERSHIP_SHARED_CACHE = env("MEMBERSHIP_SHARED_CACHE", default=None)
+
+# Cache alias of the versioned group leaderboard snapshots, see leaderboard.snapshots. Versions are only kept in the
+# cache when it is shared between workers, with the default local memory cache they are read from the database.
+LEADERBOARD_SNAPSHOT_CACHE = env("LEADERBOARD_SNAPSHOT_CACHE", default="default")
+LEADERBOARD_SNAPSHOT_TTL = env.int("LEADERBOARD_SNAPSHOT_TTL", default=600)
+
+# Per tournament and country standings, merged per process and written every COUNTRY_STANDING_FLUSH_INTERVAL_MS or on
+# every change when it is 0, see leaderboard.standings.
+COUNTRY_STANDING_SIZE = env.int("COUNTRY_STANDING_SIZE", default=1000)
+COUNTRY_STANDING_FLUSH_INTERVAL_MS = env.int("COUNTRY_STANDING_FLUSH_INTERVAL_MS", default=1000)
+
+# Live group leaderboards, see leaderboard.live: changes are pushed after LIVE_COALESCE_MS, changes made by other
+# processes are picked up from the shared snapshot versions every LIVE_POLL_INTERVAL_MS and a connection is closed
+# after LIVE_STREAM_SECONDS.
+LIVE_COALESCE_MS = env.int("LIVE_COALESCE_MS", default=250)
+LIVE_POLL_INTERVAL_MS = env.int("LIVE_POLL_INTERVAL_MS", default=5000)
+LIVE_STREAM_SECONDS = env.int("LIVE_STREAM_SECONDS", default=600)
+
+# Renders leaderboard, tournament and progress responses with GoodBlast.renderers.FastJSONRenderer (orjson when
+# installed). With JSON_STREAM_CHUNK_SIZE set, global and country leaderboards are streamed in chunks of that many rows.
+FAST_JSON_RENDERER = env.bool("FAST_JSON_RENDERER", default=False)
+JSON_STREAM_CHUNK_SIZE = env.int("JSON_STREAM_CHUNK_SIZE", default=0)
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
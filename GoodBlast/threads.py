@@ -0,0 +1,69 @@
+import atexit
+import os
+import threading
+
+
+class BackgroundThread:
+    """
+    Daemon thread running target in the background of a process.
+
+    start is cheap to call on every use: threads do not survive a fork, so
+    the thread is started once per process id. target sleeps between rounds
+    of work with wait, which returns early when the thread is woken and
+    returns True once it should stop. A normal interpreter exit stops the
+    thread and waits for it, so a round of work in progress is finished.
+    """
+
+    def __init__(self, target, name):
+        self._target = target
+        self._name = name
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        atexit.register(self.stop)
+
+    def start(self):
+        if self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+
+            self._pid = os.getpid()
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._target, name=self._name, daemon=True)
+            self._thread.start()
+
+    def is_alive(self):
+        thread = self._thread
+        return self._pid == os.getpid() and thread is not None and thread.is_alive()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def wait(self, timeout):
+        self._wakeup.wait(timeout)
+        self._wakeup.clear()
+        return self._stopped.is_set()
+
+    def stopped(self):
+        return self._stopped.is_set()
+
+    def stop(self):
+        """
+        Stops the thread, or a target running in the calling thread, and
+        waits for the thread of this process to finish.
+        """
+        with self._lock:
+            thread = self._thread if self._pid == os.getpid() else None
+            self._stopped.set()
+            self._wakeup.set()
+
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+        with self._lock:
+            self._thread = self._pid = None
@@ -0,0 +1,61 @@
+"""
+Time to admit users into a tournament one by one through enter_tournament
+versus in batches through bulk_enter_tournament.
+
+    python -m benchmarks.bulk_entry --users 100000 --sequential 2000
+"""
+import argparse
+import time
+
+from benchmarks import setup, test_database
+
+setup()
+
+from django.utils import timezone  # noqa: E402
+
+from tournament.models import Tournament, UserTournamentGroup  # noqa: E402
+from user.models import User  # noqa: E402
+
+
+def create_users(prefix, count):
+    User.objects.bulk_create([
+        User(
+            username=f'{prefix}{i}',
+            current_level=Tournament.USER_LEVEL_REQUIREMENT + i % 500,
+            coins=Tournament.ENTRY_FEE
+        )
+        for i in range(count)
+    ], batch_size=UserTournamentGroup.BULK_BATCH_SIZE)
+
+    return list(User.objects.filter(username__startswith=prefix).order_by('pk'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--sequential', type=int, default=2000, help="Users admitted one by one, extrapolated.")
+    parser.add_argument('--batch-size', type=int, default=UserTournamentGroup.BULK_BATCH_SIZE)
+    args = parser.parse_args()
+
+    with test_database():
+        tournament = Tournament.objects.create(date=timezone.now().date())
+
+        users = create_users('sequential', args.sequential)
+        start = time.perf_counter()
+        for user in users:
+            UserTournamentGroup.enter_tournament(user, tournament)
+        sequential = (time.perf_counter() - start) / len(users)
+
+        user_ids = [user.id for user in create_users('bulk', args.users)]
+        start = time.perf_counter()
+        for offset in range(0, len(user_ids), args.batch_size):
+            UserTournamentGroup.bulk_enter_tournament(user_ids[offset:offset + args.batch_size], tournament)
+        bulk = (time.perf_counter() - start) / len(user_ids)
+
+        print(f"{'path':<12}{'users/s':>12}{f'{args.users} users (s)':>22}")
+        for name, seconds in (('sequential', sequential), ('bulk', bulk)):
+            print(f"{name:<12}{1 / seconds:>12.0f}{seconds * args.users:>22.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Entry latency percentiles under concurrent entrants, with groups assigned
+inside the request versus queued. The queue is drained afterwards, as a
+separate process_entry_queue worker would do, so only request latency is
+measured.
+
+    python -m benchmarks.entry_queue --threads 16 --users 4000
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from benchmarks import setup, test_database
+
+setup()
+
+from django.db import connection  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from tournament.models import Tournament, TournamentEntryTicket, UserTournamentGroup  # noqa: E402
+from tournament.queue import entry_queue  # noqa: E402
+from user.models import User  # noqa: E402
+
+
+def run(enter, users, thread_count):
+    latencies = []
+
+    def work(thread_users):
+        try:
+            for user in thread_users:
+                start = time.perf_counter()
+                enter(user)
+                latencies.append(time.perf_counter() - start)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=work, args=(users[i::thread_count],)) for i in range(thread_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    return percentiles[49] * 1000, percentiles[98] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--users', type=int, default=4000)
+    args = parser.parse_args()
+
+    with test_database():
+        User.objects.bulk_create([
+            User(username=f'user{i}', current_level=Tournament.USER_LEVEL_REQUIREMENT, coins=Tournament.ENTRY_FEE)
+            for i in range(2 * args.users)
+        ])
+        users = list(User.objects.order_by('pk'))
+
+        direct = Tournament.objects.create(date=timezone.now().date())
+        queued = Tournament.objects.create(date=timezone.now().date())
+
+        print(f"{'path':<8}{'p50 ms':>10}{'p99 ms':>10}")
+        p50, p99 = run(
+            lambda user: UserTournamentGroup.enter_tournament(user, direct),
+            users[:args.users],
+            args.threads
+        )
+        print(f"{'direct':<8}{p50:>10.2f}{p99:>10.2f}")
+
+        with override_settings(ENTRY_QUEUE_IN_PROCESS_WORKER=False):
+            p50, p99 = run(
+                lambda user: TournamentEntryTicket.enqueue(user, queued),
+                users[args.users:],
+                args.threads
+            )
+        entry_queue.drain()
+        print(f"{'queued':<8}{p50:>10.2f}{p99:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Password verifications (logins) per second, and per core, of each
+configured hasher at its PASSWORD_* cost, with logins coming from
+--concurrency threads through the PASSWORD_HASHING_WORKERS pool.
+
+    python -m benchmarks.hashing --logins 200 --concurrency 8
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import setup
+
+setup()
+
+from django.conf import settings  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+
+from user import hashers  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    cores = min(settings.PASSWORD_HASHING_WORKERS or os.cpu_count(), os.cpu_count(), args.concurrency)
+
+    print(f"{'hasher':<30}{'ms/login':>10}{'logins/s':>10}{'per core':>10}")
+    for hasher_path in settings.PASSWORD_HASHERS:
+        name = hasher_path.rsplit('.', 1)[1]
+        with override_settings(PASSWORD_HASHERS=[hasher_path]):
+            try:
+                encoded = hashers.make_password('benchmark-password')
+            except ValueError as error:
+                # e.g. argon2-cffi is not installed.
+                print(f"{name:<30}skipped: {error}")
+                continue
+
+            hashers.check_password('benchmark-password', encoded)
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as clients:
+                list(clients.map(lambda _: hashers.check_password('benchmark-password', encoded), range(args.logins)))
+            elapsed = time.perf_counter() - start
+
+            logins = args.logins / elapsed
+            print(f"{name:<30}{elapsed / args.logins * cores * 1000:>10.1f}{logins:>10.1f}{logins / cores:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Queries and latency per POST /api/users/<username>/progress, before and
+after the progress path was fused into a single statement.
+
+    python -m benchmarks.progress --requests 1000
+"""
+import argparse
+import time
+
+from benchmarks import setup, test_database
+
+setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from tournament.models import Tournament, TournamentGroup, UserTournamentGroup  # noqa: E402
+from user.models import User  # noqa: E402
+
+
+def progress_before(user):
+    # The view body before the fused path, kept here as the baseline.
+    user.current_level += 1
+    user.coins += User.LEVEL_COMPLETE_COIN_REWARD
+    user.save()
+
+    tournament = Tournament.get_current_tournament()
+    user_group = UserTournamentGroup.objects.filter(user=user, group__tournament=tournament)
+
+    if user_group.exists():
+        user_group = user_group.first()
+        user_group.score += 1
+        user_group.save()
+
+
+def progress_after(user):
+    UserTournamentGroup.record_progress(user)
+
+
+def measure(progress, user, requests):
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        for _ in range(requests):
+            progress(user)
+        elapsed = time.perf_counter() - start
+
+    return len(queries) / requests, elapsed / requests * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=1000)
+    args = parser.parse_args()
+
+    with test_database():
+        tournament = Tournament.objects.create(date=timezone.now().date())
+        group = TournamentGroup.objects.create(tournament=tournament)
+        user = User.objects.create(username='benchmark', country='US')
+        UserTournamentGroup.objects.create(user=user, group=group)
+
+        print(f"{'path':<8}{'queries/request':>18}{'ms/request':>14}")
+        for name, progress in (('before', progress_before), ('after', progress_after)):
+            queries, milliseconds = measure(progress, user, args.requests)
+            print(f"{name:<8}{queries:>18.1f}{milliseconds:>14.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Time to read and render a RESULT_LIMIT row leaderboard through
+LeaderboardSerializer and DRF's JSONRenderer versus serialize_leaderboard
+and FastJSONRenderer.
+
+    python -m benchmarks.rendering --repeat 50
+"""
+import argparse
+import time
+
+from benchmarks import setup, test_database
+
+setup()
+
+from django.utils import timezone  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from GoodBlast import renderers  # noqa: E402
+from leaderboard.serializers import RESULT_LIMIT, LeaderboardSerializer, serialize_leaderboard  # noqa: E402
+from tournament.models import Tournament, TournamentGroup, UserTournamentGroup  # noqa: E402
+from user.models import User  # noqa: E402
+
+
+def serializer_path(queryset):
+    return JSONRenderer().render(LeaderboardSerializer(queryset, many=True).data)
+
+
+def serializer_select_related_path(queryset):
+    return JSONRenderer().render(LeaderboardSerializer(queryset.select_related('user'), many=True).data)
+
+
+def fast_path(queryset):
+    return renderers.FastJSONRenderer().render(serialize_leaderboard(queryset))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    with test_database():
+        tournament = Tournament.objects.create(date=timezone.now().date())
+        group = TournamentGroup.objects.create(tournament=tournament)
+        User.objects.bulk_create([User(username=f'user{i}', country='US') for i in range(RESULT_LIMIT)])
+        UserTournamentGroup.objects.bulk_create([
+            UserTournamentGroup(user=user, group=group, tournament=tournament, country=user.country, score=user.id)
+            for user in User.objects.all()
+        ])
+        queryset = UserTournamentGroup.objects.filter(tournament=tournament).order_by('-score')[:RESULT_LIMIT]
+
+        orjson = renderers.orjson
+        paths = [
+            ('serializer', serializer_path),
+            ('serializer + select_related', serializer_select_related_path),
+            ('fast (stdlib json)', fast_path),
+            ('fast (orjson)', fast_path),
+        ]
+
+        print(f"{'path':<30}{'ms/response':>14}")
+        for name, path in paths:
+            renderers.orjson = orjson if 'orjson' in name else None
+            if 'orjson' in name and orjson is None:
+                continue
+
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                path(queryset)
+            print(f"{name:<30}{(time.perf_counter() - start) / args.repeat * 1000:>14.2f}")
+
+        renderers.orjson = orjson
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+def post_worker_init(worker):
+    # Every worker takes part in the tournament scheduler leader election, see tournament.scheduler.
+    from tournament.scheduler import tournament_scheduler
+
+    tournament_scheduler.start()
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class LeaderboardConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "leaderboard"
+
+    def ready(self):
+        # Connects the tournament signal receivers.
+        from . import engine, live, ranking, snapshots, standings
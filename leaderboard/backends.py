@@ -0,0 +1,349 @@
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from leaderboard.skiplist import SortedSet
+
+
+class BaseBackend:
+    """
+    Sorted set storage for leaderboards. Every member is kept in the global set
+    of a key and in one partition set (e.g. its country). Writes to a key that
+    has not been loaded are dropped, since loading rebuilds it from the database.
+
+    A load is claimed with begin_load, and writes arriving until load finishes
+    are queued and replayed on top of the rows read from the database. Each
+    write carries the member's new total score, so a replayed write the rows
+    already include only raises a score that is lower. Members of equal
+    score are ordered by member descending, as integers.
+    """
+
+    def is_loaded(self, key):
+        raise NotImplementedError
+
+    def begin_load(self, key):
+        raise NotImplementedError
+
+    def load(self, key, partitions, members):
+        raise NotImplementedError
+
+    def abort_load(self, key):
+        raise NotImplementedError
+
+    def add(self, key, partition, member, score):
+        raise NotImplementedError
+
+    def incr(self, key, member, amount, score):
+        raise NotImplementedError
+
+    def range(self, key, partition, start, stop):
+        raise NotImplementedError
+
+    def range_after(self, key, partition, member, score, count):
+        raise NotImplementedError
+
+    def rank(self, key, partition, member):
+        raise NotImplementedError
+
+    def score(self, key, partition, member):
+        raise NotImplementedError
+
+    def count(self, key, partition):
+        raise NotImplementedError
+
+
+class InMemoryBackend(BaseBackend):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sets = {}
+        self._members = {}
+        self._loading = {}
+
+    def is_loaded(self, key):
+        return key in self._members and key not in self._loading
+
+    def begin_load(self, key):
+        with self._lock:
+            if key in self._members or key in self._loading:
+                return False
+
+            self._loading[key] = []
+            return True
+
+    def load(self, key, partitions, members):
+        with self._lock:
+            loaded_partitions = self._sets.setdefault(key, {})
+            for partition, scores in partitions.items():
+                sorted_set = loaded_partitions.setdefault(partition, SortedSet())
+                for member, score in scores.items():
+                    self._raise_score(sorted_set, member, score)
+
+            self._members.setdefault(key, {}).update(members)
+
+            for partition, member, score in self._loading.pop(key, ()):
+                if partition is None:
+                    self._set_score(key, member, score)
+                else:
+                    self._add(key, partition, member, score)
+
+    def abort_load(self, key):
+        with self._lock:
+            self._loading.pop(key, None)
+
+    def add(self, key, partition, member, score):
+        with self._lock:
+            if key in self._loading:
+                self._loading[key].append((partition, member, score))
+            elif key in self._members:
+                self._add(key, partition, member, score)
+
+    def incr(self, key, member, amount, score):
+        with self._lock:
+            if key in self._loading:
+                self._loading[key].append((None, member, score))
+                return
+
+            partition = self._members.get(key, {}).get(member)
+            if partition is None:
+                return
+
+            for name in (None, partition):
+                self._sets[key][name].incr(member, amount)
+
+    def _add(self, key, partition, member, score):
+        self._members[key][member] = partition
+        for name in (None, partition):
+            sorted_set = self._sets[key].setdefault(name, SortedSet())
+            if member not in sorted_set:
+                sorted_set.add(member, score)
+
+    def _set_score(self, key, member, score):
+        partition = self._members[key].get(member)
+        if partition is None:
+            return
+
+        for name in (None, partition):
+            self._raise_score(self._sets[key][name], member, score)
+
+    @staticmethod
+    def _raise_score(sorted_set, member, score):
+        current_score = sorted_set.score(member)
+        if current_score is None or current_score < score:
+            sorted_set.add(member, score)
+
+    def range(self, key, partition, start, stop):
+        sorted_set = self._sets.get(key, {}).get(partition)
+        if sorted_set is None:
+            return []
+
+        with self._lock:
+            return sorted_set.range(start, stop)
+
+    def range_after(self, key, partition, member, score, count):
+        sorted_set = self._sets.get(key, {}).get(partition)
+        if sorted_set is None:
+            return []
+
+        with self._lock:
+            return sorted_set.range_after(member, score, count)
+
+    def rank(self, key, partition, member):
+        sorted_set = self._sets.get(key, {}).get(partition)
+        if sorted_set is None:
+            return None
+
+        with self._lock:
+            return sorted_set.rank(member)
+
+    def score(self, key, partition, member):
+        sorted_set = self._sets.get(key, {}).get(partition)
+        if sorted_set is None:
+            return None
+
+        return sorted_set.score(member)
+
+    def count(self, key, partition):
+        return len(self._sets.get(key, {}).get(partition, ()))
+
+
+class RedisBackend(BaseBackend):
+    KEY_TTL = 2 * 24 * 60 * 60
+    LOAD_TIMEOUT = 60
+    # Bumped when the stored members change format, so sets in an older format are left to expire.
+    KEY_VERSION = 2
+
+    # Adds a member to the global and its partition set without touching an existing score.
+    ADD_SCRIPT = """
+    if redis.call('EXISTS', KEYS[4]) == 1 then
+        redis.call('RPUSH', KEYS[5], cjson.encode({ARGV[1], ARGV[2], ARGV[3]}))
+        redis.call('EXPIRE', KEYS[5], ARGV[4])
+        return 0
+    end
+    if redis.call('EXISTS', KEYS[1]) == 0 then return 0 end
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+    redis.call('ZADD', KEYS[2], 'NX', ARGV[3], ARGV[1])
+    redis.call('ZADD', KEYS[3], 'NX', ARGV[3], ARGV[1])
+    return 1
+    """
+
+    # Increments a known member in the global and its partition set.
+    INCR_SCRIPT = """
+    if redis.call('EXISTS', KEYS[4]) == 1 then
+        redis.call('RPUSH', KEYS[5], cjson.encode({ARGV[1], false, ARGV[3]}))
+        redis.call('EXPIRE', KEYS[5], ARGV[4])
+        return nil
+    end
+    local partition = redis.call('HGET', KEYS[1], ARGV[1])
+    if not partition then return nil end
+    redis.call('ZINCRBY', KEYS[2], ARGV[2], ARGV[1])
+    return redis.call('ZINCRBY', KEYS[3] .. partition, ARGV[2], ARGV[1])
+    """
+
+    # Replays the writes queued during a load and ends it, adds as in ADD_SCRIPT and increments as their total score.
+    REPLAY_SCRIPT = """
+    for _, encoded in ipairs(redis.call('LRANGE', KEYS[5], 0, -1)) do
+        local write = cjson.decode(encoded)
+        local member, partition, score = write[1], write[2], write[3]
+        if partition then
+            redis.call('HSET', KEYS[1], member, partition)
+            redis.call('ZADD', KEYS[2], 'NX', score, member)
+            redis.call('ZADD', KEYS[3] .. partition, 'NX', score, member)
+        else
+            partition = redis.call('HGET', KEYS[1], member)
+            if partition then
+                redis.call('ZADD', KEYS[2], 'GT', score, member)
+                redis.call('ZADD', KEYS[3] .. partition, 'GT', score, member)
+            end
+        end
+    end
+    redis.call('DEL', KEYS[4], KEYS[5])
+    return 1
+    """
+
+    # Pages after a member that still has the cursor score by its rank. A member
+    # that scored since can not be placed among its old ties, so the page then
+    # starts below the cursor score.
+    RANGE_AFTER_SCRIPT = """
+    local rank = redis.call('ZREVRANK', KEYS[1], ARGV[1])
+    if rank and tonumber(redis.call('ZSCORE', KEYS[1], ARGV[1])) == tonumber(ARGV[2]) then
+        return redis.call('ZREVRANGE', KEYS[1], rank + 1, rank + tonumber(ARGV[3]), 'WITHSCORES')
+    end
+    return redis.call('ZREVRANGEBYSCORE', KEYS[1], '(' .. ARGV[2], '-inf', 'WITHSCORES', 'LIMIT', 0, ARGV[3])
+    """
+
+    def __init__(self, url=None):
+        try:
+            import redis
+        except ImportError as exc:
+            raise ImproperlyConfigured("RedisBackend requires the 'redis' package.") from exc
+
+        url = url or settings.LEADERBOARD_REDIS_URL
+        if not url:
+            raise ImproperlyConfigured("LEADERBOARD_REDIS_URL must be set to use RedisBackend.")
+
+        self._client = redis.Redis.from_url(url)
+        self._add = self._client.register_script(self.ADD_SCRIPT)
+        self._incr = self._client.register_script(self.INCR_SCRIPT)
+        self._range_after = self._client.register_script(self.RANGE_AFTER_SCRIPT)
+        self._replay = self._client.register_script(self.REPLAY_SCRIPT)
+
+    @staticmethod
+    def _member(member):
+        # Zero padded, so members of equal score are ordered by user id as in InMemoryBackend, not as strings.
+        return f"{int(member):019d}"
+
+    @classmethod
+    def _members_key(cls, key):
+        return f"{key}:v{cls.KEY_VERSION}:members"
+
+    @classmethod
+    def _partition_prefix(cls, key):
+        return f"{key}:v{cls.KEY_VERSION}:partition:"
+
+    @classmethod
+    def _set_key(cls, key, partition):
+        if partition is None:
+            return f"{key}:v{cls.KEY_VERSION}:all"
+        return f"{cls._partition_prefix(key)}{partition}"
+
+    @classmethod
+    def _loading_key(cls, key):
+        return f"{key}:v{cls.KEY_VERSION}:loading"
+
+    @classmethod
+    def _queue_key(cls, key):
+        return f"{key}:v{cls.KEY_VERSION}:queue"
+
+    def _write_keys(self, key, partition_key):
+        return [
+            self._members_key(key),
+            self._set_key(key, None),
+            partition_key,
+            self._loading_key(key),
+            self._queue_key(key),
+        ]
+
+    def is_loaded(self, key):
+        members_loaded, loading = self._client.pipeline()\
+            .exists(self._members_key(key))\
+            .exists(self._loading_key(key))\
+            .execute()
+        return bool(members_loaded) and not loading
+
+    def begin_load(self, key):
+        # Expires, so a process that died while loading does not keep the key from being loaded.
+        return bool(self._client.set(self._loading_key(key), 1, nx=True, ex=self.LOAD_TIMEOUT))
+
+    def load(self, key, partitions, members):
+        pipeline = self._client.pipeline()
+
+        for partition, scores in partitions.items():
+            set_key = self._set_key(key, partition)
+            if scores:
+                pipeline.zadd(set_key, {self._member(member): score for member, score in scores.items()}, gt=True)
+            pipeline.expire(set_key, self.KEY_TTL)
+
+        members_key = self._members_key(key)
+        # An empty placeholder keeps the members hash alive for tournaments without players.
+        pipeline.hset(members_key, mapping={
+            "": "",
+            **{self._member(member): partition for member, partition in members.items()}
+        })
+        pipeline.expire(members_key, self.KEY_TTL)
+        pipeline.execute()
+
+        self._replay(keys=self._write_keys(key, self._partition_prefix(key)))
+
+    def abort_load(self, key):
+        self._client.delete(self._loading_key(key), self._queue_key(key))
+
+    def add(self, key, partition, member, score):
+        self._add(
+            keys=self._write_keys(key, self._set_key(key, partition)),
+            args=[self._member(member), partition, score, self.LOAD_TIMEOUT]
+        )
+
+    def incr(self, key, member, amount, score):
+        self._incr(
+            keys=self._write_keys(key, self._partition_prefix(key)),
+            args=[self._member(member), amount, score, self.LOAD_TIMEOUT]
+        )
+
+    def range(self, key, partition, start, stop):
+        entries = self._client.zrevrange(self._set_key(key, partition), start, stop - 1, withscores=True)
+        return [(int(member), int(score)) for member, score in entries]
+
+    def range_after(self, key, partition, member, score, count):
+        entries = self._range_after(keys=[self._set_key(key, partition)], args=[self._member(member), score, count])
+        return [(int(member), int(score)) for member, score in zip(entries[::2], entries[1::2])]
+
+    def rank(self, key, partition, member):
+        return self._client.zrevrank(self._set_key(key, partition), self._member(member))
+
+    def score(self, key, partition, member):
+        score = self._client.zscore(self._set_key(key, partition), self._member(member))
+        return None if score is None else int(score)
+
+    def count(self, key, partition):
+        return self._client.zcard(self._set_key(key, partition))
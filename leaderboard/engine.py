@@ -0,0 +1,135 @@
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from tournament.buffer import score_buffer
+from tournament.signals import tournament_entered, score_updated
+
+_engine = None
+
+
+class LeaderboardEngine:
+    """
+    Keeps one global and one per-country sorted set for every tournament.
+
+    A tournament is loaded from the database the first time it is read and is
+    updated incrementally afterwards, so top-N and rank reads cost
+    O(log n + N) without scanning UserTournamentGroup.
+    """
+
+    LOAD_WAIT_SECONDS = 5
+    LOAD_POLL_SECONDS = 0.05
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @staticmethod
+    def _key(tournament_id):
+        return f"leaderboard:{tournament_id}"
+
+    def ensure_loaded(self, tournament_id):
+        """
+        Loads a tournament from the database unless it is loaded. Only the
+        caller that claims the load reads the database; writes arriving
+        meanwhile are queued by the backend and replayed once the rows are
+        loaded, and other readers wait for it up to LOAD_WAIT_SECONDS.
+        """
+        key = self._key(tournament_id)
+        if self.backend.is_loaded(key):
+            return key
+
+        if not self.backend.begin_load(key):
+            deadline = time.monotonic() + self.LOAD_WAIT_SECONDS
+            while not self.backend.is_loaded(key) and time.monotonic() < deadline:
+                time.sleep(self.LOAD_POLL_SECONDS)
+
+            return key
+
+        try:
+            self._load(key, tournament_id)
+        except Exception:
+            self.backend.abort_load(key)
+            raise
+
+        return key
+
+    def _load(self, key, tournament_id):
+        from tournament.models import UserTournamentGroup
+
+        partitions = {None: {}}
+        members = {}
+        rows = list(
+            UserTournamentGroup.objects
+            .filter(tournament_id=tournament_id)
+            .values_list('id', 'user_id', 'country', 'score')
+        )
+        pending = score_buffer.pending_for([user_tournament_group_id for user_tournament_group_id, *_ in rows])
+
+        for user_tournament_group_id, user_id, country, score in rows:
+            score += pending.get(user_tournament_group_id, 0)
+            partitions[None][user_id] = score
+            partitions.setdefault(country, {})[user_id] = score
+            members[user_id] = country
+
+        self.backend.load(key, partitions, members)
+
+    def add_entry(self, tournament_id, user_id, country, score=0):
+        self.backend.add(self._key(tournament_id), str(country), user_id, score)
+
+    def add_score(self, tournament_id, user_id, amount, score):
+        self.backend.incr(self._key(tournament_id), user_id, amount, score)
+
+    def top(self, tournament_id, limit, country=None, offset=0):
+        key = self.ensure_loaded(tournament_id)
+        return self.backend.range(key, country and str(country), offset, offset + limit)
+
+    def top_after(self, tournament_id, limit, score, user_id, country=None):
+        key = self.ensure_loaded(tournament_id)
+        return self.backend.range_after(key, country and str(country), user_id, score, limit)
+
+    def rank(self, tournament_id, user_id, country=None):
+        key = self.ensure_loaded(tournament_id)
+        return self.backend.rank(key, country and str(country), user_id)
+
+    def score(self, tournament_id, user_id):
+        key = self.ensure_loaded(tournament_id)
+        return self.backend.score(key, None, user_id)
+
+    def count(self, tournament_id, country=None):
+        key = self.ensure_loaded(tournament_id)
+        return self.backend.count(key, country and str(country))
+
+
+def get_engine():
+    global _engine
+
+    if _engine is None and settings.LEADERBOARD_BACKEND:
+        _engine = LeaderboardEngine(import_string(settings.LEADERBOARD_BACKEND)())
+
+    return _engine
+
+
+@receiver(tournament_entered)
+def record_entry(sender, tournament_id, user_id, country, score, **kwargs):
+    engine = get_engine()
+    if engine is not None:
+        transaction.on_commit(lambda: engine.add_entry(tournament_id, user_id, country, score))
+
+
+@receiver(score_updated)
+def record_score(sender, tournament_id, user_id, amount, score, **kwargs):
+    engine = get_engine()
+    if engine is not None:
+        transaction.on_commit(lambda: engine.add_score(tournament_id, user_id, amount, score))
+
+
+@receiver(setting_changed)
+def reset_engine(*, setting, **kwargs):
+    global _engine
+
+    if setting in ('LEADERBOARD_BACKEND', 'LEADERBOARD_REDIS_URL'):
+        _engine = None
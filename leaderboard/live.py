@@ -0,0 +1,326 @@
+import asyncio
+import logging
+import threading
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.dispatch import receiver
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from GoodBlast.renderers import dumps
+from leaderboard.snapshots import group_snapshots
+from tournament.membership import membership_cache
+from tournament.models import Tournament
+from tournament.signals import tournament_entered, score_updated
+from user.authentication import ClaimsJWTAuthentication
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    def __init__(self, group_id):
+        self.group_id = group_id
+        self.changed = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+
+    def notify(self):
+        try:
+            self._loop.call_soon_threadsafe(self.changed.set)
+        except RuntimeError:
+            # The loop of a connection that went away is closed already.
+            pass
+
+
+class LiveLeaderboards:
+    """
+    In-process fan-out of group leaderboard changes to live connections.
+
+    Each group with subscribers has one poller task, which reads the group
+    snapshot version every LIVE_POLL_INTERVAL_MS, or LIVE_COALESCE_MS after a
+    change committed in this process so a burst of score updates becomes one
+    push. When the version moved, the poller reads the board once, keeps it
+    here and wakes the subscribers, which only wait for their event: a group
+    costs the same queries however many connections follow it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+        self._boards = {}
+        self._pollers = {}
+
+    def subscribe(self, group_id):
+        subscription = Subscription(group_id)
+        with self._lock:
+            self._subscriptions.setdefault(group_id, set()).add(subscription)
+
+        self.ensure_polling(group_id)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        group_id = subscription.group_id
+        with self._lock:
+            subscriptions = self._subscriptions.get(group_id, set())
+            subscriptions.discard(subscription)
+            if subscriptions:
+                return
+
+            self._subscriptions.pop(group_id, None)
+            self._boards.pop(group_id, None)
+            poller = self._pollers.pop(group_id, None)
+
+        if poller is not None:
+            task, _ = poller
+            try:
+                task.get_loop().call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                pass
+
+    def ensure_polling(self, group_id):
+        """
+        Starts the poller of a subscribed group on the running loop, unless
+        it is polling already: a poller ends with the loop it was started on,
+        which under WSGI lasts a single request.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if group_id not in self._subscriptions:
+                return
+
+            poller = self._pollers.get(group_id)
+            if poller is not None and not poller[0].done() and not poller[0].get_loop().is_closed():
+                return
+
+            wakeup = Subscription(group_id)
+            self._pollers[group_id] = (loop.create_task(self._poll(group_id, wakeup)), wakeup)
+
+    async def _poll(self, group_id, wakeup):
+        read = sync_to_async(self._read, thread_sensitive=False)
+        version = None
+
+        while True:
+            wakeup.changed.clear()
+            try:
+                version, scores = await read(group_id, version)
+            except Exception:
+                logger.exception("Could not read the live leaderboard of group %s.", group_id)
+            else:
+                if scores is not None:
+                    with self._lock:
+                        if group_id not in self._subscriptions:
+                            return
+                        self._boards[group_id] = (version, scores)
+
+                    self.publish(group_id)
+
+            try:
+                await asyncio.wait_for(wakeup.changed.wait(), settings.LIVE_POLL_INTERVAL_MS / 1000)
+                await asyncio.sleep(settings.LIVE_COALESCE_MS / 1000)
+            except asyncio.TimeoutError:
+                pass
+
+    @staticmethod
+    def _read(group_id, version):
+        # Runs in an executor thread, whose connection is handled like a request's.
+        close_old_connections()
+        try:
+            current_version = group_snapshots.version(group_id)
+            if current_version == version:
+                return version, None
+
+            return current_version, group_snapshots.get_or_build(group_id, current_version)
+        finally:
+            close_old_connections()
+
+    def changed(self, group_id):
+        with self._lock:
+            poller = self._pollers.get(group_id)
+
+        if poller is not None:
+            poller[1].notify()
+
+    def publish(self, group_id):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(group_id, ()))
+
+        for subscription in subscriptions:
+            subscription.notify()
+
+    def board(self, group_id):
+        """
+        Returns the last (version, scores) read for the group, None before
+        its poller read it.
+        """
+        with self._lock:
+            return self._boards.get(group_id)
+
+
+live_leaderboards = LiveLeaderboards()
+
+
+def authenticate(token):
+    authentication = ClaimsJWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(token))
+    except (AuthenticationFailed, InvalidToken):
+        return None
+
+
+def get_token(headers, query_string):
+    """
+    Returns the access token of a live connection, from its Authorization
+    header or, since browsers can not set headers on EventSource and
+    WebSocket connections, from its token query parameter.
+    """
+    header = headers.get('authorization', '')
+    if header.startswith('Bearer '):
+        return header.removeprefix('Bearer ')
+
+    return parse_qs(query_string).get('token', [None])[0]
+
+
+def get_live_group(user):
+    tournament = Tournament.get_current_tournament()
+    if tournament is None:
+        return None
+
+    _, group_id = membership_cache.get(user.pk, tournament)
+    return group_id
+
+
+def dense_rank(scores, username):
+    score = next((row['score'] for row in scores if row['user'] == username), None)
+    if score is None:
+        return None
+
+    return len({row['score'] for row in scores if row['score'] >= score})
+
+
+async def live_events(user, group_id):
+    """
+    Yields (event, data) pairs for a live connection: a `snapshot` of the
+    group leaderboard and the user's rank first, then a `delta` with the
+    changed rows and the new rank whenever the group changes, and None as a
+    keep-alive when nothing changed for a poll interval. Ends after
+    LIVE_STREAM_SECONDS, so a connection whose client left without the server
+    noticing is released; EventSource clients reconnect on their own.
+    """
+    subscription = live_leaderboards.subscribe(group_id)
+    sent_scores = None
+    sent_rank = None
+    sent_version = None
+    woken = True
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.LIVE_STREAM_SECONDS
+
+    try:
+        while loop.time() < deadline:
+            subscription.changed.clear()
+            board = live_leaderboards.board(group_id)
+
+            if board is not None and board[0] != sent_version:
+                version, scores = board
+                rank = dense_rank(scores, user.username)
+
+                if sent_scores is None:
+                    yield 'snapshot', {'scores': scores, 'rank': rank}
+                else:
+                    changed_rows = [row for row in scores if sent_scores.get(row['user']) != row['score']]
+                    delta = {'scores': changed_rows}
+                    if rank != sent_rank:
+                        delta['rank'] = rank
+                    if changed_rows or rank != sent_rank:
+                        yield 'delta', delta
+
+                sent_scores = {row['user']: row['score'] for row in scores}
+                sent_rank = rank
+                sent_version = version
+            elif not woken:
+                yield None
+
+            try:
+                await asyncio.wait_for(subscription.changed.wait(), settings.LIVE_POLL_INTERVAL_MS / 1000)
+                woken = True
+            except asyncio.TimeoutError:
+                woken = False
+                live_leaderboards.ensure_polling(group_id)
+    finally:
+        live_leaderboards.unsubscribe(subscription)
+
+
+def format_event(name, data):
+    return b'event: ' + name.encode() + b'\ndata: ' + dumps(data) + b'\n\n'
+
+
+async def event_stream(events):
+    try:
+        async for event in events:
+            if event is None:
+                yield b': keep-alive\n\n'
+            else:
+                yield format_event(*event)
+    finally:
+        # Unsubscribes as soon as the client goes away instead of when the generator is collected.
+        await events.aclose()
+
+
+async def snapshot_event(user, group_id):
+    """
+    The first event of live_events alone, for servers that can not stream.
+    It asks the EventSource client to reconnect after LIVE_POLL_INTERVAL_MS,
+    so the connection polls instead.
+    """
+    events = live_events(user, group_id)
+    try:
+        event = await anext(events)
+    finally:
+        await events.aclose()
+
+    retry = f"retry: {settings.LIVE_POLL_INTERVAL_MS}\n\n".encode()
+    return retry + format_event(*event) if event is not None else retry
+
+
+async def websocket_application(scope, receive, send):
+    """
+    ASGI application pushing the live_events of the authenticated user as
+    {"event": ..., "data": ...} text messages over a WebSocket.
+    """
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+
+    headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in scope.get('headers', [])}
+    token = get_token(headers, scope.get('query_string', b'').decode('latin-1'))
+
+    user = await sync_to_async(authenticate)(token) if token else None
+    if user is None:
+        await send({'type': 'websocket.close', 'code': 4001})
+        return
+
+    group_id = await sync_to_async(get_live_group)(user)
+    if group_id is None:
+        await send({'type': 'websocket.close', 'code': 4004})
+        return
+
+    await send({'type': 'websocket.accept'})
+
+    async def push():
+        async for event in live_events(user, group_id):
+            if event is not None:
+                name, data = event
+                await send({'type': 'websocket.send', 'text': dumps({'event': name, 'data': data}).decode()})
+
+    pusher = asyncio.create_task(push())
+    try:
+        while (await receive())['type'] != 'websocket.disconnect':
+            pass
+    finally:
+        pusher.cancel()
+
+
+@receiver(tournament_entered)
+@receiver(score_updated)
+def publish_group_change(sender, group_id, **kwargs):
+    transaction.on_commit(lambda: live_leaderboards.changed(group_id))
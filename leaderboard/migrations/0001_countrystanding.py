@@ -0,0 +1,88 @@
+# Generated by Django 4.2.9 on 2026-10-18 10:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_countries.fields
+
+STANDING_SIZE = 1000
+
+
+def backfill_standings(apps, schema_editor):
+    CountryStanding = apps.get_model("leaderboard", "CountryStanding")
+    Tournament = apps.get_model("tournament", "Tournament")
+    UserTournamentGroup = apps.get_model("tournament", "UserTournamentGroup")
+
+    quote_name = schema_editor.connection.ops.quote_name
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {quote_name(CountryStanding._meta.db_table)}
+                (tournament_id, country, player_count, total_score, top_members)
+            SELECT entry.tournament_id, entry.country, count(*), sum(entry.score), (
+                SELECT COALESCE(jsonb_agg(
+                    jsonb_build_array(top.user_id, top.score) ORDER BY top.score DESC, top.user_id DESC
+                ), '[]')
+                FROM (
+                    SELECT member.user_id, member.score
+                    FROM {quote_name(UserTournamentGroup._meta.db_table)} AS member
+                    WHERE member.tournament_id = entry.tournament_id AND member.country = entry.country
+                    ORDER BY member.score DESC, member.user_id DESC
+                    LIMIT %s
+                ) AS top
+            )
+            FROM {quote_name(UserTournamentGroup._meta.db_table)} AS entry
+            WHERE entry.tournament_id IN (
+                SELECT id FROM {quote_name(Tournament._meta.db_table)} WHERE NOT settled
+            )
+            GROUP BY entry.tournament_id, entry.country
+            """,
+            [STANDING_SIZE],
+        )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("tournament", "0008_usertournamentgroup_country_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CountryStanding",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("country", django_countries.fields.CountryField(max_length=2)),
+                ("player_count", models.IntegerField(default=0)),
+                ("total_score", models.BigIntegerField(default=0)),
+                ("top_members", models.JSONField(default=list)),
+                (
+                    "tournament",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="standings",
+                        to="tournament.tournament",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["tournament", "-total_score"],
+                        name="leaderboard_standing_score_idx",
+                    )
+                ],
+                "unique_together": {("tournament", "country")},
+            },
+        ),
+        migrations.RunPython(backfill_standings, migrations.RunPython.noop),
+    ]
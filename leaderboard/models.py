@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.db import connection, models
+from django_countries.fields import CountryField
+
+
+class CountryStanding(models.Model):
+    """
+    Player count, total score and top COUNTRY_STANDING_SIZE members of one
+    country in a tournament, kept current by leaderboard.standings.
+    """
+    tournament = models.ForeignKey('tournament.Tournament', on_delete=models.CASCADE, related_name='standings')
+    country = CountryField()
+    player_count = models.IntegerField(default=0)
+    total_score = models.BigIntegerField(default=0)
+    # [user_id, score] pairs ordered by score and then user id, both descending.
+    top_members = models.JSONField(default=list)
+
+    class Meta:
+        unique_together = ('tournament', 'country')
+        indexes = [
+            models.Index(fields=['tournament', '-total_score'], name='leaderboard_standing_score_idx'),
+        ]
+
+    @classmethod
+    def top(cls, tournament_id, country, limit):
+        """
+        Returns the first limit (user_id, score) entries of the country, or
+        None when the standing does not hold that many.
+        """
+        standing = cls.objects\
+            .only('player_count', 'top_members')\
+            .filter(tournament_id=tournament_id, country=country)\
+            .first()
+
+        if standing is None:
+            return None
+
+        top_members = standing.top_members
+        if len(top_members) < min(limit, standing.player_count):
+            return None
+
+        return [(user_id, score) for user_id, score in top_members[:limit]]
+
+    @classmethod
+    def rebuild(cls, tournament_id):
+        """
+        Recomputes the standings of the tournament from its entries, e.g. after
+        a process exited without writing its buffered updates.
+        """
+        from tournament.models import UserTournamentGroup
+
+        table = connection.ops.quote_name(cls._meta.db_table)
+        user_group_table = connection.ops.quote_name(UserTournamentGroup._meta.db_table)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO {table} (tournament_id, country, player_count, total_score, top_members)
+                SELECT entry.tournament_id, entry.country, count(*), sum(entry.score), (
+                    SELECT COALESCE(jsonb_agg(
+                        jsonb_build_array(top.user_id, top.score) ORDER BY top.score DESC, top.user_id DESC
+                    ), '[]')
+                    FROM (
+                        SELECT member.user_id, member.score
+                        FROM {user_group_table} AS member
+                        WHERE member.tournament_id = entry.tournament_id AND member.country = entry.country
+                        ORDER BY member.score DESC, member.user_id DESC
+                        LIMIT %s
+                    ) AS top
+                )
+                FROM {user_group_table} AS entry
+                WHERE entry.tournament_id = %s
+                GROUP BY entry.tournament_id, entry.country
+                ON CONFLICT (tournament_id, country) DO UPDATE SET
+                    player_count = EXCLUDED.player_count,
+                    total_score = EXCLUDED.total_score,
+                    top_members = EXCLUDED.top_members
+            """, [settings.COUNTRY_STANDING_SIZE, tournament_id])
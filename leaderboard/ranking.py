@@ -0,0 +1,184 @@
+import threading
+
+from cachetools import TTLCache
+from django.conf import settings
+from django.db import transaction
+from django.dispatch import receiver
+
+from leaderboard.skiplist import SkipList
+from tournament.buffer import score_buffer
+from tournament.signals import tournament_entered, score_updated
+
+
+class ScoreHistogram:
+    """
+    Ordered score -> count histogram of one group, with the score of every
+    member it counts.
+
+    Distinct scores answer dense rank and one (score, n) key per counted entry
+    answers competition rank, both in O(log n). A member's update only ever
+    moves their own entry, so a stale update can not take another member's
+    entry of the same score.
+    """
+
+    def __init__(self, scores=None):
+        self._scores = {}
+        self._counts = {}
+        self._distinct = SkipList()
+        self._entries = SkipList()
+
+        for member, score in (scores or {}).items():
+            self.set(member, score)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, member):
+        return self._scores.get(member)
+
+    def set(self, member, score):
+        old_score = self._scores.get(member)
+        if old_score is not None:
+            self._remove(old_score)
+
+        self._add(score)
+        self._scores[member] = score
+
+    def _add(self, score):
+        count = self._counts.get(score, 0)
+        if count == 0:
+            self._distinct.insert(score)
+
+        self._entries.insert((score, count))
+        self._counts[score] = count + 1
+
+    def _remove(self, score):
+        count = self._counts[score] - 1
+        self._entries.remove((score, count))
+
+        if count == 0:
+            self._distinct.remove(score)
+            del self._counts[score]
+        else:
+            self._counts[score] = count
+
+    def dense_rank(self, score):
+        # Distinct scores above plus one, as the score may be newer than the histogram and missing from it.
+        return len(self._distinct) - self._distinct.bisect_right(score) + 1
+
+    def competition_rank(self, score):
+        return len(self._entries) - self._entries.bisect_left((score + 1, 0)) + 1
+
+
+class RankService:
+    """
+    Process local ranks of tournament groups, loaded with one query per group
+    and kept current by the tournament signals.
+
+    Signals only reach the process that sent them, so a histogram misses the
+    entries and scores of other workers until it expires and is reloaded,
+    RANK_CACHE_TTL seconds after it was loaded.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self._lock = threading.RLock()
+        self._histograms = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def _load(self, group_ids):
+        from tournament.models import UserTournamentGroup
+
+        scores = {group_id: {} for group_id in group_ids}
+        rows = list(
+            UserTournamentGroup.objects
+            .filter(group_id__in=group_ids)
+            .values_list('id', 'group_id', 'user_id', 'score')
+        )
+        pending = score_buffer.pending_for([user_tournament_group_id for user_tournament_group_id, *_ in rows])
+        for user_tournament_group_id, group_id, user_id, score in rows:
+            scores[group_id][user_id] = score + pending.get(user_tournament_group_id, 0)
+
+        histograms = {group_id: ScoreHistogram(group_scores) for group_id, group_scores in scores.items()}
+        with self._lock:
+            self._histograms.update(histograms)
+
+        return histograms
+
+    def _histogram(self, group_id):
+        with self._lock:
+            histogram = self._histograms.get(group_id)
+
+        if histogram is None:
+            histogram = self._load([group_id])[group_id]
+
+        return histogram
+
+    def dense_rank(self, group_id, score):
+        histogram = self._histogram(group_id)
+        with self._lock:
+            return histogram.dense_rank(score)
+
+    def competition_rank(self, group_id, score):
+        histogram = self._histogram(group_id)
+        with self._lock:
+            return histogram.competition_rank(score)
+
+    def ranks_for(self, user_tournament_groups, dense=True):
+        histograms = {}
+        with self._lock:
+            for user_tournament_group in user_tournament_groups:
+                histogram = self._histograms.get(user_tournament_group.group_id)
+                if histogram is not None:
+                    histograms[user_tournament_group.group_id] = histogram
+
+        missing = {user_tournament_group.group_id for user_tournament_group in user_tournament_groups} - histograms.keys()
+        if missing:
+            histograms.update(self._load(missing))
+
+        ranks = {}
+        with self._lock:
+            for user_tournament_group in user_tournament_groups:
+                histogram = histograms[user_tournament_group.group_id]
+                if dense:
+                    ranks[user_tournament_group.pk] = histogram.dense_rank(user_tournament_group.score)
+                else:
+                    ranks[user_tournament_group.pk] = histogram.competition_rank(user_tournament_group.score)
+
+        return ranks
+
+    def add_entry(self, group_id, user_id, score):
+        with self._lock:
+            histogram = self._histograms.get(group_id)
+            # Already counted when the histogram was loaded after the entry.
+            if histogram is not None and histogram.get(user_id) is None:
+                histogram.set(user_id, score)
+
+    def add_score(self, group_id, user_id, score):
+        with self._lock:
+            histogram = self._histograms.get(group_id)
+            if histogram is None:
+                return
+
+            current_score = histogram.get(user_id)
+            if current_score is None:
+                # The entry was made by another process, drop the histogram so it is reloaded.
+                del self._histograms[group_id]
+            elif score > current_score:
+                # Scores only grow, a lower one was already counted when the histogram was loaded.
+                histogram.set(user_id, score)
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+rank_service = RankService(maxsize=settings.RANK_CACHE_SIZE, ttl=settings.RANK_CACHE_TTL)
+
+
+@receiver(tournament_entered)
+def record_entry(sender, group_id, user_id, score, **kwargs):
+    transaction.on_commit(lambda: rank_service.add_entry(group_id, user_id, score))
+
+
+@receiver(score_updated)
+def record_score(sender, group_id, user_id, score, **kwargs):
+    transaction.on_commit(lambda: rank_service.add_score(group_id, user_id, score))
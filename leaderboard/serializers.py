@@ -1,6 +1,14 @@
+import base64
+import binascii
+
 from rest_framework import serializers
 
+from tournament.buffer import score_buffer
 from tournament.models import UserTournamentGroup
+from user.models import User
+
+RESULT_LIMIT = 1000
+LEADERBOARD_FIELDS = ('id', 'user_id', 'user__username', 'country', 'score')
 
 
 class LeaderboardSerializer(serializers.ModelSerializer):
@@ -11,3 +19,81 @@ class LeaderboardSerializer(serializers.ModelSerializer):
         model = UserTournamentGroup
         fields = ['user', 'country', 'score']
         read_only_fields = ['user', 'country', 'score']
+
+
+def serialize_ranked_users(entries):
+    users = {
+        user_id: (username, country)
+        for user_id, username, country in User.objects.filter(
+            pk__in=[user_id for user_id, _ in entries]
+        ).values_list('id', 'username', 'country')
+    }
+
+    return [
+        {
+            'user': users[user_id][0],
+            'country': users[user_id][1],
+            'score': score
+        }
+        for user_id, score in entries if user_id in users
+    ]
+
+
+def serialize_leaderboard(user_tournament_groups):
+    """
+    Same output as LeaderboardSerializer for a UserTournamentGroup queryset,
+    read in one query of the needed columns and built without DRF fields.
+    """
+    return serialize_leaderboard_rows(list(user_tournament_groups.values_list(*LEADERBOARD_FIELDS)))
+
+
+def serialize_leaderboard_rows(rows):
+    pending = score_buffer.pending_for([user_tournament_group_id for user_tournament_group_id, *_ in rows])
+    if pending:
+        rows = sorted(
+            (
+                (user_tournament_group_id, user_id, username, country, score + pending.get(user_tournament_group_id, 0))
+                for user_tournament_group_id, user_id, username, country, score in rows
+            ),
+            key=lambda row: -row[4]
+        )
+
+    return [
+        {
+            'user': username,
+            'country': country,
+            'score': score
+        }
+        for _, _, username, country, score in rows
+    ]
+
+
+def encode_cursor(score, user_id):
+    return base64.urlsafe_b64encode(f"{score}:{user_id}".encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    score, user_id = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode().split(':')
+    return int(score), int(user_id)
+
+
+class LeaderboardPageSerializer(serializers.Serializer):
+    AROUND_ME = 'me'
+    DEFAULT_AROUND = 10
+    MAX_AROUND = 100
+
+    limit = serializers.IntegerField(min_value=1, max_value=RESULT_LIMIT, default=RESULT_LIMIT)
+    cursor = serializers.CharField(required=False)
+    around = serializers.ChoiceField(choices=[AROUND_ME], required=False)
+    k = serializers.IntegerField(min_value=1, max_value=MAX_AROUND, default=DEFAULT_AROUND)
+
+    def validate_cursor(self, value):
+        try:
+            return decode_cursor(value)
+        except (binascii.Error, ValueError):
+            raise serializers.ValidationError("Invalid cursor.")
+
+    def validate(self, attrs):
+        if 'cursor' in attrs and 'around' in attrs:
+            raise serializers.ValidationError("A cursor can not be combined with around.")
+        return attrs
@@ -0,0 +1,217 @@
+import random
+
+
+class _Node:
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key, level):
+        self.key = key
+        self.next = [None] * level
+        # width[i] is the number of bottom level steps from this node to next[i].
+        self.width = [1] * level
+
+
+class SkipList:
+    """
+    Indexable skip list of unique, comparable keys.
+
+    Insert, remove, positional lookup and bisect are all O(log n) expected.
+    """
+    MAX_LEVEL = 32
+    PROBABILITY = 0.25
+
+    def __init__(self, keys=()):
+        self._head = _Node(None, self.MAX_LEVEL)
+        self._level = 1
+        self._size = 0
+
+        for key in keys:
+            self.insert(key)
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    def __contains__(self, key):
+        node = self._find_previous(key)[0].next[0]
+        return node is not None and node.key == key
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._size
+
+        if not 0 <= index < self._size:
+            raise IndexError("SkipList index out of range")
+
+        return self._node_at(index).key
+
+    def _random_level(self):
+        level = 1
+        while level < self.MAX_LEVEL and random.random() < self.PROBABILITY:
+            level += 1
+        return level
+
+    def _find_previous(self, key):
+        update = [self._head] * self.MAX_LEVEL
+        steps = [0] * self.MAX_LEVEL
+        node = self._head
+        position = 0
+
+        for i in reversed(range(self._level)):
+            while node.next[i] is not None and node.next[i].key < key:
+                position += node.width[i]
+                node = node.next[i]
+            update[i] = node
+            steps[i] = position
+
+        return update, steps, position
+
+    def _node_at(self, index):
+        node = self._head
+        position = 0
+        target = index + 1
+
+        for i in reversed(range(self._level)):
+            while node.next[i] is not None and position + node.width[i] <= target:
+                position += node.width[i]
+                node = node.next[i]
+
+        return node
+
+    def insert(self, key):
+        update, steps, position = self._find_previous(key)
+
+        node = update[0].next[0]
+        if node is not None and node.key == key:
+            raise KeyError(f"Duplicate key {key!r}.")
+
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                self._head.width[i] = self._size + 1
+            self._level = level
+
+        new_node = _Node(key, level)
+        for i in range(level):
+            previous = update[i]
+            new_node.next[i] = previous.next[i]
+            previous.next[i] = new_node
+            new_node.width[i] = previous.width[i] - (position - steps[i])
+            previous.width[i] = position - steps[i] + 1
+
+        for i in range(level, self._level):
+            update[i].width[i] += 1
+
+        self._size += 1
+
+    def remove(self, key):
+        update, _, _ = self._find_previous(key)
+
+        node = update[0].next[0]
+        if node is None or node.key != key:
+            raise KeyError(key)
+
+        for i in range(self._level):
+            if update[i].next[i] is node:
+                update[i].width[i] += node.width[i] - 1
+                update[i].next[i] = node.next[i]
+            else:
+                update[i].width[i] -= 1
+
+        while self._level > 1 and self._head.next[self._level - 1] is None:
+            self._level -= 1
+
+        self._size -= 1
+
+    def bisect_left(self, key):
+        return self._find_previous(key)[2]
+
+    def bisect_right(self, key):
+        node = self._head
+        position = 0
+
+        for i in reversed(range(self._level)):
+            while node.next[i] is not None and node.next[i].key <= key:
+                position += node.width[i]
+                node = node.next[i]
+
+        return position
+
+    def iter_from(self, index):
+        if index >= self._size:
+            return
+
+        node = self._node_at(max(index, 0))
+        while node is not None:
+            yield node.key
+            node = node.next[0]
+
+
+class SortedSet:
+    """
+    Redis style sorted set of integer members, ordered by score descending and
+    then by member descending, so positions are reverse ranks (ZREVRANK).
+    """
+
+    def __init__(self):
+        self._scores = {}
+        self._entries = SkipList()
+
+    def __len__(self):
+        return len(self._scores)
+
+    def __contains__(self, member):
+        return member in self._scores
+
+    @staticmethod
+    def _key(member, score):
+        return -score, -member
+
+    def score(self, member):
+        return self._scores.get(member)
+
+    def add(self, member, score):
+        old_score = self._scores.get(member)
+        if old_score == score:
+            return
+
+        if old_score is not None:
+            self._entries.remove(self._key(member, old_score))
+
+        self._scores[member] = score
+        self._entries.insert(self._key(member, score))
+
+    def incr(self, member, amount):
+        score = self._scores.get(member, 0) + amount
+        self.add(member, score)
+        return score
+
+    def remove(self, member):
+        score = self._scores.pop(member)
+        self._entries.remove(self._key(member, score))
+
+    def rank(self, member):
+        score = self._scores.get(member)
+        if score is None:
+            return None
+
+        return self._entries.bisect_left(self._key(member, score))
+
+    def range(self, start, stop):
+        entries = []
+        for position, (score, member) in enumerate(self._entries.iter_from(start), start=start):
+            if position >= stop:
+                break
+            entries.append((-member, -score))
+
+        return entries
+
+    def range_after(self, member, score, count):
+        """
+        Returns the count entries that follow (member, score) in set order,
+        whether or not the member is still in the set with that score.
+        """
+        start = self._entries.bisect_right(self._key(member, score))
+        return self.range(start, start + count)
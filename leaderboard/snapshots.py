@@ -0,0 +1,108 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.dispatch import receiver
+
+from tournament.signals import tournament_entered, score_updated
+
+
+class GroupSnapshots:
+    """
+    Serialized group leaderboards in the LEADERBOARD_SNAPSHOT_CACHE alias,
+    each stored with the version of its group it was built at.
+
+    The version of a group is bumped whenever a score in it changes or a user
+    joins it, so a snapshot is served only while it is current and the
+    version doubles as the group leaderboard's ETag.
+
+    Versions bumped in a process local cache would drift apart between
+    workers, so with a LocMemCache or DummyCache alias the version is read
+    from the database instead: the member count, id sum and score sum of the
+    group, which change with every entry and score increment.
+    """
+
+    @property
+    def _cache(self):
+        return caches[settings.LEADERBOARD_SNAPSHOT_CACHE]
+
+    @property
+    def shared(self):
+        return not isinstance(self._cache, (LocMemCache, DummyCache))
+
+    @staticmethod
+    def _version_key(group_id):
+        return f'leaderboard:group:{group_id}:version'
+
+    @staticmethod
+    def _snapshot_key(group_id):
+        return f'leaderboard:group:{group_id}:snapshot'
+
+    def version(self, group_id):
+        if not self.shared:
+            return self._database_version(group_id)
+
+        key = self._version_key(group_id)
+        version = self._cache.get(key)
+        if version is None:
+            # Starting from the clock, a version lost with the cache is not reused for different scores.
+            self._cache.add(key, time.time_ns(), timeout=None)
+            version = self._cache.get(key)
+
+        return version
+
+    @staticmethod
+    def _database_version(group_id):
+        from tournament.models import UserTournamentGroup
+
+        version = UserTournamentGroup.objects\
+            .filter(group_id=group_id)\
+            .aggregate(members=Count('id'), ids=Sum('id'), scores=Sum('score'))
+
+        return f"{version['members']}.{version['ids'] or 0}.{version['scores'] or 0}"
+
+    def bump(self, group_id):
+        if not self.shared:
+            return
+
+        try:
+            self._cache.incr(self._version_key(group_id))
+        except ValueError:
+            self.version(group_id)
+
+    def etag(self, group_id, version):
+        return f'"{group_id}-{version}"'
+
+    def get(self, group_id, version):
+        snapshot = self._cache.get(self._snapshot_key(group_id))
+        if snapshot is not None and snapshot[0] == version:
+            return snapshot[1]
+
+        return None
+
+    def set(self, group_id, version, data):
+        self._cache.set(self._snapshot_key(group_id), (version, data), settings.LEADERBOARD_SNAPSHOT_TTL)
+
+    def get_or_build(self, group_id, version):
+        from leaderboard.serializers import serialize_leaderboard
+        from tournament.models import UserTournamentGroup
+
+        data = self.get(group_id, version)
+        if data is None:
+            data = serialize_leaderboard(UserTournamentGroup.objects.filter(group_id=group_id).order_by('-score'))
+            self.set(group_id, version, data)
+
+        return data
+
+
+group_snapshots = GroupSnapshots()
+
+
+@receiver(tournament_entered)
+@receiver(score_updated)
+def bump_group_version(sender, group_id, **kwargs):
+    transaction.on_commit(lambda: group_snapshots.bump(group_id))
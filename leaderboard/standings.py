@@ -0,0 +1,183 @@
+import heapq
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.dispatch import receiver
+
+from GoodBlast.threads import BackgroundThread
+from tournament.signals import tournament_entered, tournament_bulk_entered, score_updated
+
+logger = logging.getLogger(__name__)
+
+
+class StandingsBuffer:
+    """
+    Applies entries and score increments to the CountryStanding of their
+    tournament and country.
+
+    Changes are merged per process and written every
+    COUNTRY_STANDING_FLUSH_INTERVAL_MS with one INSERT ... ON CONFLICT, so a
+    busy country costs one row update per interval and process instead of
+    one per score increment. With the interval set to 0 every change is
+    written as it comes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._players = {}
+        self._scores = {}
+        self._members = {}
+        self._flusher = BackgroundThread(self._run_flusher, 'country-standings-flusher')
+
+    def __len__(self):
+        return len(self._members)
+
+    def add(self, tournament_id, country, user_id, score, players=0, amount=0):
+        key = (tournament_id, str(country))
+        self._apply({key: players}, {key: amount}, {key: {user_id: score}})
+
+    def add_entries(self, tournament_id, entries):
+        """
+        Applies many entries, (user_id, country, score) tuples, with one change
+        per country.
+        """
+        players = {}
+        scores = {}
+        members = {}
+        for user_id, country, score in entries:
+            key = (tournament_id, str(country))
+            players[key] = players.get(key, 0) + 1
+            scores[key] = scores.get(key, 0) + score
+            members.setdefault(key, {})[user_id] = score
+
+        if members:
+            self._apply(players, scores, members)
+
+    def _apply(self, players, scores, members):
+        if not settings.COUNTRY_STANDING_FLUSH_INTERVAL_MS:
+            self._write(players, scores, members)
+            return
+
+        self._flusher.start()
+        with self._lock:
+            for key in members:
+                self._merge(key, players[key], scores[key], members[key])
+
+    def _merge(self, key, players, amount, members):
+        self._players[key] = self._players.get(key, 0) + players
+        self._scores[key] = self._scores.get(key, 0) + amount
+
+        pending_members = self._members.setdefault(key, {})
+        for user_id, score in members.items():
+            # Scores only grow, so the highest one seen is the latest.
+            pending_members[user_id] = max(score, pending_members.get(user_id, score))
+
+        if len(pending_members) > 2 * settings.COUNTRY_STANDING_SIZE:
+            self._members[key] = self._top(pending_members)
+
+    @staticmethod
+    def _top(members):
+        return dict(heapq.nlargest(settings.COUNTRY_STANDING_SIZE, members.items(), key=lambda item: (item[1], item[0])))
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                players, self._players = self._players, {}
+                scores, self._scores = self._scores, {}
+                members, self._members = self._members, {}
+
+            if not members:
+                return 0
+
+            try:
+                self._write(players, scores, members)
+            except Exception:
+                with self._lock:
+                    for key in members:
+                        self._merge(key, players[key], scores[key], members[key])
+                raise
+
+            return len(members)
+
+    def _write(self, players, scores, members):
+        from leaderboard.models import CountryStanding
+        from tournament.models import Tournament
+
+        table = connection.ops.quote_name(CountryStanding._meta.db_table)
+        tournament_table = connection.ops.quote_name(Tournament._meta.db_table)
+        # Sorted, so concurrent writers lock the standing rows in the same order.
+        keys = sorted(members)
+        values = ", ".join(["(%s::bigint, %s::varchar, %s::integer, %s::bigint, %s::jsonb)"] * len(keys))
+        params = []
+        for key in keys:
+            top_members = sorted(self._top(members[key]).items(), key=lambda item: (item[1], item[0]), reverse=True)
+            params.extend([*key, players[key], scores[key], json.dumps(top_members)])
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO {table} AS standing (tournament_id, country, player_count, total_score, top_members)
+                SELECT pending.*
+                FROM (VALUES {values}) AS pending (tournament_id, country, player_count, total_score, top_members)
+                -- Changes of a tournament deleted since are dropped instead of failing the whole batch.
+                JOIN {tournament_table} AS tournament ON tournament.id = pending.tournament_id
+                ORDER BY pending.tournament_id, pending.country
+                ON CONFLICT (tournament_id, country) DO UPDATE SET
+                    player_count = standing.player_count + EXCLUDED.player_count,
+                    total_score = standing.total_score + EXCLUDED.total_score,
+                    top_members = (
+                        SELECT COALESCE(jsonb_agg(
+                            jsonb_build_array(top.user_id, top.score) ORDER BY top.score DESC, top.user_id DESC
+                        ), '[]')
+                        FROM (
+                            SELECT (member->>0)::integer AS user_id, max((member->>1)::integer) AS score
+                            FROM jsonb_array_elements(standing.top_members || EXCLUDED.top_members) AS member
+                            GROUP BY 1
+                            ORDER BY 2 DESC, 1 DESC
+                            LIMIT %s
+                        ) AS top
+                    )
+            """, [*params, settings.COUNTRY_STANDING_SIZE])
+
+    def _run_flusher(self):
+        try:
+            while True:
+                # Without an interval changes are written as they come, nothing is left to flush until woken.
+                stopped = self._flusher.wait(settings.COUNTRY_STANDING_FLUSH_INTERVAL_MS / 1000 or None)
+
+                close_old_connections()
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception("Could not write %s buffered country standings.", len(self))
+
+                if stopped:
+                    return
+        finally:
+            connection.close()
+
+
+country_standings = StandingsBuffer()
+
+
+@receiver(tournament_entered)
+def record_entry(sender, tournament_id, user_id, country, score, bulk=False, **kwargs):
+    # Bulk entries are applied together, see record_entries.
+    if bulk:
+        return
+
+    transaction.on_commit(lambda: country_standings.add(tournament_id, country, user_id, score, players=1, amount=score))
+
+
+@receiver(tournament_bulk_entered)
+def record_entries(sender, tournament_id, entries, **kwargs):
+    entries = [(entry.user_id, entry.country, entry.score) for entry in entries]
+    transaction.on_commit(lambda: country_standings.add_entries(tournament_id, entries))
+
+
+@receiver(score_updated)
+def record_score(sender, tournament_id, user_id, country, amount, score, **kwargs):
+    transaction.on_commit(lambda: country_standings.add(tournament_id, country, user_id, score, amount=amount))
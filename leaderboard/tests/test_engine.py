@@ -0,0 +1,234 @@
+import random
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from leaderboard.backends import RedisBackend
+from leaderboard.engine import get_engine
+from leaderboard.skiplist import SkipList, SortedSet
+from tournament.models import Tournament, UserTournamentGroup
+from user.models import User
+
+IN_MEMORY_BACKEND = 'leaderboard.backends.InMemoryBackend'
+
+
+class SkipListTest(TestCase):
+    def test_matches_sorted_list(self):
+        skip_list = SkipList()
+        expected = []
+
+        for _ in range(2000):
+            key = random.randint(0, 500)
+            if key in expected:
+                skip_list.remove(key)
+                expected.remove(key)
+            else:
+                skip_list.insert(key)
+                expected.append(key)
+                expected.sort()
+
+        self.assertEqual(list(skip_list), expected)
+        self.assertEqual(len(skip_list), len(expected))
+
+        for index, key in enumerate(expected):
+            self.assertEqual(skip_list[index], key)
+            self.assertEqual(skip_list.bisect_left(key), index)
+            self.assertEqual(skip_list.bisect_right(key), index + 1)
+
+    def test_duplicate_and_missing_keys(self):
+        skip_list = SkipList([1, 2, 3])
+
+        with self.assertRaises(KeyError):
+            skip_list.insert(2)
+
+        with self.assertRaises(KeyError):
+            skip_list.remove(4)
+
+        with self.assertRaises(IndexError):
+            skip_list[3]
+
+
+class SortedSetTest(TestCase):
+    def test_orders_by_score_then_member_descending(self):
+        sorted_set = SortedSet()
+        sorted_set.add(1, 10)
+        sorted_set.add(2, 30)
+        sorted_set.add(3, 10)
+        sorted_set.incr(1, 25)
+
+        self.assertEqual(sorted_set.range(0, 10), [(1, 35), (2, 30), (3, 10)])
+        self.assertEqual(sorted_set.range(1, 2), [(2, 30)])
+        self.assertEqual(sorted_set.rank(3), 2)
+        self.assertIsNone(sorted_set.rank(4))
+
+        self.assertEqual(sorted_set.range_after(2, 30, 10), [(3, 10)])
+        self.assertEqual(sorted_set.range_after(4, 10, 10), [(3, 10)])
+
+        sorted_set.remove(2)
+        self.assertEqual(sorted_set.range(0, 10), [(1, 35), (3, 10)])
+        self.assertEqual(sorted_set.range_after(2, 30, 10), [(3, 10)])
+
+    def test_redis_members_order_ties_like_integers(self):
+        members = [9, 10, 100, 2]
+        # Redis orders members of equal score as strings.
+        redis_order = sorted(members, key=RedisBackend._member, reverse=True)
+
+        sorted_set = SortedSet()
+        for member in members:
+            sorted_set.add(member, 0)
+
+        self.assertEqual([member for member, _ in sorted_set.range(0, 10)], redis_order)
+
+
+@override_settings(LEADERBOARD_BACKEND=IN_MEMORY_BACKEND)
+class LeaderboardEngineTest(TestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(date=timezone.now().date())
+        self.users = [
+            User.objects.create(
+                username=f'test{i}',
+                country='US' if i % 2 else 'TR',
+                current_level=Tournament.USER_LEVEL_REQUIREMENT,
+                coins=Tournament.ENTRY_FEE
+            )
+            for i in range(6)
+        ]
+        self.groups = [UserTournamentGroup.enter_tournament(user, self.tournament) for user in self.users]
+        for score, group in enumerate(self.groups):
+            group.update_score(score)
+
+    def test_loads_from_database(self):
+        engine = get_engine()
+
+        self.assertEqual(
+            engine.top(self.tournament.id, 3),
+            [(self.users[5].id, 5), (self.users[4].id, 4), (self.users[3].id, 3)]
+        )
+        self.assertEqual(
+            engine.top(self.tournament.id, 10, country='TR'),
+            [(self.users[4].id, 4), (self.users[2].id, 2), (self.users[0].id, 0)]
+        )
+        self.assertEqual(engine.rank(self.tournament.id, self.users[1].id), 4)
+        self.assertEqual(engine.rank(self.tournament.id, self.users[1].id, country='US'), 2)
+        self.assertEqual(engine.count(self.tournament.id, country='US'), 3)
+
+    def test_applies_incremental_writes(self):
+        engine = get_engine()
+        engine.ensure_loaded(self.tournament.id)
+
+        new_user = User.objects.create(
+            username='newcomer',
+            country='US',
+            current_level=Tournament.USER_LEVEL_REQUIREMENT,
+            coins=Tournament.ENTRY_FEE
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            group = UserTournamentGroup.enter_tournament(new_user, self.tournament)
+            group.update_score(10)
+            self.groups[0].update_score(2)
+
+        self.assertEqual(engine.top(self.tournament.id, 1), [(new_user.id, 10)])
+        self.assertEqual(engine.top(self.tournament.id, 1, country='US'), [(new_user.id, 10)])
+        self.assertEqual(engine.score(self.tournament.id, self.users[0].id), 2)
+
+    def test_replays_writes_during_load(self):
+        engine = get_engine()
+        new_user = User.objects.create(username='newcomer', country='US')
+        load = engine.backend.load
+
+        def load_after_writes(key, partitions, members):
+            # Committed after the rows were read, apart from users[5]'s score of 5 which the rows include.
+            engine.add_score(self.tournament.id, self.users[0].id, 7, 7)
+            engine.add_entry(self.tournament.id, new_user.id, 'US', 6)
+            engine.add_score(self.tournament.id, self.users[5].id, 5, 5)
+            load(key, partitions, members)
+
+        with mock.patch.object(engine.backend, 'load', side_effect=load_after_writes):
+            engine.ensure_loaded(self.tournament.id)
+
+        self.assertEqual(
+            engine.top(self.tournament.id, 3),
+            [(self.users[0].id, 7), (new_user.id, 6), (self.users[5].id, 5)]
+        )
+        self.assertEqual(engine.top(self.tournament.id, 2, country='US'), [(new_user.id, 6), (self.users[5].id, 5)])
+
+    def test_waits_for_a_load_in_progress(self):
+        engine = get_engine()
+        key = engine._key(self.tournament.id)
+        self.assertTrue(engine.backend.begin_load(key))
+
+        with mock.patch.object(engine, 'LOAD_WAIT_SECONDS', 0), self.assertNumQueries(0):
+            engine.ensure_loaded(self.tournament.id)
+
+        self.assertFalse(engine.backend.is_loaded(key))
+        engine.backend.abort_load(key)
+        self.assertEqual(engine.top(self.tournament.id, 1), [(self.users[5].id, 5)])
+
+    def test_ignores_writes_before_load(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.groups[0].update_score(100)
+
+        self.assertEqual(get_engine().top(self.tournament.id, 1), [(self.users[0].id, 100)])
+
+
+@override_settings(LEADERBOARD_BACKEND=IN_MEMORY_BACKEND)
+class EngineLeaderboardViewTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.tournament = Tournament.objects.create(date=timezone.now().date())
+
+        for i in range(10):
+            self.user = User.objects.create(
+                username=f'test{i}',
+                country='US' if i % 2 else 'TR',
+                current_level=Tournament.USER_LEVEL_REQUIREMENT,
+                coins=Tournament.ENTRY_FEE
+            )
+            UserTournamentGroup.enter_tournament(self.user, self.tournament).update_score(i)
+
+        self.client.force_authenticate(user=self.user)
+
+    def test_global_leaderboard(self):
+        response = self.client.get(reverse('global-leaderboard'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 10)
+        self.assertEqual(response.data[0], {'user': 'test9', 'country': 'US', 'score': 9})
+        self.assertEqual([row['score'] for row in response.data], list(range(9, -1, -1)))
+
+    def test_country_leaderboard(self):
+        response = self.client.get(reverse('country-leaderboard'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['user'] for row in response.data], ['test9', 'test7', 'test5', 'test3', 'test1'])
+
+    def test_pages_follow_cursor(self):
+        usernames = []
+        url = f"{reverse('global-leaderboard')}?limit=3"
+        while url:
+            response = self.client.get(url)
+            usernames.extend(row['user'] for row in response.data)
+            url = response.headers.get('Link', '').partition('<')[2].partition('>')[0]
+
+        self.assertEqual(usernames, [f'test{i}' for i in range(9, -1, -1)])
+
+    def test_around_me(self):
+        self.client.force_authenticate(user=User.objects.get(username='test4'))
+
+        response = self.client.get(reverse('country-leaderboard'), {'around': 'me', 'k': 1})
+
+        self.assertEqual([row['user'] for row in response.data], ['test6', 'test4', 'test2'])
+        self.assertIn('Link', response.headers)
+
+    def test_no_users(self):
+        Tournament.objects.filter(id=self.tournament.id).update(date=timezone.now().date().replace(year=2000))
+        Tournament.objects.create(date=timezone.now().date())
+
+        response = self.client.get(reverse('global-leaderboard'))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,152 @@
+import asyncio
+import json
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from GoodBlast.asgi import application
+from leaderboard.live import dense_rank, live_events, live_leaderboards
+from leaderboard.snapshots import group_snapshots
+from leaderboard.standings import country_standings
+from tournament.models import Tournament, UserTournamentGroup
+from user.models import User
+
+
+# Committed, since the boards are read on connections of executor threads.
+@override_settings(LIVE_COALESCE_MS=0)
+class LiveGroupLeaderboardTest(TransactionTestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(date=timezone.now().date())
+        self.entries = []
+
+        for i in range(3):
+            user = User.objects.create(
+                username=f'test{i}',
+                country='TR',
+                current_level=Tournament.USER_LEVEL_REQUIREMENT,
+                coins=Tournament.ENTRY_FEE
+            )
+            entry = UserTournamentGroup.enter_tournament(user, self.tournament)
+            entry.update_score(i + 1)
+            self.entries.append(entry)
+
+        self.user = self.entries[0].user
+        self.token = str(AccessToken.for_user(self.user))
+
+    def tearDown(self):
+        # Written before the tables are flushed, while the tournament still exists.
+        country_standings.flush()
+
+    def test_dense_rank(self):
+        scores = [{'user': 'a', 'score': 5}, {'user': 'b', 'score': 5}, {'user': 'c', 'score': 2}]
+
+        self.assertEqual(dense_rank(scores, 'c'), 2)
+        self.assertIsNone(dense_rank(scores, 'd'))
+
+    async def test_server_sent_events(self):
+        response = await self.async_client.get(reverse('live-group-leaderboard'), {'token': self.token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        events = aiter(response.streaming_content)
+        snapshot = (await anext(events)).decode()
+        self.assertTrue(snapshot.startswith('event: snapshot\n'))
+        self.assertEqual(json.loads(snapshot.split('data: ')[1])['rank'], 3)
+
+        await sync_to_async(self.entries[0].update_score)(10)
+
+        delta = (await anext(events)).decode()
+        self.assertTrue(delta.startswith('event: delta\n'))
+        self.assertEqual(
+            json.loads(delta.split('data: ')[1]),
+            {'scores': [{'user': 'test0', 'country': 'TR', 'score': 11}], 'rank': 1}
+        )
+
+    def test_snapshot_under_wsgi(self):
+        response = self.client.get(reverse('live-group-leaderboard'), {'token': self.token})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertFalse(response.streaming)
+
+        retry, snapshot = response.content.decode().split('\n\n', 1)
+        self.assertEqual(retry, f'retry: {settings.LIVE_POLL_INTERVAL_MS}')
+        self.assertTrue(snapshot.startswith('event: snapshot\n'))
+        self.assertEqual(json.loads(snapshot.split('data: ')[1])['rank'], 3)
+        self.assertEqual(live_leaderboards._subscriptions, {})
+
+    async def test_unsubscribes_when_closed(self):
+        group_id = self.entries[0].group_id
+        events = live_events(self.user, group_id)
+
+        self.assertEqual((await anext(events))[0], 'snapshot')
+        self.assertIn(group_id, live_leaderboards._subscriptions)
+
+        await events.aclose()
+        self.assertNotIn(group_id, live_leaderboards._subscriptions)
+
+    async def test_group_is_polled_once_for_all_subscribers(self):
+        group_id = self.entries[0].group_id
+
+        with mock.patch.object(group_snapshots, 'version', wraps=group_snapshots.version) as version:
+            streams = [live_events(entry.user, group_id) for entry in self.entries]
+            snapshots = await asyncio.gather(*(anext(events) for events in streams))
+
+            self.assertEqual([event for event, _ in snapshots], ['snapshot'] * 3)
+            self.assertEqual(version.call_count, 1)
+
+            await sync_to_async(self.entries[0].update_score)(10)
+            deltas = await asyncio.gather(*(anext(events) for events in streams))
+
+            self.assertEqual([event for event, _ in deltas], ['delta'] * 3)
+            self.assertEqual(version.call_count, 2)
+
+            for events in streams:
+                await events.aclose()
+
+        self.assertNotIn(group_id, live_leaderboards._pollers)
+
+    @override_settings(LIVE_STREAM_SECONDS=0)
+    async def test_ends_after_stream_seconds(self):
+        events = [event async for event in live_events(self.user, self.entries[0].group_id)]
+
+        self.assertEqual(events, [])
+
+    async def test_server_sent_events_require_authentication(self):
+        response = await self.async_client.get(reverse('live-group-leaderboard'), {'token': 'invalid'})
+
+        self.assertEqual(response.status_code, 401)
+
+    async def test_websocket(self):
+        communicator = ApplicationCommunicator(application, {
+            'type': 'websocket',
+            'path': '/api/leaderboard/live',
+            'query_string': f'token={self.token}'.encode(),
+            'headers': [],
+        })
+        await communicator.send_input({'type': 'websocket.connect'})
+
+        self.assertEqual(await communicator.receive_output(), {'type': 'websocket.accept'})
+        message = json.loads((await communicator.receive_output())['text'])
+        self.assertEqual(message['event'], 'snapshot')
+        self.assertEqual(len(message['data']['scores']), 3)
+
+        await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await communicator.wait()
+
+    async def test_websocket_rejects_unknown_users(self):
+        communicator = ApplicationCommunicator(application, {
+            'type': 'websocket',
+            'path': '/api/leaderboard/live',
+            'query_string': b'',
+            'headers': [],
+        })
+        await communicator.send_input({'type': 'websocket.connect'})
+
+        self.assertEqual(await communicator.receive_output(), {'type': 'websocket.close', 'code': 4001})
@@ -0,0 +1,130 @@
+import random
+
+from django.test import TestCase
+from django.utils import timezone
+
+from leaderboard.ranking import ScoreHistogram, rank_service
+from tournament.models import Tournament, TournamentGroup, UserTournamentGroup
+from user.models import User
+
+
+class ScoreHistogramTest(TestCase):
+    def test_matches_brute_force(self):
+        scores = {member: random.randint(0, 30) for member in range(200)}
+        histogram = ScoreHistogram(scores)
+
+        for _ in range(100):
+            member = random.randrange(len(scores))
+            scores[member] += random.randint(0, 5)
+            histogram.set(member, scores[member])
+
+        for score in set(scores.values()) | {-1, 100}:
+            self.assertEqual(histogram.dense_rank(score), len({s for s in scores.values() if s > score}) + 1)
+            self.assertEqual(histogram.competition_rank(score), len([s for s in scores.values() if s > score]) + 1)
+
+    def test_rank_of_a_missing_score(self):
+        histogram = ScoreHistogram({1: 5, 2: 10})
+
+        self.assertEqual(histogram.dense_rank(7), 2)
+        self.assertEqual(histogram.dense_rank(11), 1)
+        self.assertEqual(histogram.dense_rank(3), 3)
+        self.assertEqual(histogram.competition_rank(7), 2)
+
+    def test_set_moves_only_the_members_entry(self):
+        histogram = ScoreHistogram({1: 5, 2: 5})
+        histogram.set(1, 7)
+        histogram.set(1, 7)
+
+        self.assertEqual(len(histogram), 2)
+        self.assertEqual(histogram.get(2), 5)
+        self.assertEqual(histogram.dense_rank(5), 2)
+        self.assertEqual(histogram.competition_rank(5), 2)
+
+
+class RankServiceTest(TestCase):
+    def setUp(self):
+        rank_service.clear()
+        self.tournament = Tournament.objects.create(date=timezone.now().date())
+        self.groups = [TournamentGroup.objects.create(tournament=self.tournament) for _ in range(3)]
+        self.rows = []
+
+        for i in range(30):
+            user = User.objects.create(username=f'test{i}')
+            self.rows.append(UserTournamentGroup.objects.create(
+                user=user,
+                group=self.groups[i % 3],
+                score=i // 6
+            ))
+
+    def tearDown(self):
+        rank_service.clear()
+
+    def _dense_rank(self, row):
+        return UserTournamentGroup.objects.filter(
+            group=row.group,
+            score__gte=row.score
+        ).distinct('score').count()
+
+    def _competition_rank(self, row):
+        return UserTournamentGroup.objects.filter(group=row.group, score__gt=row.score).count() + 1
+
+    def test_ranks_for_loads_groups_in_one_query(self):
+        with self.assertNumQueries(1):
+            ranks = rank_service.ranks_for(self.rows)
+
+        for row in self.rows:
+            self.assertEqual(ranks[row.pk], self._dense_rank(row))
+
+    def test_competition_rank(self):
+        ranks = rank_service.ranks_for(self.rows, dense=False)
+
+        for row in self.rows:
+            expected = self._competition_rank(row)
+            self.assertEqual(ranks[row.pk], expected)
+            self.assertEqual(rank_service.competition_rank(row.group_id, row.score), expected)
+
+    def test_follows_score_updates(self):
+        row = self.rows[0]
+        self.assertEqual(row.get_rank(), self._dense_rank(row))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            row.update_score(10)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(row.get_rank(), 1)
+
+    def test_follows_entries(self):
+        rank_service.ranks_for(self.rows)
+        user = User.objects.create(
+            username='newcomer',
+            current_level=Tournament.USER_LEVEL_REQUIREMENT,
+            coins=Tournament.ENTRY_FEE
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            new_row = UserTournamentGroup.enter_tournament(user, self.tournament)
+
+        self.assertEqual(new_row.get_rank(), self._dense_rank(new_row))
+
+    def test_stale_update_does_not_move_other_members(self):
+        first, second = self.rows[0], self.rows[3]
+        self.assertEqual((first.group_id, first.score), (second.group_id, second.score))
+
+        # Loaded after first's update was written but before its signal arrived.
+        first.score = 4
+        first.save()
+        rank_service.ranks_for(self.rows)
+        rank_service.add_score(first.group_id, first.user_id, 4)
+
+        self.assertEqual(rank_service.competition_rank(second.group_id, second.score), self._competition_rank(second))
+        self.assertEqual(rank_service.competition_rank(first.group_id, 4), 1)
+
+    def test_entry_of_another_process_reloads_the_group(self):
+        rank_service.ranks_for(self.rows)
+        user = User.objects.create(username='newcomer')
+        UserTournamentGroup.objects.create(user=user, group=self.groups[0], score=9)
+
+        rank_service.add_score(self.groups[0].id, user.id, 10)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(rank_service.dense_rank(self.groups[0].id, 9), 1)
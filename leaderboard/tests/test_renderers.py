@@ -0,0 +1,58 @@
+import json
+from datetime import date
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from GoodBlast.renderers import FastJSONRenderer
+from tournament.models import Tournament, UserTournamentGroup
+from user.models import User
+
+
+class FastJSONRendererTest(TestCase):
+    DATA = {'rows': [{'user': 'test', 'country': 'TR', 'score': 3}], 'date': date(2024, 1, 1), 1: 'id'}
+    EXPECTED = {'rows': [{'user': 'test', 'country': 'TR', 'score': 3}], 'date': '2024-01-01', '1': 'id'}
+
+    def test_render(self):
+        self.assertEqual(json.loads(FastJSONRenderer().render(self.DATA)), self.EXPECTED)
+
+    @patch('GoodBlast.renderers.orjson', None)
+    def test_render_without_orjson(self):
+        self.assertEqual(json.loads(FastJSONRenderer().render(self.DATA)), self.EXPECTED)
+
+
+@override_settings(FAST_JSON_RENDERER=True)
+class FastRenderingViewTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.tournament = Tournament.objects.create(date=timezone.now().date())
+
+        for i in range(25):
+            self.user = User.objects.create(
+                username=f'test{i}',
+                country='US',
+                current_level=Tournament.USER_LEVEL_REQUIREMENT,
+                coins=Tournament.ENTRY_FEE
+            )
+            UserTournamentGroup.enter_tournament(self.user, self.tournament).update_score(i)
+
+        self.client.force_authenticate(user=self.user)
+        self.expected = [{'user': f'test{i}', 'country': 'US', 'score': i} for i in range(24, -1, -1)]
+
+    def test_global_leaderboard(self):
+        response = self.client.get(reverse('global-leaderboard'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(response.content), self.expected)
+
+    @override_settings(JSON_STREAM_CHUNK_SIZE=10)
+    def test_streamed_country_leaderboard(self):
+        response = self.client.get(reverse('country-leaderboard'))
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), self.expected)
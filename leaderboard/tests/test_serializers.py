@@ -1,6 +1,6 @@
 from django.test import TestCase
 
-from leaderboard.serializers import LeaderboardSerializer
+from leaderboard.serializers import LeaderboardSerializer, serialize_leaderboard
 from tournament.models import UserTournamentGroup, Tournament, TournamentGroup
 from user.models import User
 
@@ -18,3 +18,17 @@ class LeaderboardSerializerTest(TestCase):
             'country': user.country,
             'score': user_tournament_group.score
         })
+
+    def test_serialize_leaderboard_matches_serializer(self):
+        tournament = Tournament.objects.create(date="2021-01-01")
+        tournament_group = TournamentGroup.objects.create(tournament=tournament)
+        for i, country in enumerate(["US", "TR", "DE"]):
+            user = User.objects.create(username=f"testuser{i}", country=country, password="testpassword")
+            UserTournamentGroup.objects.create(user=user, group=tournament_group, score=i * 10)
+
+        user_tournament_groups = UserTournamentGroup.objects.filter(group=tournament_group).order_by('-score')
+
+        with self.assertNumQueries(1):
+            rows = serialize_leaderboard(user_tournament_groups)
+
+        self.assertEqual(rows, LeaderboardSerializer(user_tournament_groups, many=True).data)
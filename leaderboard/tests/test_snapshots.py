@@ -0,0 +1,96 @@
+import os
+import tempfile
+
+from django.core.cache import caches
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tournament.current import current_tournament
+from tournament.membership import membership_cache
+from tournament.models import Tournament, UserTournamentGroup
+from user.models import User
+
+
+# A file based cache stands in for a cache shared by the workers, e.g. Redis.
+SHARED_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'goodblast-test-snapshots'),
+    },
+}
+
+
+@override_settings(CACHES=SHARED_CACHES, LEADERBOARD_SNAPSHOT_CACHE='shared')
+class GroupLeaderboardSnapshotTest(TransactionTestCase):
+    def setUp(self):
+        self._clear_caches()
+        self.tournament = Tournament.objects.create(date=timezone.now().date())
+        self.entries = []
+        for i in range(5):
+            user = User.objects.create(
+                username=f'test{i}',
+                country='US',
+                current_level=Tournament.USER_LEVEL_REQUIREMENT,
+                coins=Tournament.ENTRY_FEE
+            )
+            self.entries.append(UserTournamentGroup.enter_tournament(user, self.tournament))
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=user)
+        self.url = reverse('group-leaderboard')
+
+    def tearDown(self):
+        self._clear_caches()
+
+    @staticmethod
+    def _clear_caches():
+        current_tournament.clear()
+        membership_cache.clear()
+        for cache in caches.all():
+            cache.clear()
+
+    def test_not_modified_without_reads(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_snapshot_is_served_until_a_score_changes(self):
+        first = self.client.get(self.url)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+
+        self.assertEqual(cached.data, first.data)
+        self.assertEqual(cached['ETag'], first['ETag'])
+
+        self.entries[0].update_score(10)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(response.data[0], {'user': 'test0', 'country': 'US', 'score': 10})
+
+    @override_settings(LEADERBOARD_SNAPSHOT_CACHE='default')
+    def test_process_local_cache_reads_versions_from_the_database(self):
+        first = self.client.get(self.url)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Written by another worker, whose version bumps this process never sees.
+        UserTournamentGroup.objects.filter(pk=self.entries[0].pk).update(score=10)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(response.data[0], {'user': 'test0', 'country': 'US', 'score': 10})
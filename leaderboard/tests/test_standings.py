@@ -0,0 +1,164 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from leaderboard.models import CountryStanding
+from leaderboard.standings import country_standings
+from tournament.models import Tournament, UserTournamentGroup
+from user.models import User
+
+COUNTRIES = ('TR', 'US', 'DE')
+
+
+class CountryStandingTestMixin:
+    def create_entries(self, count):
+        self.enter_and_score(count)
+        country_standings.flush()
+
+    def enter_and_score(self, count):
+        self.tournament = Tournament.objects.create(date=timezone.now().date())
+        self.entries = []
+
+        # The flusher of an earlier test runs on its own connection, which does not see this test's data, and
+        # would drop the buffered changes; the test flushes them itself.
+        country_standings._flusher.stop()
+        with mock.patch.object(country_standings._flusher, 'start'):
+            with self.captureOnCommitCallbacks(execute=True):
+                for i in range(count):
+                    user = User.objects.create(
+                        username=f'test{i}',
+                        country=COUNTRIES[i % len(COUNTRIES)],
+                        current_level=Tournament.USER_LEVEL_REQUIREMENT,
+                        coins=Tournament.ENTRY_FEE
+                    )
+                    self.entries.append(UserTournamentGroup.enter_tournament(user, self.tournament))
+
+            with self.captureOnCommitCallbacks(execute=True):
+                for i, entry in enumerate(self.entries):
+                    for _ in range(i % 4):
+                        entry.update_score(i)
+
+    def expected_standings(self, size):
+        standings = {}
+        for country in COUNTRIES:
+            entries = sorted(
+                UserTournamentGroup.objects.filter(tournament=self.tournament, country=country),
+                key=lambda entry: (entry.score, entry.user_id),
+                reverse=True
+            )
+            standings[country] = (
+                len(entries),
+                sum(entry.score for entry in entries),
+                [[entry.user_id, entry.score] for entry in entries[:size]]
+            )
+
+        return standings
+
+    def standings(self):
+        return {
+            standing.country.code: (standing.player_count, standing.total_score, standing.top_members)
+            for standing in CountryStanding.objects.filter(tournament=self.tournament)
+        }
+
+
+@override_settings(COUNTRY_STANDING_SIZE=5)
+class CountryStandingTest(CountryStandingTestMixin, TestCase):
+    def test_follows_entries_and_scores(self):
+        self.create_entries(30)
+
+        self.assertEqual(self.standings(), self.expected_standings(5))
+
+    def test_buffered_changes_are_merged(self):
+        self.enter_and_score(30)
+
+        self.assertFalse(CountryStanding.objects.exists())
+        with self.assertNumQueries(1):
+            self.assertEqual(country_standings.flush(), len(COUNTRIES))
+
+        self.assertEqual(self.standings(), self.expected_standings(5))
+
+    @override_settings(COUNTRY_STANDING_FLUSH_INTERVAL_MS=0)
+    def test_written_on_every_change(self):
+        self.enter_and_score(30)
+
+        self.assertEqual(len(country_standings), 0)
+        self.assertEqual(self.standings(), self.expected_standings(5))
+
+    @override_settings(COUNTRY_STANDING_FLUSH_INTERVAL_MS=0)
+    def test_bulk_entry_is_written_once(self):
+        self.tournament = Tournament.objects.create(date=timezone.now().date())
+        user_ids = [
+            User.objects.create(
+                username=f'test{i}',
+                country=COUNTRIES[i % len(COUNTRIES)],
+                current_level=Tournament.USER_LEVEL_REQUIREMENT,
+                coins=Tournament.ENTRY_FEE
+            ).id
+            for i in range(30)
+        ]
+
+        with mock.patch.object(country_standings, '_write', wraps=country_standings._write) as write:
+            with self.captureOnCommitCallbacks(execute=True):
+                UserTournamentGroup.bulk_enter_tournament(user_ids, self.tournament)
+
+        self.assertEqual(write.call_count, 1)
+        self.assertEqual(self.standings(), self.expected_standings(5))
+
+    def test_rebuild(self):
+        self.create_entries(30)
+        CountryStanding.objects.update(player_count=0, total_score=0, top_members=[])
+
+        CountryStanding.rebuild(self.tournament.id)
+
+        self.assertEqual(self.standings(), self.expected_standings(5))
+
+    def test_top_needs_enough_members(self):
+        self.create_entries(30)
+
+        top_members = [tuple(member) for member in self.standings()['TR'][2]]
+
+        self.assertEqual(CountryStanding.top(self.tournament.id, 'TR', 3), top_members[:3])
+        self.assertIsNone(CountryStanding.top(self.tournament.id, 'TR', 6))
+        self.assertIsNone(CountryStanding.top(self.tournament.id, 'FR', 3))
+
+
+class CountryStandingViewTest(CountryStandingTestMixin, APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.create_entries(12)
+        self.user = self.entries[0].user
+        self.client.force_authenticate(user=self.user)
+
+    def test_country_leaderboard(self):
+        expected = [
+            {'user': entry.user.username, 'country': 'TR', 'score': entry.score}
+            for entry in sorted(
+                (entry for entry in self.entries if entry.country == 'TR'),
+                key=lambda entry: (entry.score, entry.user_id),
+                reverse=True
+            )
+        ]
+
+        # Tournament lookup, the standing and the users.
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('country-leaderboard'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, expected)
+
+    def test_country_ranking(self):
+        response = self.client.get(reverse('country-ranking'))
+
+        expected = sorted(
+            (
+                {'country': country, 'players': player_count, 'score': total_score}
+                for country, (player_count, total_score, _) in self.expected_standings(0).items()
+            ),
+            key=lambda standing: (-standing['score'], standing['country'])
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, expected)
@@ -7,7 +7,8 @@ from django_countries import countries
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 
-from leaderboard.views import RESULT_LIMIT
+from leaderboard.models import CountryStanding
+from leaderboard.serializers import RESULT_LIMIT
 from tournament.models import Tournament, UserTournamentGroup, TournamentGroup
 from user.models import User
 
@@ -35,6 +36,8 @@ class LeaderboardViewTest(APITestCase):
             user_tournament_group = UserTournamentGroup.enter_tournament(cls.user, cls.tournament)
             user_tournament_group.update_score(random.randint(1, 350))
 
+        CountryStanding.rebuild(cls.tournament.id)
+
     def setUp(self) -> None:
         self.client = APIClient()
 
@@ -50,6 +53,54 @@ class GlobalLeaderboardViewTest(LeaderboardViewTest):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(len(response.data) <= RESULT_LIMIT)
 
+    def test_query_count_does_not_grow_with_results(self):
+        self.client.force_authenticate(user=self.user)
+
+        # Tournament lookup and the leaderboard rows.
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('global-leaderboard'))
+
+        self.assertEqual(len(response.data), RESULT_LIMIT)
+
+    def _ordered_usernames(self):
+        return list(
+            UserTournamentGroup.objects
+            .filter(tournament=self.tournament)
+            .order_by('-score', '-user_id')
+            .values_list('user__username', flat=True)
+        )
+
+    def test_pages_follow_cursor(self):
+        self.client.force_authenticate(user=self.user)
+
+        usernames = []
+        url = f"{reverse('global-leaderboard')}?limit=300"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data), 300)
+            usernames.extend(row['user'] for row in response.data)
+            url = response.headers.get('Link', '').partition('<')[2].partition('>')[0]
+
+        self.assertEqual(usernames, self._ordered_usernames())
+
+    def test_around_me(self):
+        self.client.force_authenticate(user=self.user)
+        ordered = self._ordered_usernames()
+        position = ordered.index(self.user.username)
+
+        response = self.client.get(reverse('global-leaderboard'), {'around': 'me', 'k': 5})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['user'] for row in response.data], ordered[max(position - 5, 0):position + 6])
+
+    def test_invalid_page_parameters(self):
+        self.client.force_authenticate(user=self.user)
+
+        for parameters in ({'cursor': 'invalid'}, {'limit': RESULT_LIMIT + 1}, {'around': 'me', 'cursor': 'MTox'}):
+            response = self.client.get(reverse('global-leaderboard'), parameters)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, parameters)
+
     @patch('tournament.models.Tournament.get_current_tournament')
     def test_no_users(self, mock_tournament):
         self.client.force_authenticate(user=self.user)
@@ -77,6 +128,13 @@ class CountryLeaderboard(LeaderboardViewTest):
         self.assertTrue(self.user.country in distinct_countries)
         self.assertTrue(len(response.data) <= RESULT_LIMIT)
 
+    def test_query_count_does_not_grow_with_results(self):
+        self.client.force_authenticate(user=self.user)
+
+        # Tournament lookup, the country standing and its users.
+        with self.assertNumQueries(3):
+            self.client.get(reverse('country-leaderboard'))
+
     @patch('tournament.models.Tournament.get_current_tournament')
     def test_no_users(self, mock_tournament):
         self.client.force_authenticate(user=self.user)
@@ -3,13 +3,17 @@ from django.urls import path
 from leaderboard.views import (
     GlobalLeaderboard,
     CountryLeaderboard,
+    CountryRanking,
     GroupLeaderboard,
+    LiveGroupLeaderboard,
     UserGroupRank
 )
 
 urlpatterns = [
     path('global', GlobalLeaderboard.as_view(), name='global-leaderboard'),
     path('country', CountryLeaderboard.as_view(), name='country-leaderboard'),
+    path('countries', CountryRanking.as_view(), name='country-ranking'),
     path('group', GroupLeaderboard.as_view(), name='group-leaderboard'),
+    path('live', LiveGroupLeaderboard.as_view(), name='live-group-leaderboard'),
     path('rank', UserGroupRank.as_view(), name='user-group-rank'),
 ]
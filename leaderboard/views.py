@@ -1,84 +1,293 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.http import parse_etags
+from django.views import View
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from rest_framework.views import APIView
 
-from leaderboard.serializers import LeaderboardSerializer
+from GoodBlast.db import filter_row
+from GoodBlast.renderers import FastRenderingMixin, stream_json_list
+from leaderboard.engine import get_engine
+from leaderboard.live import authenticate, event_stream, get_live_group, get_token, live_events, snapshot_event
+from leaderboard.models import CountryStanding
+from leaderboard.serializers import (
+    LEADERBOARD_FIELDS,
+    LeaderboardPageSerializer,
+    encode_cursor,
+    serialize_leaderboard_rows,
+    serialize_ranked_users
+)
+from leaderboard.snapshots import group_snapshots
+from tournament.buffer import score_buffer
+from tournament.membership import membership_cache
 from tournament.models import UserTournamentGroup, Tournament
 
-RESULT_LIMIT = 1000
 
-
-class GlobalLeaderboard(APIView):
+class RankedLeaderboard(FastRenderingMixin, APIView):
+    """
+    Tournament wide leaderboard in (score, user) order. A page continues after
+    the opaque cursor of the previous page's last row, given in its Link
+    header, and around=me returns the k entries above and below the caller.
+    Both are read from one index range, never with an OFFSET.
+    """
     permission_classes = [IsAuthenticated, ]
+    KEY_FIELDS = ('score', 'user_id')
+
+    def get_country(self, request):
+        return None
+
+    def get_queryset(self, tournament, country):
+        queryset = UserTournamentGroup.objects.filter(tournament=tournament)
+        if country is not None:
+            queryset = queryset.filter(country=country)
+
+        return queryset.values_list(*LEADERBOARD_FIELDS)
 
     def get(self, request, *args, **kwargs):
-        tournament = Tournament.get_current_tournament()
-        groups = tournament.groups.all()
-        scores = UserTournamentGroup.objects.filter(group__in=groups).order_by('-score')[:RESULT_LIMIT]
+        serializer = LeaderboardPageSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        page = serializer.validated_data
 
-        if not scores:
+        tournament = Tournament.get_current_tournament()
+        if tournament is None:
             return Response({
-                "message": "No users found in the active tournament."
+                "message": "There is no active tournament."
             }, status=status.HTTP_404_NOT_FOUND)
 
-        return Response(LeaderboardSerializer(scores, many=True).data, status=status.HTTP_200_OK)
+        country = self.get_country(request)
+
+        if 'around' in page:
+            scores, next_key = self.read_around(tournament, country, request.user, page['k'])
+            if scores is None:
+                return Response({
+                    "message": "You are not in the active tournament."
+                }, status=status.HTTP_404_NOT_FOUND)
+        else:
+            scores, next_key = self.read_page(tournament, country, page['limit'], page.get('cursor'))
+            if not scores and 'cursor' not in page:
+                return Response({
+                    "message": "No users found in the active tournament."
+                }, status=status.HTTP_404_NOT_FOUND)
+
+        headers = {}
+        if next_key is not None:
+            headers["Link"] = f'<{self.next_url(request, next_key)}>; rel="next"'
+
+        if settings.JSON_STREAM_CHUNK_SIZE:
+            return stream_json_list(scores, headers=headers)
+
+        return Response(scores, status=status.HTTP_200_OK, headers=headers)
+
+    def read_page(self, tournament, country, limit, cursor):
+        engine = get_engine()
+
+        if engine is not None:
+            if cursor is None:
+                entries = engine.top(tournament.id, limit, country=country)
+            else:
+                entries = engine.top_after(tournament.id, limit, *cursor, country=country)
+
+            next_key = (entries[-1][1], entries[-1][0]) if len(entries) == limit else None
+            return serialize_ranked_users(entries), next_key
+
+        queryset = self.get_queryset(tournament, country)
+        if cursor is not None:
+            queryset = filter_row(queryset, self.KEY_FIELDS, '<', cursor)
+
+        rows = list(queryset.order_by('-score', '-user_id')[:limit])
+
+        next_key = (rows[-1][4], rows[-1][1]) if len(rows) == limit else None
+        return serialize_leaderboard_rows(rows), next_key
+
+    def read_around(self, tournament, country, user, k):
+        engine = get_engine()
+
+        if engine is not None:
+            rank = engine.rank(tournament.id, user.pk, country=country)
+            if rank is None:
+                return None, None
+
+            start = max(rank - k, 0)
+            count = rank - start + k + 1
+            entries = engine.top(tournament.id, count, country=country, offset=start)
+
+            next_key = (entries[-1][1], entries[-1][0]) if len(entries) == count else None
+            return serialize_ranked_users(entries), next_key
+
+        user_tournament_group_id, _ = membership_cache.get(user.pk, tournament)
+        score = None
+        if user_tournament_group_id is not None:
+            score = UserTournamentGroup.objects\
+                .filter(pk=user_tournament_group_id)\
+                .values_list('score', flat=True)\
+                .first()
+
+        if score is None:
+            return None, None
+
+        queryset = self.get_queryset(tournament, country)
+        above = filter_row(queryset, self.KEY_FIELDS, '>', (score, user.pk))\
+            .order_by('score', 'user_id')[:k]
+        below = filter_row(queryset, self.KEY_FIELDS, '<=', (score, user.pk))\
+            .order_by('-score', '-user_id')[:k + 1]
+
+        rows = sorted(above.union(below, all=True), key=lambda row: (-row[4], -row[1]))
+
+        below_count = sum((row[4], row[1]) <= (score, user.pk) for row in rows)
+        next_key = (rows[-1][4], rows[-1][1]) if below_count == k + 1 else None
+        return serialize_leaderboard_rows(rows), next_key
 
+    @staticmethod
+    def next_url(request, key):
+        url = request.build_absolute_uri()
+        for parameter in ('around', 'k'):
+            url = remove_query_param(url, parameter)
 
-class CountryLeaderboard(APIView):
+        return replace_query_param(url, 'cursor', encode_cursor(*key))
+
+
+class GlobalLeaderboard(RankedLeaderboard):
+    pass
+
+
+class CountryLeaderboard(RankedLeaderboard):
+    def get_country(self, request):
+        return request.user.country
+
+    def read_page(self, tournament, country, limit, cursor):
+        if cursor is None and get_engine() is None:
+            entries = CountryStanding.top(tournament.id, country, limit)
+            if entries is not None:
+                next_key = (entries[-1][1], entries[-1][0]) if len(entries) == limit else None
+                return serialize_ranked_users(entries), next_key
+
+        return super().read_page(tournament, country, limit, cursor)
+
+
+class CountryRanking(FastRenderingMixin, APIView):
     permission_classes = [IsAuthenticated, ]
 
     def get(self, request, *args, **kwargs):
         tournament = Tournament.get_current_tournament()
-        groups = tournament.groups.all()
-        scores = UserTournamentGroup.objects.filter(
-            group__in=groups,
-            user__country=request.user.country
-        ).order_by('-score')[:RESULT_LIMIT]
+        if tournament is None:
+            return Response({
+                "message": "There is no active tournament."
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        standings = [
+            {
+                'country': country,
+                'players': player_count,
+                'score': total_score
+            }
+            for country, player_count, total_score in CountryStanding.objects
+            .filter(tournament=tournament)
+            .order_by('-total_score', 'country')
+            .values_list('country', 'player_count', 'total_score')
+        ]
 
-        if not scores:
+        if not standings:
             return Response({
                 "message": "No users found in the active tournament."
             }, status=status.HTTP_404_NOT_FOUND)
 
-        return Response(LeaderboardSerializer(scores, many=True).data, status=status.HTTP_200_OK)
+        return Response(standings, status=status.HTTP_200_OK)
 
 
-class GroupLeaderboard(APIView):
+class GroupLeaderboard(FastRenderingMixin, APIView):
     permission_classes = [IsAuthenticated, ]
 
     def get(self, request, *args, **kwargs):
         tournament = Tournament.get_current_tournament()
-        try:
-            user_tournament_group = UserTournamentGroup.objects.get(user=request.user, group__tournament=tournament)
-        except UserTournamentGroup.DoesNotExist:
+        if tournament is None:
+            return Response({
+                "message": "There is no active tournament."
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        _, group_id = membership_cache.get(request.user.pk, tournament)
+        if group_id is None:
             return Response({
                 "message": "You are not in an active tournament group."
             }, status=status.HTTP_404_NOT_FOUND)
 
-        scores = UserTournamentGroup.objects.filter(group=user_tournament_group.group).order_by('-score')
+        version = group_snapshots.version(group_id)
+        headers = {"ETag": group_snapshots.etag(group_id, version)}
 
-        return Response(LeaderboardSerializer(scores, many=True).data, status=status.HTTP_200_OK)
+        if_none_match = [etag.removeprefix('W/') for etag in parse_etags(request.headers.get('If-None-Match', ''))]
+        if headers["ETag"] in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
 
+        scores = group_snapshots.get_or_build(group_id, version)
 
-class UserGroupRank(APIView):
+        return Response(scores, status=status.HTTP_200_OK, headers=headers)
+
+
+class UserGroupRank(FastRenderingMixin, APIView):
     permission_classes = [IsAuthenticated, ]
 
     def get(self, request, *args, **kwargs):
         tournament = Tournament.get_current_tournament()
+        if tournament is None:
+            return Response({
+                "message": "There is no active tournament."
+            }, status=status.HTTP_404_NOT_FOUND)
 
-        try:
-            user_tournament_group = UserTournamentGroup.objects.get(user=request.user, group__tournament=tournament)
-        except UserTournamentGroup.DoesNotExist:
+        user_tournament_group_id, _ = membership_cache.get(request.user.pk, tournament)
+        user_tournament_group = None
+        if user_tournament_group_id is not None:
+            user_tournament_group = UserTournamentGroup.objects\
+                .only('group_id', 'score', 'final_rank')\
+                .filter(pk=user_tournament_group_id)\
+                .first()
+
+        if user_tournament_group is None:
             return Response({
                 "message": "You are not in an active tournament group."
             }, status=status.HTTP_404_NOT_FOUND)
 
-        rank = UserTournamentGroup.objects.filter(
-            group=user_tournament_group.group,
-            score__gte=user_tournament_group.score
-        ).distinct('score').count()
+        score_buffer.apply_pending([user_tournament_group])
+        rank = user_tournament_group.get_rank()
 
         return Response({
             "rank": rank
         }, status=status.HTTP_200_OK)
+
+
+class LiveGroupLeaderboard(View):
+    """
+    Server-sent events of the user's group leaderboard and rank, see
+    leaderboard.live. Events are streamed under ASGI only: WSGI servers read
+    a streamed response to its end while holding a worker, so there the
+    response is a single snapshot and the client polls by reconnecting.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        token = get_token(request.headers, request.META.get('QUERY_STRING', ''))
+        user = await sync_to_async(authenticate)(token) if token else None
+        if user is None:
+            return JsonResponse({
+                "message": "Authentication credentials were not provided or are invalid."
+            }, status=status.HTTP_401_UNAUTHORIZED)
+
+        group_id = await sync_to_async(get_live_group)(user)
+        if group_id is None:
+            return JsonResponse({
+                "message": "You are not in an active tournament group."
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        if not isinstance(request, ASGIRequest):
+            return HttpResponse(await snapshot_event(user, group_id), content_type='text/event-stream', headers=headers)
+
+        return StreamingHttpResponse(
+            event_stream(live_events(user, group_id)),
+            content_type='text/event-stream',
+            headers=headers
+        )
@@ -0,0 +1,166 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from GoodBlast.threads import BackgroundThread
+
+logger = logging.getLogger(__name__)
+
+
+class ScoreBuffer:
+    """
+    Per-process write-behind buffer of tournament score increments.
+
+    Increments are merged per UserTournamentGroup id and written with a single
+    UPDATE ... FROM (VALUES ...) every SCORE_BUFFER_FLUSH_INTERVAL_MS, or as soon
+    as SCORE_BUFFER_MAX_ENTRIES increments are waiting. A crash can therefore
+    lose at most one interval and never more than SCORE_BUFFER_MAX_ENTRIES
+    increments; a normal interpreter exit flushes whatever is left.
+
+    Batches are only written by the flusher thread on its own connection, so
+    a caller's transaction rolling back never takes other users' increments
+    with it. A batch being written stays visible to pending_for until its
+    UPDATE has committed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flushed = threading.Condition(self._lock)
+        self._pending = {}
+        self._in_flight = {}
+        self._entries = 0
+        self._requested = 0
+        self._served = 0
+        self._result = (0, None)
+        self._flusher = BackgroundThread(self._run_flusher, 'score-buffer-flusher')
+
+    def __len__(self):
+        return self._entries
+
+    def add(self, user_tournament_group_id, amount):
+        self._flusher.start()
+
+        if self._entries >= settings.SCORE_BUFFER_MAX_ENTRIES:
+            # Raises while the database is unreachable, which keeps the buffer bounded.
+            self.flush()
+
+        with self._lock:
+            self._pending[user_tournament_group_id] = self._pending.get(user_tournament_group_id, 0) + amount
+            self._entries += 1
+
+    def pending_for(self, user_tournament_group_ids):
+        with self._lock:
+            return {
+                user_tournament_group_id:
+                    self._pending.get(user_tournament_group_id, 0) + self._in_flight.get(user_tournament_group_id, 0)
+                for user_tournament_group_id in user_tournament_group_ids
+                if user_tournament_group_id in self._pending or user_tournament_group_id in self._in_flight
+            }
+
+    def apply_pending(self, user_tournament_groups):
+        pending = self.pending_for([user_tournament_group.pk for user_tournament_group in user_tournament_groups])
+        for user_tournament_group in user_tournament_groups:
+            user_tournament_group.score += pending.get(user_tournament_group.pk, 0)
+
+        return sorted(user_tournament_groups, key=lambda user_tournament_group: -user_tournament_group.score)
+
+    def flush(self):
+        """
+        Has the flusher write every increment buffered so far and waits for
+        it. Returns the number of rows written, or raises the error of the
+        failed write.
+        """
+        with self._lock:
+            if not self._pending and not self._in_flight:
+                return 0
+
+            self._requested += 1
+            request = self._requested
+
+        self._flusher.start()
+        self._flusher.wake()
+
+        with self._flushed:
+            while self._served < request:
+                if not self._flushed.wait(settings.SCORE_BUFFER_FLUSH_INTERVAL_MS / 1000) \
+                        and not self._flusher.is_alive():
+                    raise RuntimeError("The score buffer flusher is not running.")
+
+            written, error = self._result
+
+        if error is not None:
+            raise error
+
+        return written
+
+    def stop(self):
+        """
+        Stops the flusher of this process after it has written what is left.
+        """
+        self._flusher.stop()
+
+    def _flush_batch(self):
+        with self._lock:
+            request = self._requested
+            batch, self._pending = self._pending, {}
+            entries, self._entries = self._entries, 0
+            self._in_flight = batch
+
+        error = None
+        if batch:
+            try:
+                self._write(batch)
+            except Exception as exception:
+                error = exception
+
+        with self._lock:
+            self._in_flight = {}
+            if error is not None:
+                for user_tournament_group_id, amount in batch.items():
+                    self._pending[user_tournament_group_id] = self._pending.get(user_tournament_group_id, 0) + amount
+                self._entries += entries
+
+            self._served = request
+            self._result = (len(batch), error)
+            self._flushed.notify_all()
+
+        if error is not None:
+            raise error
+
+    @staticmethod
+    def _write(batch):
+        from tournament.models import UserTournamentGroup
+
+        table = connection.ops.quote_name(UserTournamentGroup._meta.db_table)
+        values = ", ".join(["(%s, %s)"] * len(batch))
+        params = [value for item in batch.items() for value in item]
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE {table} AS user_group
+                SET score = user_group.score + pending.amount
+                FROM (VALUES {values}) AS pending (id, amount)
+                WHERE user_group.id = pending.id
+            """, params)
+
+    def _run_flusher(self):
+        try:
+            while True:
+                stopped = self._flusher.wait(settings.SCORE_BUFFER_FLUSH_INTERVAL_MS / 1000)
+
+                close_old_connections()
+                try:
+                    self._flush_batch()
+                except Exception:
+                    logger.exception("Could not flush %s buffered score increments.", len(self))
+
+                if stopped:
+                    return
+        finally:
+            connection.close()
+
+
+score_buffer = ScoreBuffer()
+
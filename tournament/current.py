@@ -0,0 +1,101 @@
+import copy
+import threading
+import time
+from datetime import datetime, time as datetime_time, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+MISSING = object()
+
+
+class CurrentTournamentCache:
+    """
+    Tournament of each UTC date, cached per process and optionally in the
+    CURRENT_TOURNAMENT_SHARED_CACHE cache alias shared by all workers.
+
+    Entries are keyed on the date, so they stop being used at midnight, and a
+    missing tournament is only remembered for CURRENT_TOURNAMENT_MISS_TTL
+    seconds. Saving or deleting a tournament drops its date. Reads inside an
+    atomic block go straight to the database, as the transaction may still
+    roll back rows they would cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, date):
+        from tournament.models import Tournament
+
+        if connection.in_atomic_block:
+            return Tournament.objects.filter(date=date).first()
+
+        key = str(date)
+        with self._lock:
+            tournament, expires_at = self._entries.get(key, (MISSING, 0))
+
+        if tournament is MISSING or expires_at <= time.monotonic():
+            tournament = self._get_shared(key)
+            if tournament is MISSING:
+                tournament = Tournament.objects.filter(date=date).first()
+                self._set_shared(key, tournament, date)
+
+            with self._lock:
+                # Entries of passed dates are never read again.
+                self._entries = {key: (tournament, time.monotonic() + self._timeout(tournament, date))}
+
+        return copy.copy(tournament)
+
+    def invalidate(self, date):
+        key = str(date)
+        with self._lock:
+            self._entries.pop(key, None)
+
+        if settings.CURRENT_TOURNAMENT_SHARED_CACHE:
+            caches[settings.CURRENT_TOURNAMENT_SHARED_CACHE].delete(self._shared_key(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+
+    @staticmethod
+    def _timeout(tournament, date):
+        if tournament is None:
+            return settings.CURRENT_TOURNAMENT_MISS_TTL
+
+        midnight = timezone.make_aware(datetime.combine(date + timedelta(days=1), datetime_time.min))
+        return max((midnight - timezone.now()).total_seconds(), 1)
+
+    @staticmethod
+    def _shared_key(key):
+        return f'tournament:current:{key}'
+
+    def _get_shared(self, key):
+        if not settings.CURRENT_TOURNAMENT_SHARED_CACHE:
+            return MISSING
+
+        return caches[settings.CURRENT_TOURNAMENT_SHARED_CACHE].get(self._shared_key(key), MISSING)
+
+    def _set_shared(self, key, tournament, date):
+        if settings.CURRENT_TOURNAMENT_SHARED_CACHE:
+            caches[settings.CURRENT_TOURNAMENT_SHARED_CACHE].set(
+                self._shared_key(key),
+                tournament,
+                self._timeout(tournament, date)
+            )
+
+
+current_tournament = CurrentTournamentCache()
+
+
+@receiver(post_save, sender='tournament.Tournament')
+@receiver(post_delete, sender='tournament.Tournament')
+def invalidate_current_tournament(sender, instance, **kwargs):
+    current_tournament.invalidate(instance.date)
+    # Again after commit, in case another request cached the date before the change was visible.
+    transaction.on_commit(lambda: current_tournament.invalidate(instance.date))
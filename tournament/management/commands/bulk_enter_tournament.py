@@ -0,0 +1,56 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tournament.models import Tournament, UserTournamentGroup
+
+
+class Command(BaseCommand):
+    help = "Enters the given users into the current tournament, reading one user id per line."
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', nargs='?', help="File of user ids, read from stdin when omitted.")
+        parser.add_argument('--tournament', type=int, help="Tournament id, defaults to the current tournament.")
+        parser.add_argument('--batch-size', type=int, default=UserTournamentGroup.BULK_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['tournament'] is None:
+            tournament = Tournament.get_current_tournament()
+            if tournament is None:
+                raise CommandError("There is no tournament today.")
+        else:
+            try:
+                tournament = Tournament.objects.get(pk=options['tournament'])
+            except Tournament.DoesNotExist:
+                raise CommandError(f"Tournament {options['tournament']} does not exist.")
+
+        if options['file']:
+            with open(options['file']) as file:
+                user_ids = self._read_ids(file)
+        else:
+            user_ids = self._read_ids(sys.stdin)
+
+        batch_size = options['batch_size']
+        entered = 0
+        rejected = {}
+        for start in range(0, len(user_ids), batch_size):
+            entries, batch_rejected = UserTournamentGroup.bulk_enter_tournament(
+                user_ids[start:start + batch_size],
+                tournament
+            )
+            entered += len(entries)
+            rejected.update(batch_rejected)
+
+        for user_id, reason in sorted(rejected.items()):
+            self.stderr.write(f"{user_id}: {reason}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Entered {entered} users into tournament {tournament.id}, rejected {len(rejected)}."
+        ))
+
+    @staticmethod
+    def _read_ids(lines):
+        try:
+            return list(dict.fromkeys(int(line) for line in lines if line.strip()))
+        except ValueError as error:
+            raise CommandError(f"Invalid user id: {error}")
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from tournament.queue import entry_queue
+
+
+class Command(BaseCommand):
+    help = "Assigns groups to queued tournament entries, continuously unless --once is given."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain the queue once and exit.")
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options['once']:
+            processed = entry_queue.drain(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} queued entries."))
+            return
+
+        entry_queue.run(options['batch_size'])
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from tournament.scheduler import tournament_scheduler
+
+
+class Command(BaseCommand):
+    help = "Runs the tournament scheduler, taking over as leader whenever no other process holds the lock."
+
+    def handle(self, *args, **options):
+        try:
+            tournament_scheduler.run()
+        except KeyboardInterrupt:
+            tournament_scheduler.stop()
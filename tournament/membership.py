@@ -0,0 +1,127 @@
+import threading
+from datetime import datetime, time as datetime_time
+
+from cachetools import TTLCache
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from tournament.signals import tournament_entered
+
+NOT_ENTERED = (None, None)
+
+
+class MembershipCache:
+    """
+    (user_id, tournament_id) -> (user_tournament_group_id, group_id) of the
+    user's entry, or NOT_ENTERED.
+
+    Entries are kept per process and, when MEMBERSHIP_SHARED_CACHE names a
+    cache alias, shared by all workers. An entry made in one worker is only
+    seen by the others through the shared tier, so without it "not entered"
+    is cached locally only once the tournament's entry hour has passed.
+    Reads inside an atomic block go straight to the database.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self._lock = threading.Lock()
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, user_id, tournament):
+        if connection.in_atomic_block:
+            return self._load(user_id, tournament.id)
+
+        key = (user_id, tournament.id)
+        with self._lock:
+            membership = self._entries.get(key)
+
+        if membership is None:
+            membership = self._get_shared(key)
+
+        if membership is None:
+            membership = self._load(user_id, tournament.id)
+            self._set_shared(key, membership)
+
+            if membership != NOT_ENTERED or self._entry_closed(tournament):
+                with self._lock:
+                    self._entries[key] = membership
+
+        return membership
+
+    def add(self, user_id, tournament_id, user_tournament_group_id, group_id):
+        key = (user_id, tournament_id)
+        membership = (user_tournament_group_id, group_id)
+        with self._lock:
+            self._entries[key] = membership
+
+        self._set_shared(key, membership)
+
+    def invalidate(self, user_id, tournament_id):
+        key = (user_id, tournament_id)
+        with self._lock:
+            self._entries.pop(key, None)
+
+        if settings.MEMBERSHIP_SHARED_CACHE:
+            caches[settings.MEMBERSHIP_SHARED_CACHE].delete(self._shared_key(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @staticmethod
+    def _load(user_id, tournament_id):
+        from tournament.models import UserTournamentGroup
+
+        membership = UserTournamentGroup.objects\
+            .filter(user_id=user_id, tournament_id=tournament_id)\
+            .values_list('id', 'group_id')\
+            .first()
+
+        return membership or NOT_ENTERED
+
+    @staticmethod
+    def _entry_closed(tournament):
+        from tournament.models import Tournament
+
+        entry_end = timezone.make_aware(
+            datetime.combine(tournament.date, datetime_time(hour=Tournament.ENTRY_END_HOUR))
+        )
+        return timezone.now() >= entry_end
+
+    @staticmethod
+    def _shared_key(key):
+        return 'tournament:membership:{}:{}'.format(*key)
+
+    def _get_shared(self, key):
+        if not settings.MEMBERSHIP_SHARED_CACHE:
+            return None
+
+        membership = caches[settings.MEMBERSHIP_SHARED_CACHE].get(self._shared_key(key))
+        return tuple(membership) if membership is not None else None
+
+    def _set_shared(self, key, membership):
+        if settings.MEMBERSHIP_SHARED_CACHE:
+            caches[settings.MEMBERSHIP_SHARED_CACHE].set(
+                self._shared_key(key),
+                membership,
+                settings.MEMBERSHIP_CACHE_TTL
+            )
+
+
+membership_cache = MembershipCache(maxsize=settings.MEMBERSHIP_CACHE_SIZE, ttl=settings.MEMBERSHIP_CACHE_TTL)
+
+
+@receiver(tournament_entered)
+def record_membership(sender, tournament_id, group_id, user_id, user_tournament_group_id, **kwargs):
+    transaction.on_commit(
+        lambda: membership_cache.add(user_id, tournament_id, user_tournament_group_id, group_id)
+    )
+
+
+@receiver(post_delete, sender='tournament.UserTournamentGroup')
+def forget_membership(sender, instance, **kwargs):
+    membership_cache.invalidate(instance.user_id, instance.tournament_id)
+    transaction.on_commit(lambda: membership_cache.invalidate(instance.user_id, instance.tournament_id))
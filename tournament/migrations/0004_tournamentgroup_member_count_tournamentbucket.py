@@ -0,0 +1,86 @@
+# Generated by Django 4.2.9 on 2026-10-18 09:54
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def backfill_member_counts(apps, schema_editor):
+    TournamentGroup = apps.get_model("tournament", "TournamentGroup")
+    TournamentBucket = apps.get_model("tournament", "TournamentBucket")
+    UserTournamentGroup = apps.get_model("tournament", "UserTournamentGroup")
+    group_size = 35
+
+    user_counts = (
+        UserTournamentGroup.objects.filter(group=models.OuterRef("pk"))
+        .values("group")
+        .annotate(user_count=models.Count("pk"))
+        .values("user_count")
+    )
+    TournamentGroup.objects.update(
+        member_count=Coalesce(models.Subquery(user_counts), 0)
+    )
+
+    open_groups = (
+        TournamentGroup.objects.filter(
+            tournament__date__gte=timezone.now().date(),
+            member_count__lt=group_size,
+        )
+        .values("tournament_id", "level_bucket")
+        .annotate(open_group_id=models.Max("id"))
+    )
+    TournamentBucket.objects.bulk_create(
+        TournamentBucket(**open_group) for open_group in open_groups
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tournament", "0003_tournamentgroup_level_bucket"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tournamentgroup",
+            name="member_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name="TournamentBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("level_bucket", models.IntegerField()),
+                (
+                    "open_group",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="tournament.tournamentgroup",
+                    ),
+                ),
+                (
+                    "tournament",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="buckets",
+                        to="tournament.tournament",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("tournament", "level_bucket")},
+            },
+        ),
+        migrations.RunPython(backfill_member_counts, migrations.RunPython.noop),
+    ]
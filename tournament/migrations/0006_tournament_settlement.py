@@ -0,0 +1,36 @@
+# Generated by Django 4.2.9 on 2026-10-18 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tournament", "0005_tournamententryticket"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tournament",
+            name="settled",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="usertournamentgroup",
+            name="final_rank",
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name="usertournamentgroup",
+            name="reward_amount",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="usertournamentgroup",
+            index=models.Index(
+                condition=models.Q(("claimed_reward", False), ("reward_amount__gt", 0)),
+                fields=["user"],
+                name="tournament_unclaimed_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.9 on 2026-10-18 10:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_tournaments(apps, schema_editor):
+    TournamentGroup = apps.get_model("tournament", "TournamentGroup")
+    UserTournamentGroup = apps.get_model("tournament", "UserTournamentGroup")
+
+    group_tournaments = TournamentGroup.objects.filter(
+        pk=models.OuterRef("group_id")
+    ).values("tournament_id")
+    UserTournamentGroup.objects.update(tournament=models.Subquery(group_tournaments))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tournament", "0006_tournament_settlement"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="usertournamentgroup",
+            name="tournament",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="entries",
+                to="tournament.tournament",
+            ),
+        ),
+        migrations.RunPython(backfill_tournaments, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="usertournamentgroup",
+            name="tournament",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="entries",
+                to="tournament.tournament",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="tournament",
+            name="date",
+            field=models.DateField(db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name="tournament",
+            index=models.Index(
+                condition=models.Q(("settled", False)),
+                fields=["date"],
+                name="tournament_unsettled_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="usertournamentgroup",
+            index=models.Index(
+                fields=["group", "-score"], name="tournament_utg_group_score_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="usertournamentgroup",
+            index=models.Index(
+                fields=["tournament", "-score"], name="tournament_utg_score_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="usertournamentgroup",
+            index=models.Index(
+                fields=["user", "tournament"], name="tournament_utg_user_idx"
+            ),
+        ),
+    ]
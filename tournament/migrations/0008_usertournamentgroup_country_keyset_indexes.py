@@ -0,0 +1,51 @@
+# Generated by Django 4.2.9 on 2026-10-18 10:31
+
+from django.db import migrations, models
+import django_countries.fields
+
+
+def backfill_countries(apps, schema_editor):
+    User = apps.get_model("user", "User")
+    UserTournamentGroup = apps.get_model("tournament", "UserTournamentGroup")
+
+    user_countries = User.objects.filter(pk=models.OuterRef("user_id")).values("country")
+    UserTournamentGroup.objects.update(country=models.Subquery(user_countries))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tournament", "0007_usertournamentgroup_tournament_indexes"),
+        ("user", "0002_user_country_idx"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="usertournamentgroup",
+            name="tournament_utg_score_idx",
+        ),
+        migrations.AddField(
+            model_name="usertournamentgroup",
+            name="country",
+            field=django_countries.fields.CountryField(max_length=2, null=True),
+        ),
+        migrations.RunPython(backfill_countries, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="usertournamentgroup",
+            name="country",
+            field=django_countries.fields.CountryField(max_length=2),
+        ),
+        migrations.AddIndex(
+            model_name="usertournamentgroup",
+            index=models.Index(
+                fields=["tournament", "-score", "-user"], name="tournament_utg_rank_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="usertournamentgroup",
+            index=models.Index(
+                fields=["tournament", "country", "-score", "-user"],
+                name="tournament_utg_country_idx",
+            ),
+        ),
+    ]
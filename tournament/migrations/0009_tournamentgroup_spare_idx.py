@@ -0,0 +1,21 @@
+# Generated by Django 4.2.9 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tournament", "0008_usertournamentgroup_country_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="tournamentgroup",
+            index=models.Index(
+                condition=models.Q(("member_count", 0)),
+                fields=["tournament", "level_bucket", "id"],
+                name="tournament_group_spare_idx",
+            ),
+        ),
+    ]
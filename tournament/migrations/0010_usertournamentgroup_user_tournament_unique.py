@@ -0,0 +1,54 @@
+# Generated by Django 4.2.9 on 2026-10-18 11:13
+
+from django.db import migrations, models
+
+
+def remove_duplicate_entries(apps, schema_editor):
+    """
+    Entries used to be checked and inserted without a lock, so a user may
+    have entered a tournament twice, in different groups. The first entry is
+    kept with the highest score of the duplicates and the others are removed
+    from their groups.
+    """
+    TournamentGroup = apps.get_model("tournament", "TournamentGroup")
+    UserTournamentGroup = apps.get_model("tournament", "UserTournamentGroup")
+
+    duplicates = UserTournamentGroup.objects\
+        .values("user_id", "tournament_id")\
+        .annotate(entries=models.Count("id"), first_id=models.Min("id"), best_score=models.Max("score"))\
+        .filter(entries__gt=1)\
+        .order_by("first_id")
+
+    for duplicate in duplicates:
+        removed = UserTournamentGroup.objects\
+            .filter(user_id=duplicate["user_id"], tournament_id=duplicate["tournament_id"])\
+            .exclude(pk=duplicate["first_id"])
+
+        for group_id in removed.values_list("group_id", flat=True):
+            TournamentGroup.objects.filter(pk=group_id).update(member_count=models.F("member_count") - 1)
+
+        removed.delete()
+        UserTournamentGroup.objects.filter(pk=duplicate["first_id"]).update(score=duplicate["best_score"])
+
+
+class Migration(migrations.Migration):
+    # The deletes leave deferred foreign key checks pending, which PostgreSQL does not allow before altering the table.
+    atomic = False
+
+    dependencies = [
+        ("tournament", "0009_tournamentgroup_spare_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_entries, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name="usertournamentgroup",
+            name="tournament_utg_user_idx",
+        ),
+        migrations.AddConstraint(
+            model_name="usertournamentgroup",
+            constraint=models.UniqueConstraint(
+                fields=("user", "tournament"), name="tournament_utg_user_uniq"
+            ),
+        ),
+    ]
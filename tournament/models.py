@@ -1,9 +1,22 @@
+import math
+from collections import defaultdict
 from datetime import timedelta
 
-from django.db import models, transaction
-from django.db.models import Window, F, Count
+from django.conf import settings
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Count, Q, Sum, Window, F
 from django.db.models.functions import Rank
 from django.utils import timezone
+from django_countries.fields import CountryField
+
+from GoodBlast.db import update_returning
+from leaderboard.ranking import rank_service
+from tournament.buffer import score_buffer
+from tournament.current import current_tournament
+from tournament.membership import membership_cache
+from tournament.queue import entry_queue
+from tournament.signals import tournament_entered, tournament_bulk_entered, score_updated
+from user.models import User
 
 
 class Tournament(models.Model):
@@ -11,19 +24,77 @@ class Tournament(models.Model):
     USER_LEVEL_REQUIREMENT = 10
     ENTRY_END_HOUR = 12
 
-    date = models.DateField()
+    date = models.DateField(db_index=True)
+    settled = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date'], condition=models.Q(settled=False), name='tournament_unsettled_idx'),
+        ]
 
     @classmethod
     def create_daily_tournament(cls):
         today_utc = timezone.now().date()
         tomorrow_utc = today_utc + timedelta(days=1)
-        tournament = cls(date=tomorrow_utc)
-        tournament.save()
+        tournament, _ = cls.objects.get_or_create(date=tomorrow_utc)
         return tournament
 
     @classmethod
     def get_current_tournament(cls):
-        return cls.objects.get(date=timezone.now().date())
+        """
+        Returns today's tournament, or None if it has not been created.
+        """
+        return current_tournament.get(timezone.now().date())
+
+    @classmethod
+    def settle_passed_tournaments(cls, **filters):
+        tournaments = cls.objects.filter(settled=False, date__lt=timezone.now().date(), **filters).distinct()
+        for tournament in tournaments:
+            tournament.settle()
+
+    @transaction.atomic
+    def settle(self):
+        """
+        Stores the final rank and reward of every entry of a passed tournament
+        with one set based UPDATE. Ranks are dense, as in get_rank, and only
+        the entries within the reward places of their group get a reward.
+        """
+        if not Tournament.objects.select_for_update().filter(pk=self.pk, settled=False).exists():
+            self.settled = True
+            return
+
+        # Increments buffered by this process belong to the final scores.
+        score_buffer.flush()
+
+        reward_cases = " ".join(
+            "WHEN ranked.dense_rank BETWEEN %s AND %s THEN %s" for _ in TournamentGroup.RANKING_REWARD_GROUPS
+        )
+        reward_params = [
+            value
+            for reward_group in TournamentGroup.RANKING_REWARD_GROUPS
+            for value in (reward_group["start"], reward_group["end"], reward_group["price"])
+        ]
+
+        entry_table = connection.ops.quote_name(UserTournamentGroup._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                WITH ranked AS (
+                    SELECT
+                        entry.id,
+                        DENSE_RANK() OVER (PARTITION BY entry.group_id ORDER BY entry.score DESC) AS dense_rank,
+                        RANK() OVER (PARTITION BY entry.group_id ORDER BY entry.score DESC) AS rank
+                    FROM {entry_table} AS entry
+                    WHERE entry.tournament_id = %s
+                )
+                UPDATE {entry_table} AS entry
+                SET final_rank = ranked.dense_rank,
+                    reward_amount = CASE WHEN ranked.rank <= %s THEN CASE {reward_cases} ELSE 0 END ELSE 0 END
+                FROM ranked
+                WHERE entry.id = ranked.id
+            """, [self.pk, TournamentGroup.RANKING_REWARD_GROUPS[-1]["end"], *reward_params])
+
+        Tournament.objects.filter(pk=self.pk).update(settled=True)
+        self.settled = True
 
 
 class TournamentGroup(models.Model):
@@ -54,6 +125,78 @@ class TournamentGroup(models.Model):
 
     tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name='groups')
     level_bucket = models.IntegerField(default=0)
+    member_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['tournament', 'level_bucket', 'id'],
+                condition=models.Q(member_count=0),
+                name='tournament_group_spare_idx'
+            ),
+        ]
+
+    @classmethod
+    def provision(cls, tournament):
+        """
+        Creates empty groups per level bucket ahead of the tournament, enough
+        for TOURNAMENT_GROUP_PROVISION_RATIO of the most entries the bucket had
+        in a tournament of the last TOURNAMENT_GROUP_PROVISION_DAYS. Entrants
+        then claim these groups instead of creating them, see
+        TournamentBucket.claim_slots. Returns the number of created groups.
+        """
+        history = cls.objects\
+            .filter(
+                tournament__date__gte=tournament.date - timedelta(days=settings.TOURNAMENT_GROUP_PROVISION_DAYS),
+                tournament__date__lt=tournament.date
+            )\
+            .values('tournament', 'level_bucket')\
+            .annotate(entries=Sum('member_count'))
+        estimates = defaultdict(int)
+        for row in history:
+            estimates[row['level_bucket']] = max(estimates[row['level_bucket']], row['entries'])
+
+        existing = dict(
+            cls.objects
+            .filter(tournament=tournament)
+            .values('level_bucket')
+            .annotate(groups=Count('id'))
+            .values_list('level_bucket', 'groups')
+        )
+
+        groups = []
+        for level_bucket, entries in estimates.items():
+            target = math.ceil(entries * settings.TOURNAMENT_GROUP_PROVISION_RATIO / cls.GROUP_SIZE)
+            groups.extend(
+                cls(tournament=tournament, level_bucket=level_bucket)
+                for _ in range(target - existing.get(level_bucket, 0))
+            )
+
+        cls.objects.bulk_create(groups)
+        return len(groups)
+
+    @classmethod
+    def top_up(cls, tournament):
+        """
+        Adds empty groups to every level bucket of the tournament left with
+        fewer than TOURNAMENT_GROUP_SPARES of them. Returns the number of
+        created groups.
+        """
+        spares = cls.objects\
+            .filter(tournament=tournament)\
+            .values('level_bucket')\
+            .annotate(spares=Count('id', filter=Q(member_count=0)))\
+            .filter(spares__lt=settings.TOURNAMENT_GROUP_SPARES)\
+            .values_list('level_bucket', 'spares')
+
+        groups = [
+            cls(tournament=tournament, level_bucket=level_bucket)
+            for level_bucket, count in spares
+            for _ in range(settings.TOURNAMENT_GROUP_SPARES - count)
+        ]
+
+        cls.objects.bulk_create(groups)
+        return len(groups)
 
     @classmethod
     def get_ranks_reward(cls, rank):
@@ -71,61 +214,457 @@ class TournamentGroup(models.Model):
         return True
 
 
+class TournamentBucket(models.Model):
+    tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name='buckets')
+    level_bucket = models.IntegerField()
+    open_group = models.ForeignKey(TournamentGroup, null=True, on_delete=models.SET_NULL, related_name='+')
+
+    class Meta:
+        unique_together = ('tournament', 'level_bucket')
+
+    @classmethod
+    def claim_slots(cls, tournament, level_bucket, count=1):
+        """
+        Reserves count places in the bucket, filling its open group first, then
+        empty groups provisioned ahead, and creating new groups only when
+        those run out. Returns one group per reserved place.
+        The bucket row is locked, so concurrent entrants are serialized per
+        bucket and a group never grows beyond GROUP_SIZE.
+        """
+        bucket, _ = cls.objects\
+            .select_for_update()\
+            .get_or_create(tournament=tournament, level_bucket=level_bucket)
+
+        slots = []
+
+        # Read after the lock is held, a joined read could miss a group opened by the previous holder.
+        open_group = bucket.open_group
+        if open_group is not None and open_group.member_count < TournamentGroup.GROUP_SIZE:
+            taken = min(TournamentGroup.GROUP_SIZE - open_group.member_count, count)
+            TournamentGroup.objects.filter(pk=open_group.pk).update(member_count=F('member_count') + taken)
+            open_group.member_count += taken
+            slots.extend([open_group] * taken)
+
+        remaining = count - len(slots)
+        claimed_groups = []
+        if remaining > 0:
+            claimed_groups = list(
+                TournamentGroup.objects
+                .filter(tournament=tournament, level_bucket=level_bucket, member_count=0)
+                .order_by('id')[:math.ceil(remaining / TournamentGroup.GROUP_SIZE)]
+            )
+            for group in claimed_groups:
+                group.member_count = min(TournamentGroup.GROUP_SIZE, remaining)
+                remaining -= group.member_count
+
+            TournamentGroup.objects.bulk_update(claimed_groups, ['member_count'])
+
+        new_groups = []
+        while remaining > 0:
+            member_count = min(TournamentGroup.GROUP_SIZE, remaining)
+            new_groups.append(TournamentGroup(
+                tournament=tournament,
+                level_bucket=level_bucket,
+                member_count=member_count
+            ))
+            remaining -= member_count
+
+        if new_groups:
+            TournamentGroup.objects.bulk_create(new_groups)
+
+        if claimed_groups or new_groups:
+            bucket.open_group = (claimed_groups + new_groups)[-1]
+            bucket.save(update_fields=['open_group'])
+
+        for group in claimed_groups + new_groups:
+            slots.extend([group] * group.member_count)
+
+        return slots
+
+
 class UserTournamentGroup(models.Model):
     user = models.ForeignKey('user.User', on_delete=models.CASCADE)
     group = models.ForeignKey(TournamentGroup, on_delete=models.CASCADE, related_name='users')
+    # Copy of group.tournament, so per tournament lookups do not join the groups.
+    tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name='entries', db_index=False)
+    # Copy of user.country, so country boards are read from one index range.
+    country = CountryField()
     score = models.IntegerField(default=0)
     claimed_reward = models.BooleanField(default=False)
+    final_rank = models.IntegerField(null=True)
+    reward_amount = models.IntegerField(default=0)
+
+    REJECTED_NOT_FOUND = 'not_found'
+    REJECTED_ALREADY_ENTERED = 'already_entered'
+    REJECTED_LEVEL_REQUIREMENT = 'level_requirement'
+    REJECTED_INSUFFICIENT_COINS = 'insufficient_coins'
+    BULK_BATCH_SIZE = 5000
 
     class Meta:
         unique_together = ('user', 'group')
+        indexes = [
+            models.Index(fields=['group', '-score'], name='tournament_utg_group_score_idx'),
+            models.Index(fields=['tournament', '-score', '-user'], name='tournament_utg_rank_idx'),
+            models.Index(fields=['tournament', 'country', '-score', '-user'], name='tournament_utg_country_idx'),
+            models.Index(
+                fields=['user'],
+                condition=models.Q(claimed_reward=False, reward_amount__gt=0),
+                name='tournament_unclaimed_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'tournament'], name='tournament_utg_user_uniq'),
+        ]
 
     @classmethod
     @transaction.atomic
     def enter_tournament(cls, user, tournament):
-        user.coins -= tournament.ENTRY_FEE
+        """
+        Debits the entry fee and places the user in a group of their level
+        bucket. Raises IntegrityError if the user has already entered: the
+        debit locks the user row, so concurrent entries of a user are
+        serialized and the check below sees the committed entry.
+        """
+        user.lose_coin(tournament.ENTRY_FEE)
+        if cls.objects.filter(user=user, tournament=tournament).exists():
+            raise IntegrityError("User has already entered the tournament.")
+
         level_bucket = user.current_level // TournamentGroup.LEVEL_BUCKET_SIZE
 
-        non_full_groups = tournament.groups\
-            .filter(level_bucket=level_bucket)\
-            .annotate(user_count=Count('users'))\
-            .filter(user_count__lt=TournamentGroup.GROUP_SIZE)
+        [tournament_group] = TournamentBucket.claim_slots(tournament, level_bucket)
 
-        tournament_group = non_full_groups.first()
+        user_tournament_group = cls(user=user, group=tournament_group, tournament=tournament, country=user.country)
+        user_tournament_group.save()
 
-        if not tournament_group:
-            tournament_group = TournamentGroup(tournament=tournament, level_bucket=level_bucket)
+        tournament_entered.send(
+            sender=cls,
+            tournament_id=tournament.id,
+            group_id=tournament_group.id,
+            user_tournament_group_id=user_tournament_group.id,
+            user_id=user.id,
+            country=user.country,
+            score=user_tournament_group.score
+        )
 
-        user_tournament_group = cls(user=user, group=tournament_group)
+        return user_tournament_group
 
-        tournament_group.save()
-        user_tournament_group.save()
-        user.save()
+    @classmethod
+    @transaction.atomic
+    def bulk_enter_tournament(cls, user_ids, tournament, charge=True):
+        """
+        Admits many users at once. Eligibility is checked with set based queries,
+        users are packed into groups per level bucket and the entries and the
+        entry fee debit are written in bulk. Returns the created entries and a
+        mapping of rejected user ids to the reason.
+        """
+        user_ids = set(user_ids)
+        users = User.objects\
+            .select_for_update()\
+            .filter(pk__in=user_ids)\
+            .order_by('pk')\
+            .values_list('id', 'coins', 'current_level', 'country')
+        entered = set(
+            cls.objects.filter(tournament=tournament, user_id__in=user_ids).values_list('user_id', flat=True)
+        )
+
+        rejected = {}
+        countries = {}
+        admitted = defaultdict(list)
+        for user_id, coins, current_level, country in users:
+            countries[user_id] = country
+            if user_id in entered:
+                rejected[user_id] = cls.REJECTED_ALREADY_ENTERED
+            elif current_level < tournament.USER_LEVEL_REQUIREMENT:
+                rejected[user_id] = cls.REJECTED_LEVEL_REQUIREMENT
+            elif charge and coins < tournament.ENTRY_FEE:
+                rejected[user_id] = cls.REJECTED_INSUFFICIENT_COINS
+            else:
+                admitted[current_level // TournamentGroup.LEVEL_BUCKET_SIZE].append(user_id)
+
+        for user_id in user_ids - countries.keys():
+            rejected[user_id] = cls.REJECTED_NOT_FOUND
+
+        entries = []
+        for level_bucket in sorted(admitted):
+            bucket_user_ids = admitted[level_bucket]
+            groups = TournamentBucket.claim_slots(tournament, level_bucket, len(bucket_user_ids))
+            entries.extend(
+                cls(user_id=user_id, group=group, tournament=tournament, country=countries[user_id])
+                for user_id, group in zip(bucket_user_ids, groups)
+            )
+
+        cls.objects.bulk_create(entries, batch_size=cls.BULK_BATCH_SIZE)
+
+        if charge and entries:
+            User.objects\
+                .filter(pk__in=[entry.user_id for entry in entries])\
+                .update(coins=F('coins') - tournament.ENTRY_FEE, updated_at=timezone.now())
+
+        for entry in entries:
+            tournament_entered.send(
+                sender=cls,
+                tournament_id=tournament.id,
+                group_id=entry.group_id,
+                user_tournament_group_id=entry.id,
+                user_id=entry.user_id,
+                country=countries[entry.user_id],
+                score=entry.score,
+                bulk=True
+            )
+        tournament_bulk_entered.send(sender=cls, tournament_id=tournament.id, entries=entries)
+
+        return entries, rejected
+
+    @classmethod
+    def record_progress(cls, user, level_count=1):
+        """
+        Completes levels for the user and adds them to the user's score in the
+        current tournament, if entered, in a single database round trip.
+        """
+        if connection.vendor != 'postgresql':
+            return cls._record_progress_in_steps(user, level_count)
+
+        user_table = connection.ops.quote_name(user._meta.db_table)
+        tournament_table = connection.ops.quote_name(Tournament._meta.db_table)
+        user_group_table = connection.ops.quote_name(cls._meta.db_table)
+        now = timezone.now()
+
+        if settings.SCORE_WRITE_BEHIND:
+            group_statement = f"""
+                SELECT user_group.id, user_group.group_id, user_group.tournament_id, user_group.country,
+                    user_group.score
+                FROM {user_group_table} AS user_group, {tournament_table} AS tournament, updated_user
+                WHERE user_group.user_id = updated_user.id
+                    AND user_group.tournament_id = tournament.id
+                    AND tournament.date = %s
+            """
+            group_params = [now.date()]
+        else:
+            group_statement = f"""
+                UPDATE {user_group_table} AS user_group
+                SET score = user_group.score + %s
+                FROM {tournament_table} AS tournament, updated_user
+                WHERE user_group.user_id = updated_user.id
+                    AND user_group.tournament_id = tournament.id
+                    AND tournament.date = %s
+                RETURNING user_group.id, user_group.group_id, user_group.tournament_id, user_group.country,
+                    user_group.score
+            """
+            group_params = [level_count, now.date()]
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                WITH updated_user AS (
+                    UPDATE {user_table}
+                    SET current_level = current_level + %s, coins = coins + %s, updated_at = %s
+                    WHERE id = %s AND NOT deleted
+                    RETURNING id, current_level, coins, updated_at
+                ), current_group AS ({group_statement})
+                SELECT updated_user.current_level, updated_user.coins, updated_user.updated_at,
+                    current_group.id, current_group.group_id, current_group.tournament_id, current_group.country,
+                    current_group.score
+                FROM updated_user LEFT JOIN current_group ON TRUE
+            """, [
+                level_count,
+                user.LEVEL_COMPLETE_COIN_REWARD * level_count,
+                now,
+                user.pk,
+                *group_params,
+            ])
+            row = cursor.fetchone()
+
+        if row is None:
+            raise user.DoesNotExist("User does not exist.")
+
+        user.current_level, user.coins, user.updated_at, user_group_id, group_id, tournament_id, country, score = row
+
+        if user_group_id is None:
+            return None
+
+        membership_cache.add(user.pk, tournament_id, user_group_id, group_id)
+
+        if settings.SCORE_WRITE_BEHIND:
+            score_buffer.add(user_group_id, level_count)
+            score += score_buffer.pending_for([user_group_id]).get(user_group_id, 0)
+
+        user_tournament_group = cls(
+            id=user_group_id,
+            user=user,
+            group_id=group_id,
+            tournament_id=tournament_id,
+            country=country,
+            score=score
+        )
+        user_tournament_group._state.adding = False
+
+        score_updated.send(
+            sender=cls,
+            tournament_id=tournament_id,
+            group_id=group_id,
+            user_id=user.pk,
+            country=country,
+            amount=level_count,
+            score=score
+        )
 
         return user_tournament_group
 
-    def get_rank(self):
-        return UserTournamentGroup.objects.filter(
-            group=self.group,
-            score__gte=self.score
-        ).distinct('score').count()
+    @classmethod
+    def _record_progress_in_steps(cls, user, level_count):
+        user.complete_levels(level_count)
+
+        user_tournament_group = cls.objects\
+            .select_related('group')\
+            .filter(user=user, tournament__date=timezone.now().date())\
+            .first()
+
+        if user_tournament_group:
+            user_tournament_group.update_score(level_count)
 
-    def claim_reward(self, rank):
-        if self.claimed_reward:
-            raise ValueError("User has already claimed the reward.")
+        return user_tournament_group
+
+    def save(self, *args, **kwargs):
+        if self.tournament_id is None:
+            self.tournament_id = self.group.tournament_id
+        if not self.country:
+            self.country = self.user.country
+
+        super().save(*args, **kwargs)
 
-        if not TournamentGroup.is_eligible_for_reward(rank):
-            raise ValueError("User is not eligible for the reward.")
+    def get_rank(self):
+        if self.final_rank is not None:
+            return self.final_rank
+
+        return rank_service.dense_rank(self.group_id, self.score)
 
-        reward = TournamentGroup.get_ranks_reward(rank)
+    @classmethod
+    @transaction.atomic
+    def claim_rewards(cls, user, tournament_id=None):
+        """
+        Claims every settled, unclaimed reward of the user, or only the one of
+        the given tournament, and credits their sum. Both tables are written
+        with one UPDATE ... RETURNING each. The claimed_reward=False condition
+        is re-checked on the locked rows, so concurrent claims never pay twice.
+        Returns the number of claimed rewards and the credited amount.
+        """
+        unclaimed = cls.objects.filter(user=user, claimed_reward=False, reward_amount__gt=0)
+        if tournament_id is not None:
+            unclaimed = unclaimed.filter(tournament_id=tournament_id)
 
-        self.user.coins += reward
-        self.claimed_reward = True
+        rows = update_returning(unclaimed, ['reward_amount'], claimed_reward=True)
+        reward = sum(reward_amount for reward_amount, in rows)
+        if reward:
+            user.gain_coin(reward)
 
-        self.user.save()
-        self.save()
+        return len(rows), reward
 
     def update_score(self, completed_level_count=1):
-        self.score += completed_level_count
-        self.save()
+        if self._state.adding:
+            self.save()
+
+        if settings.SCORE_WRITE_BEHIND:
+            score_buffer.add(self.pk, completed_level_count)
+            self.score += completed_level_count
+        else:
+            rows = update_returning(
+                UserTournamentGroup.objects.filter(pk=self.pk),
+                ['score'],
+                score=F('score') + completed_level_count
+            )
+            self.score = rows[0][0]
+
+        score_updated.send(
+            sender=self.__class__,
+            tournament_id=self.tournament_id,
+            group_id=self.group_id,
+            user_id=self.user_id,
+            country=self.country,
+            amount=completed_level_count,
+            score=self.score
+        )
+
         return self.score
+
+
+class TournamentEntryTicket(models.Model):
+    """
+    Queued tournament entry. The entry fee is debited when the ticket is
+    created and groups are assigned later in batches, see tournament.queue.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_ASSIGNED = 'assigned'
+    STATUS_REJECTED = 'rejected'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_ASSIGNED, 'Assigned'),
+        (STATUS_REJECTED, 'Rejected'),
+    ]
+
+    user = models.ForeignKey('user.User', on_delete=models.CASCADE)
+    tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name='entry_tickets')
+    entry = models.ForeignKey(UserTournamentGroup, null=True, on_delete=models.SET_NULL, related_name='+')
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    reason = models.CharField(max_length=32, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'tournament')
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(status='pending'), name='tournament_ticket_pending_idx'),
+        ]
+
+    @classmethod
+    @transaction.atomic
+    def enqueue(cls, user, tournament):
+        user.lose_coin(tournament.ENTRY_FEE)
+        ticket = cls.objects.create(user=user, tournament=tournament)
+        transaction.on_commit(entry_queue.wake)
+
+        return ticket
+
+    @classmethod
+    @transaction.atomic
+    def process_batch(cls, batch_size):
+        """
+        Assigns groups to up to batch_size pending tickets. Tickets locked by
+        another worker are skipped, so several workers can drain the queue.
+        Rejected tickets are refunded. Returns the number of processed tickets.
+        """
+        tickets = list(
+            cls.objects
+            .select_for_update(skip_locked=True, of=('self',))
+            .filter(status=cls.STATUS_PENDING)
+            .select_related('tournament')
+            .order_by('id')[:batch_size]
+        )
+
+        tickets_by_tournament = defaultdict(list)
+        for ticket in tickets:
+            tickets_by_tournament[ticket.tournament].append(ticket)
+
+        refunds = []
+        for tournament, tournament_tickets in tickets_by_tournament.items():
+            entries, rejected = UserTournamentGroup.bulk_enter_tournament(
+                [ticket.user_id for ticket in tournament_tickets],
+                tournament,
+                charge=False
+            )
+            entries = {entry.user_id: entry for entry in entries}
+
+            for ticket in tournament_tickets:
+                if ticket.user_id in entries:
+                    ticket.status = cls.STATUS_ASSIGNED
+                    ticket.entry = entries[ticket.user_id]
+                else:
+                    ticket.status = cls.STATUS_REJECTED
+                    ticket.reason = rejected[ticket.user_id]
+                    refunds.append(ticket.user_id)
+
+        cls.objects.bulk_update(tickets, ['status', 'entry', 'reason'])
+
+        if refunds:
+            User.objects\
+                .filter(pk__in=refunds)\
+                .update(coins=F('coins') + Tournament.ENTRY_FEE, updated_at=timezone.now())
+
+        return len(tickets)
@@ -0,0 +1,13 @@
+import hmac
+
+from django.conf import settings
+from rest_framework import permissions
+
+
+class HasInternalApiKey(permissions.BasePermission):
+    def has_permission(self, request, view):
+        api_key = request.headers.get('X-Internal-Api-Key')
+        if not settings.INTERNAL_API_KEY or not api_key:
+            return False
+
+        return hmac.compare_digest(api_key, settings.INTERNAL_API_KEY)
@@ -0,0 +1,53 @@
+import logging
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from GoodBlast.threads import BackgroundThread
+
+logger = logging.getLogger(__name__)
+
+
+class EntryQueue:
+    """
+    Background worker that assigns groups to queued tournament entries.
+
+    Tickets live in the TournamentEntryTicket table, so any process can drain
+    the queue: each web process runs one worker thread when
+    ENTRY_QUEUE_IN_PROCESS_WORKER is set, and the process_entry_queue command
+    runs a dedicated one. The worker wakes up when a ticket is committed and
+    polls every ENTRY_QUEUE_POLL_INTERVAL_MS for tickets left by others.
+    """
+
+    def __init__(self):
+        self._worker = BackgroundThread(self.run, 'entry-queue-worker')
+
+    def wake(self):
+        if settings.ENTRY_QUEUE_IN_PROCESS_WORKER:
+            self._worker.start()
+            self._worker.wake()
+
+    def drain(self, batch_size=None):
+        from tournament.models import TournamentEntryTicket
+
+        batch_size = batch_size or settings.ENTRY_QUEUE_BATCH_SIZE
+        processed = 0
+        while True:
+            count = TournamentEntryTicket.process_batch(batch_size)
+            processed += count
+            if count < batch_size:
+                return processed
+
+    def run(self, batch_size=None):
+        while not self._worker.wait(settings.ENTRY_QUEUE_POLL_INTERVAL_MS / 1000):
+            close_old_connections()
+            try:
+                self.drain(batch_size)
+            except Exception:
+                logger.exception("Could not process queued tournament entries.")
+
+    def stop(self):
+        self._worker.stop()
+
+
+entry_queue = EntryQueue()
@@ -1,39 +1,193 @@
+import logging
 import os
 
 import pytz
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from django.conf import settings
+from django.db import DatabaseError, connection
 from django.utils import timezone
 from django_apscheduler.jobstores import DjangoJobStore
 from django_apscheduler.models import DjangoJobExecution
+from django_apscheduler.util import close_old_connections
+from rest_framework_simplejwt.settings import api_settings
 
-from tournament.models import Tournament
+from GoodBlast.threads import BackgroundThread
+from tournament.models import Tournament, TournamentEntryTicket, TournamentGroup
+from user.models import UserDeletion
 
+logger = logging.getLogger(__name__)
 
+JOB_EXECUTION_DAYS = 7
+
+
+@close_old_connections
 def tournament_scheduler_job():
-    Tournament.create_daily_tournament()
+    TournamentGroup.provision(Tournament.create_daily_tournament())
 
 
-def start():
-    if os.environ.get('RUN_MAIN') != 'true':
-        return
+@close_old_connections
+def tournament_settlement_job():
+    Tournament.settle_passed_tournaments()
+
+
+def cleanup():
+    """
+    Deletes rows nothing reads anymore: old job executions, deletions of
+    users whose tokens have expired, and processed entry tickets and unused
+    provisioned groups of settled tournaments.
+    """
+    now = timezone.now()
+    DjangoJobExecution.objects.delete_old_job_executions(JOB_EXECUTION_DAYS * 24 * 60 * 60)
+    UserDeletion.objects.filter(created_at__lt=now - api_settings.ACCESS_TOKEN_LIFETIME).delete()
+    TournamentEntryTicket.objects\
+        .filter(tournament__settled=True)\
+        .exclude(status=TournamentEntryTicket.STATUS_PENDING)\
+        .delete()
+    TournamentGroup.objects.filter(tournament__settled=True, member_count=0).delete()
+
+
+@close_old_connections
+def group_top_up_job():
+    tournament = Tournament.get_current_tournament()
+    if tournament is not None and timezone.now().hour < Tournament.ENTRY_END_HOUR:
+        TournamentGroup.top_up(tournament)
+
+
+@close_old_connections
+def cleanup_job():
+    cleanup()
+
+
+def catch_up():
+    """
+    Runs the work of the jobs missed while no process was leader: today's
+    tournament and, past the entry end hour, tomorrow's are created with
+    their provisioned groups and passed tournaments are settled. Every job
+    is idempotent, so running one again is harmless.
+    """
+    now = timezone.now()
+    tournament, _ = Tournament.objects.get_or_create(date=now.date())
+    TournamentGroup.provision(tournament)
+    if now.hour >= Tournament.ENTRY_END_HOUR:
+        TournamentGroup.provision(Tournament.create_daily_tournament())
+
+    Tournament.settle_passed_tournaments()
+    cleanup()
+
+
+class TournamentScheduler:
+    """
+    Runs the tournament jobs in exactly one process of the cluster.
+
+    Every process running the scheduler, web workers when
+    SCHEDULER_IN_PROCESS is set and `manage.py run_scheduler`, tries to take
+    a PostgreSQL advisory lock every SCHEDULER_LEADER_CHECK_SECONDS on a
+    connection of its own thread. The holder is the leader: it catches up
+    on missed jobs and runs an APScheduler BackgroundScheduler until it
+    loses the lock, e.g. when its connection drops, and another process
+    takes over. No job runs on a request serving thread.
+    """
 
-    scheduler = BackgroundScheduler(timezone=pytz.utc)
-    scheduler.add_jobstore(DjangoJobStore(), "default")
+    LOCK_ID = 4_107_231_582
 
-    days_to_store = 7
-    days_in_seconds = days_to_store * 24 * 60 * 60
+    def __init__(self):
+        self._thread = BackgroundThread(self.run, 'tournament-scheduler')
 
-    DjangoJobExecution.objects.delete_old_job_executions(days_in_seconds)
+    def start(self):
+        if settings.SCHEDULER_IN_PROCESS:
+            self._thread.start()
 
-    scheduler.add_job(
-        tournament_scheduler_job,
-        trigger=CronTrigger(hour=12, minute=0, timezone=pytz.utc),
-        id="tournament_scheduler_job",
-        max_instances=1,
-        replace_existing=True,
-    )
+    def stop(self):
+        self._thread.stop()
 
-    Tournament.objects.get_or_create(date=timezone.now().date())
+    def run(self):
+        while not self._thread.stopped():
+            if self._acquire():
+                try:
+                    self._lead()
+                except Exception:
+                    logger.exception("Tournament scheduler failed.")
+                finally:
+                    self._release()
 
-    scheduler.start()
+            self._thread.wait(settings.SCHEDULER_LEADER_CHECK_SECONDS)
+
+    def _lead(self):
+        logger.info("Process %s is the tournament scheduler leader.", os.getpid())
+        # Runs on the leader's connection, which holds the lock. Jobs run on the scheduler's threads and connections.
+        catch_up()
+
+        scheduler = BackgroundScheduler(timezone=pytz.utc)
+        scheduler.add_jobstore(DjangoJobStore(), "default")
+        for job, trigger in (
+            (tournament_scheduler_job, CronTrigger(hour=Tournament.ENTRY_END_HOUR, minute=0, timezone=pytz.utc)),
+            (tournament_settlement_job, CronTrigger(hour=0, minute=5, timezone=pytz.utc)),
+            (cleanup_job, CronTrigger(hour=3, minute=0, timezone=pytz.utc)),
+            (group_top_up_job, IntervalTrigger(seconds=settings.TOURNAMENT_GROUP_TOP_UP_SECONDS)),
+        ):
+            scheduler.add_job(
+                job,
+                trigger=trigger,
+                id=job.__name__,
+                max_instances=1,
+                coalesce=True,
+                replace_existing=True,
+            )
+        scheduler.start()
+
+        try:
+            while not self._thread.wait(settings.SCHEDULER_LEADER_CHECK_SECONDS):
+                if not self._holds_lock():
+                    logger.warning("Process %s lost the tournament scheduler lock.", os.getpid())
+                    return
+        finally:
+            scheduler.shutdown(wait=False)
+
+    def _acquire(self):
+        if connection.vendor != 'postgresql':
+            return True
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_lock(%s)", [self.LOCK_ID])
+                return cursor.fetchone()[0]
+        except DatabaseError:
+            logger.exception("Could not take the tournament scheduler lock.")
+            connection.close()
+            return False
+
+    def _holds_lock(self):
+        if connection.vendor != 'postgresql':
+            return True
+
+        try:
+            with connection.cursor() as cursor:
+                # A bigint advisory lock key is split into classid and objid.
+                cursor.execute("""
+                    SELECT EXISTS (
+                        SELECT 1 FROM pg_locks
+                        WHERE locktype = 'advisory' AND pid = pg_backend_pid() AND granted
+                            AND classid = %s AND objid = %s AND objsubid = 1
+                    )
+                """, [self.LOCK_ID >> 32, self.LOCK_ID & 0xFFFFFFFF])
+                return cursor.fetchone()[0]
+        except DatabaseError:
+            return False
+
+    def _release(self):
+        if connection.vendor != 'postgresql':
+            return
+
+        # Session advisory locks are released with the session.
+        connection.close()
+
+
+tournament_scheduler = TournamentScheduler()
+
+
+def start():
+    # Under runserver only the reloaded child process serves requests, gunicorn workers start it in gunicorn.conf.py.
+    if os.environ.get('RUN_MAIN') == 'true':
+        tournament_scheduler.start()
@@ -10,3 +10,13 @@ class TournamentIDSerializer(serializers.Serializer):
         if not Tournament.objects.filter(id=value).exists():
             raise serializers.ValidationError("Tournament does not exist with this ID.")
         return value
+
+
+class BulkEntrySerializer(serializers.Serializer):
+    MAX_USERS = 10000
+
+    users = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_USERS
+    )
@@ -0,0 +1,12 @@
+from django.dispatch import Signal
+
+# Sent with tournament_id, group_id, user_tournament_group_id, user_id, country and score when a user enters a
+# tournament.
+tournament_entered = Signal()
+
+# Sent with tournament_id and entries, the created UserTournamentGroup rows, once per bulk entry. The
+# tournament_entered signals of its entries are sent with bulk=True.
+tournament_bulk_entered = Signal()
+
+# Sent with tournament_id, group_id, user_id, country, amount and score when a tournament score is increased.
+score_updated = Signal()
@@ -0,0 +1,120 @@
+import threading
+from unittest import mock
+
+from django.db import DatabaseError, transaction
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from leaderboard.standings import country_standings
+from tournament.buffer import ScoreBuffer, score_buffer
+from tournament.models import Tournament, TournamentGroup, UserTournamentGroup
+from user.models import User
+
+
+# Batches are only written when asked for, by the flusher thread on its own connection.
+@override_settings(SCORE_WRITE_BEHIND=True, SCORE_BUFFER_MAX_ENTRIES=100, SCORE_BUFFER_FLUSH_INTERVAL_MS=60000)
+class ScoreBufferTest(TransactionTestCase):
+    def setUp(self):
+        tournament = Tournament.objects.create(date=timezone.now().date())
+        self.group = TournamentGroup.objects.create(tournament=tournament)
+        self.users = [User.objects.create(username=f'test{i}', country='US') for i in range(3)]
+        self.user_groups = [
+            UserTournamentGroup.objects.create(user=user, group=self.group) for user in self.users
+        ]
+
+    def tearDown(self):
+        score_buffer.stop()
+        country_standings.flush()
+
+    def _scores(self):
+        return [
+            UserTournamentGroup.objects.get(pk=user_group.pk).score for user_group in self.user_groups
+        ]
+
+    def test_update_score_is_buffered(self):
+        with self.assertNumQueries(0), mock.patch.object(country_standings, 'add'):
+            for user_group in self.user_groups:
+                user_group.update_score()
+            self.user_groups[0].update_score(2)
+
+        self.assertEqual(self._scores(), [0, 0, 0])
+        self.assertEqual(len(score_buffer), 4)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(score_buffer.flush(), 3)
+
+        self.assertEqual(self._scores(), [3, 1, 1])
+        self.assertEqual(len(score_buffer), 0)
+
+    def test_flushes_when_full(self):
+        with override_settings(SCORE_BUFFER_MAX_ENTRIES=5):
+            for _ in range(6):
+                self.user_groups[0].update_score()
+
+        self.assertEqual(self._scores()[0], 5)
+        self.assertEqual(score_buffer.pending_for([self.user_groups[0].pk]), {self.user_groups[0].pk: 1})
+
+    def test_flush_survives_caller_rollback(self):
+        with override_settings(SCORE_BUFFER_MAX_ENTRIES=2):
+            self.user_groups[1].update_score(2)
+            self.user_groups[2].update_score()
+
+            with self.assertRaises(ValueError), transaction.atomic():
+                self.user_groups[0].update_score()
+                raise ValueError
+
+        self.assertEqual(self._scores(), [0, 2, 1])
+
+    def test_batch_being_written_stays_pending(self):
+        pk = self.user_groups[0].pk
+        self.user_groups[0].update_score(3)
+        writing, resume = threading.Event(), threading.Event()
+
+        def slow_write(batch):
+            writing.set()
+            resume.wait()
+            ScoreBuffer._write(batch)
+
+        with mock.patch.object(score_buffer, '_write', side_effect=slow_write):
+            flush = threading.Thread(target=score_buffer.flush)
+            flush.start()
+            writing.wait()
+
+            self.user_groups[0].update_score()
+            self.assertEqual(score_buffer.pending_for([pk]), {pk: 4})
+
+            resume.set()
+            flush.join()
+
+        self.assertEqual(self._scores()[0], 3)
+        self.assertEqual(score_buffer.pending_for([pk]), {pk: 1})
+
+    def test_failed_flush_keeps_increments(self):
+        self.user_groups[0].update_score(4)
+
+        with mock.patch.object(score_buffer, '_write', side_effect=DatabaseError), \
+                self.assertLogs('tournament.buffer', 'ERROR'):
+            with self.assertRaises(DatabaseError):
+                score_buffer.flush()
+
+        self.assertEqual(score_buffer.pending_for([self.user_groups[0].pk]), {self.user_groups[0].pk: 4})
+
+        score_buffer.flush()
+        self.assertEqual(self._scores()[0], 4)
+
+    def test_progress_and_reads_see_pending_increments(self):
+        client = APIClient()
+        client.force_authenticate(user=self.users[1])
+
+        response = client.post(reverse('user-progress', kwargs={"username": self.users[1].username}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._scores(), [0, 0, 0])
+
+        response = client.get(reverse('group-leaderboard'))
+        self.assertEqual(response.data[0], {'user': self.users[1].username, 'country': 'US', 'score': 1})
+
+        response = client.get(reverse('user-group-rank'))
+        self.assertEqual(response.data['rank'], 1)
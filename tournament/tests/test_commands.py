@@ -0,0 +1,32 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.utils import timezone
+from django.test import TestCase
+
+from tournament.models import Tournament, UserTournamentGroup
+from user.models import User
+
+
+class BulkEnterTournamentCommandTest(TestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(date=timezone.now().date())
+        self.users = [
+            User.objects.create(
+                username=f'test{i}',
+                current_level=Tournament.USER_LEVEL_REQUIREMENT,
+                coins=Tournament.ENTRY_FEE
+            )
+            for i in range(5)
+        ]
+
+    def test_enters_users_from_stdin_in_batches(self):
+        stdin = StringIO("\n".join(str(user.id) for user in self.users) + "\n\n")
+        stdout = StringIO()
+
+        with mock.patch('sys.stdin', stdin):
+            call_command('bulk_enter_tournament', '--batch-size', '2', stdout=stdout, stderr=StringIO())
+
+        self.assertEqual(UserTournamentGroup.objects.filter(group__tournament=self.tournament).count(), 5)
+        self.assertIn("Entered 5 users", stdout.getvalue())
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+
+from leaderboard.models import CountryStanding
+from leaderboard.serializers import encode_cursor
+from tournament.models import Tournament, UserTournamentGroup
+from user.models import User
+
+TRANSACTION_STATEMENTS = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+PLAN_NODES = {'seqscan': "Seq Scan", 'sort': "Sort"}
+
+
+class QueryPlanTest(APITestCase):
+    """
+    The tables are far too small here for the planner to prefer an index on
+    its own, so sequential scans (and sorts, where asserted) are disabled: a
+    plan that still contains one has no index to use.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.tournament = Tournament.objects.create(date=timezone.now().date())
+        self.passed_tournament = Tournament.objects.create(date=timezone.now().date() - timedelta(days=1))
+
+        self.users = [
+            User.objects.create(
+                username=f'test{i}',
+                country='US' if i % 2 else 'TR',
+                current_level=Tournament.USER_LEVEL_REQUIREMENT,
+                coins=Tournament.ENTRY_FEE * 2
+            )
+            for i in range(10)
+        ]
+        for tournament in (self.tournament, self.passed_tournament):
+            for score, user in enumerate(self.users[:-1]):
+                UserTournamentGroup.enter_tournament(user, tournament).update_score(score)
+        CountryStanding.rebuild(self.tournament.id)
+
+        self.user = self.users[-2]
+        self.client.force_authenticate(user=self.user)
+
+    def _assert_uses_indexes(self, method, url, disabled=('seqscan',)):
+        with CaptureQueriesContext(connection) as queries:
+            response = method(url)
+        self.assertLess(response.status_code, 300, url)
+
+        with connection.cursor() as cursor:
+            for plan_type in disabled:
+                cursor.execute(f"SET enable_{plan_type} = off")
+            try:
+                for query in queries:
+                    sql = query['sql']
+                    if sql.startswith(TRANSACTION_STATEMENTS):
+                        continue
+
+                    cursor.execute(f"EXPLAIN {sql}")
+                    plan = "\n".join(row[0] for row in cursor.fetchall())
+                    for plan_type in disabled:
+                        self.assertNotIn(PLAN_NODES[plan_type], plan, f"{url}: {sql}\n{plan}")
+            finally:
+                for plan_type in disabled:
+                    cursor.execute(f"SET enable_{plan_type} = on")
+
+    def test_leaderboards(self):
+        for name in (
+            'global-leaderboard',
+            'country-leaderboard',
+            'country-ranking',
+            'group-leaderboard',
+            'user-group-rank'
+        ):
+            self._assert_uses_indexes(self.client.get, reverse(name))
+
+    def test_leaderboard_pages(self):
+        cursor = encode_cursor(3, self.users[3].id)
+
+        # Keyset pages are read in index order, so a plan that still sorts has no index to read them from.
+        for name in ('global-leaderboard', 'country-leaderboard'):
+            for parameters in (f'?limit=2&cursor={cursor}', '?around=me&k=2'):
+                self._assert_uses_indexes(self.client.get, reverse(name) + parameters, disabled=('seqscan', 'sort'))
+
+    def test_progress(self):
+        self._assert_uses_indexes(self.client.post, reverse('user-progress', kwargs={'username': self.user.username}))
+
+    def test_enter_tournament(self):
+        self.client.force_authenticate(user=self.users[-1])
+        before_entry_end_hour = timezone.make_aware(
+            datetime.combine(timezone.now().date(), datetime.min.time())
+        ) + timedelta(hours=Tournament.ENTRY_END_HOUR - 1)
+
+        with mock.patch('django.utils.timezone.now') as mock_now:
+            mock_now.return_value = before_entry_end_hour
+            self._assert_uses_indexes(self.client.post, reverse('enter-tournament'))
+
+    def test_tournament_details(self):
+        self._assert_uses_indexes(
+            self.client.get,
+            reverse('user-tournament-score-details', kwargs={'tournament': self.tournament.id})
+        )
+
+    def test_claim_reward(self):
+        self._assert_uses_indexes(self.client.post, reverse('claim-tournament-reward'))
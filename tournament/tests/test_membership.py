@@ -0,0 +1,77 @@
+from datetime import datetime, time
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tournament.membership import membership_cache, NOT_ENTERED
+from tournament.models import Tournament, UserTournamentGroup
+from user.models import User
+
+
+class MembershipCacheTest(TransactionTestCase):
+    def setUp(self):
+        membership_cache.clear()
+        caches['default'].clear()
+        self.tournament = Tournament.objects.create(date=timezone.now().date())
+        self.user = User.objects.create(
+            username='test',
+            current_level=Tournament.USER_LEVEL_REQUIREMENT,
+            coins=Tournament.ENTRY_FEE
+        )
+
+    def tearDown(self):
+        membership_cache.clear()
+        caches['default'].clear()
+
+    def _at(self, hour):
+        return timezone.make_aware(datetime.combine(self.tournament.date, time(hour=hour)))
+
+    def test_filled_at_entry(self):
+        entry = UserTournamentGroup.enter_tournament(self.user, self.tournament)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(membership_cache.get(self.user.pk, self.tournament), (entry.pk, entry.group_id))
+
+        entry.delete()
+        self.assertEqual(membership_cache.get(self.user.pk, self.tournament), NOT_ENTERED)
+
+    def test_not_entered_is_cached_locally_once_entry_closes(self):
+        with mock.patch('django.utils.timezone.now', return_value=self._at(Tournament.ENTRY_END_HOUR - 1)):
+            with self.assertNumQueries(2):
+                membership_cache.get(self.user.pk, self.tournament)
+                membership_cache.get(self.user.pk, self.tournament)
+
+        with mock.patch('django.utils.timezone.now', return_value=self._at(Tournament.ENTRY_END_HOUR)):
+            with self.assertNumQueries(1):
+                membership_cache.get(self.user.pk, self.tournament)
+                self.assertEqual(membership_cache.get(self.user.pk, self.tournament), NOT_ENTERED)
+
+    @override_settings(MEMBERSHIP_SHARED_CACHE='default')
+    def test_not_entered_is_shared_until_entry(self):
+        with self.assertNumQueries(1):
+            membership_cache.get(self.user.pk, self.tournament)
+            membership_cache.get(self.user.pk, self.tournament)
+
+        entry = UserTournamentGroup.enter_tournament(self.user, self.tournament)
+        membership_cache.clear()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(membership_cache.get(self.user.pk, self.tournament), (entry.pk, entry.group_id))
+
+    def test_group_leaderboard_skips_membership_lookup(self):
+        UserTournamentGroup.enter_tournament(self.user, self.tournament)
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        Tournament.get_current_tournament()
+
+        # Only the group version, read from the database with the local memory cache, and the group rows.
+        with self.assertNumQueries(2):
+            response = client.get(reverse('group-leaderboard'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
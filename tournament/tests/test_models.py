@@ -1,11 +1,15 @@
 import random
+import threading
 from datetime import timedelta
 from unittest.mock import patch
 
-from django.test import TestCase
+from django.core.cache import caches
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.utils import timezone
 
-from tournament.models import Tournament, TournamentGroup, UserTournamentGroup
+from tournament.current import current_tournament
+from tournament.models import Tournament, TournamentBucket, TournamentGroup, UserTournamentGroup
 from user.models import User
 
 
@@ -28,6 +32,63 @@ class TournamentModelTest(TestCase):
                          "The current tournament should match the one created for today.")
 
 
+    def test_get_current_tournament_without_tournament(self):
+        Tournament.objects.create(date=timezone.now().date() - timedelta(days=1))
+
+        self.assertIsNone(Tournament.get_current_tournament())
+
+
+@override_settings(CURRENT_TOURNAMENT_SHARED_CACHE='default')
+class CurrentTournamentCacheTest(TransactionTestCase):
+    def setUp(self):
+        current_tournament.clear()
+        caches['default'].clear()
+
+    def tearDown(self):
+        current_tournament.clear()
+        caches['default'].clear()
+
+    def test_caches_until_a_tournament_is_saved(self):
+        with self.assertNumQueries(1):
+            self.assertIsNone(Tournament.get_current_tournament())
+            self.assertIsNone(Tournament.get_current_tournament())
+
+        tournament = Tournament.objects.create(date=timezone.now().date())
+
+        with self.assertNumQueries(1):
+            self.assertEqual(Tournament.get_current_tournament().id, tournament.id)
+            self.assertEqual(Tournament.get_current_tournament().id, tournament.id)
+
+        tournament.delete()
+        self.assertIsNone(Tournament.get_current_tournament())
+
+    def test_shared_tier_serves_other_workers(self):
+        tournament = Tournament.objects.create(date=timezone.now().date())
+        Tournament.get_current_tournament()
+        current_tournament.clear()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(Tournament.get_current_tournament().id, tournament.id)
+
+    def test_keys_on_the_utc_date(self):
+        today = Tournament.objects.create(date=timezone.now().date())
+        tomorrow = Tournament.objects.create(date=timezone.now().date() + timedelta(days=1))
+        self.assertEqual(Tournament.get_current_tournament().id, today.id)
+
+        next_day = timezone.now() + timedelta(days=1)
+        with patch('django.utils.timezone.now') as mock_now:
+            mock_now.return_value = next_day
+            self.assertEqual(Tournament.get_current_tournament().id, tomorrow.id)
+
+    def test_not_cached_inside_transactions(self):
+        with transaction.atomic():
+            tournament = Tournament.objects.create(date=timezone.now().date())
+            self.assertEqual(Tournament.get_current_tournament().id, tournament.id)
+            transaction.set_rollback(True)
+
+        self.assertIsNone(Tournament.get_current_tournament())
+
+
 class TournamentGroupModelTests(TestCase):
     def setUp(self):
         self.tournament = Tournament.objects.create(date="2024-01-01")
@@ -59,6 +120,60 @@ class TournamentGroupModelTests(TestCase):
         )
 
 
+@override_settings(TOURNAMENT_GROUP_PROVISION_DAYS=3, TOURNAMENT_GROUP_PROVISION_RATIO=1.0, TOURNAMENT_GROUP_SPARES=2)
+class TournamentGroupProvisionTests(TestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(date=timezone.now().date())
+
+    def create_groups(self, tournament, level_bucket, *member_counts):
+        TournamentGroup.objects.bulk_create([
+            TournamentGroup(tournament=tournament, level_bucket=level_bucket, member_count=member_count)
+            for member_count in member_counts
+        ])
+
+    def spare_counts(self):
+        groups = TournamentGroup.objects.filter(tournament=self.tournament, member_count=0)
+        return {
+            level_bucket: groups.filter(level_bucket=level_bucket).count()
+            for level_bucket in groups.values_list('level_bucket', flat=True).distinct()
+        }
+
+    def test_provision_sizes_buckets_from_the_busiest_recent_day(self):
+        for days, entries in ((1, 100), (2, 140), (4, 1000)):
+            passed = Tournament.objects.create(date=self.tournament.date - timedelta(days=days))
+            self.create_groups(passed, 0, *[TournamentGroup.GROUP_SIZE] * (entries // TournamentGroup.GROUP_SIZE))
+            self.create_groups(passed, 1, 3)
+
+        self.assertEqual(TournamentGroup.provision(self.tournament), 5)
+        self.assertEqual(self.spare_counts(), {0: 4, 1: 1})
+
+        # Groups the tournament already has count towards the estimate.
+        self.assertEqual(TournamentGroup.provision(self.tournament), 0)
+
+    def test_top_up_refills_buckets_running_low(self):
+        self.create_groups(self.tournament, 0, TournamentGroup.GROUP_SIZE, 0)
+        self.create_groups(self.tournament, 1, 5, 0, 0, 0)
+
+        self.assertEqual(TournamentGroup.top_up(self.tournament), 1)
+        self.assertEqual(self.spare_counts(), {0: 2, 1: 3})
+
+    def test_entrants_claim_provisioned_groups(self):
+        self.create_groups(self.tournament, 0, 0, 0)
+        users = [
+            User.objects.create(username=f'test{i}', coins=Tournament.ENTRY_FEE, current_level=15)
+            for i in range(TournamentGroup.GROUP_SIZE + 1)
+        ]
+        provisioned = list(TournamentGroup.objects.filter(tournament=self.tournament).order_by('id'))
+
+        UserTournamentGroup.enter_tournament(users[0], self.tournament)
+        UserTournamentGroup.bulk_enter_tournament([user.id for user in users[1:]], self.tournament)
+
+        groups = TournamentGroup.objects.filter(tournament=self.tournament).order_by('id')
+        self.assertEqual(list(groups), provisioned)
+        self.assertEqual([group.member_count for group in groups], [TournamentGroup.GROUP_SIZE, 1])
+        self.assertEqual(TournamentBucket.objects.get(tournament=self.tournament).open_group, provisioned[1])
+
+
 class UserTournamentGroupModelTests(TestCase):
     def setUp(self):
         self.user = User(
@@ -98,6 +213,85 @@ class UserTournamentGroupModelTests(TestCase):
         self.assertEqual(user_tournament_group.group.level_bucket,
                          self.user.current_level // TournamentGroup.LEVEL_BUCKET_SIZE)
 
+    def test_enter_tournament_twice(self):
+        UserTournamentGroup.enter_tournament(self.user, self.current_tournament)
+
+        with self.assertRaises(IntegrityError):
+            UserTournamentGroup.enter_tournament(self.user, self.current_tournament)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.coins, 1000 - Tournament.ENTRY_FEE, "The entry fee should be charged once.")
+        self.assertEqual(UserTournamentGroup.objects.filter(user=self.user).count(), 1)
+
+    def test_one_entry_per_tournament(self):
+        UserTournamentGroup.enter_tournament(self.user, self.current_tournament)
+        other_group = TournamentGroup.objects.create(tournament=self.current_tournament, level_bucket=5)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            UserTournamentGroup.objects.create(user=self.user, group=other_group, tournament=self.current_tournament)
+
+    def test_enter_tournament_fills_open_group(self):
+        users = [
+            User.objects.create(username=f'test{i}', coins=Tournament.ENTRY_FEE, current_level=15)
+            for i in range(TournamentGroup.GROUP_SIZE + 1)
+        ]
+
+        UserTournamentGroup.enter_tournament(users[0], self.current_tournament)
+
+        with self.assertNumQueries(8):
+            UserTournamentGroup.enter_tournament(users[1], self.current_tournament)
+
+        for user in users[2:-2]:
+            UserTournamentGroup.enter_tournament(user, self.current_tournament)
+
+        with self.assertNumQueries(8):
+            UserTournamentGroup.enter_tournament(users[-2], self.current_tournament)
+
+        UserTournamentGroup.enter_tournament(users[-1], self.current_tournament)
+
+        groups = TournamentGroup.objects.filter(tournament=self.current_tournament).order_by('id')
+        self.assertEqual([group.member_count for group in groups], [TournamentGroup.GROUP_SIZE, 1])
+        self.assertEqual(TournamentBucket.objects.get(tournament=self.current_tournament).open_group, groups[1])
+
+    def test_bulk_enter_tournament(self):
+        eligible = [
+            User.objects.create(username=f'test{i}', coins=Tournament.ENTRY_FEE, current_level=15 + i % 2 * 100)
+            for i in range(2 * TournamentGroup.GROUP_SIZE + 3)
+        ]
+        poor = User.objects.create(username='poor', coins=Tournament.ENTRY_FEE - 1, current_level=15)
+        novice = User.objects.create(username='novice', coins=Tournament.ENTRY_FEE, current_level=1)
+        UserTournamentGroup.enter_tournament(self.user, self.current_tournament)
+
+        user_ids = [user.id for user in eligible] + [poor.id, novice.id, self.user.id, 0]
+        entries, rejected = UserTournamentGroup.bulk_enter_tournament(user_ids, self.current_tournament)
+
+        self.assertEqual(rejected, {
+            poor.id: UserTournamentGroup.REJECTED_INSUFFICIENT_COINS,
+            novice.id: UserTournamentGroup.REJECTED_LEVEL_REQUIREMENT,
+            self.user.id: UserTournamentGroup.REJECTED_ALREADY_ENTERED,
+            0: UserTournamentGroup.REJECTED_NOT_FOUND
+        })
+        self.assertEqual(sorted(entry.user_id for entry in entries), sorted(user.id for user in eligible))
+        self.assertFalse(User.objects.filter(pk__in=[user.id for user in eligible], coins__gt=0).exists())
+        self.assertEqual(User.objects.get(pk=poor.id).coins, Tournament.ENTRY_FEE - 1)
+
+        for group in TournamentGroup.objects.filter(tournament=self.current_tournament):
+            self.assertLessEqual(group.member_count, TournamentGroup.GROUP_SIZE)
+            self.assertEqual(group.member_count, group.users.count())
+            levels = User.objects.filter(usertournamentgroup__group=group).values_list('current_level', flat=True)
+            self.assertEqual({level // TournamentGroup.LEVEL_BUCKET_SIZE for level in levels}, {group.level_bucket})
+
+    def test_bulk_enter_tournament_without_charge(self):
+        entries, rejected = UserTournamentGroup.bulk_enter_tournament(
+            [self.user.id],
+            self.current_tournament,
+            charge=False
+        )
+
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(rejected, {})
+        self.assertEqual(User.objects.get(pk=self.user.id).coins, self.user.coins)
+
     def test_update_score(self):
         user_tournament_group = self._enter_tournament_in_time(
             self.user,
@@ -112,28 +306,133 @@ class UserTournamentGroupModelTests(TestCase):
         self.assertEqual(new_score, gained_score, "New score should be equal to the gained score.")
         self.assertEqual(user_tournament_group.score, gained_score, "User's score should be updated correctly.")
 
-    def test_claim_reward(self):
+    def test_claim_rewards(self):
         users_first_coins = self.user.coins
-        user_tournament_group = self._enter_tournament_in_time(
-            self.user,
-            self.current_tournament,
-            time=self.before_entry_end_hour
-        )
+        user_tournament_group = UserTournamentGroup.enter_tournament(self.user, self.passed_tournament)
         user_tournament_group.update_score(100)
-        user_tournament_group.claim_reward(1)
+        self.passed_tournament.settle()
+
+        claimed, reward = UserTournamentGroup.claim_rewards(self.user)
 
+        self.assertEqual((claimed, reward), (1, TournamentGroup.get_ranks_reward(1)))
+        user_tournament_group.refresh_from_db()
         self.assertTrue(user_tournament_group.claimed_reward, "User should have claimed the reward.")
         expected_coins = users_first_coins - Tournament.ENTRY_FEE + TournamentGroup.get_ranks_reward(1)
         self.assertEqual(self.user.coins, expected_coins, "User's coins should be increased by the reward amount.")
 
-    def test_claim_reward_multiple_times(self):
-        user_tournament_group = self._enter_tournament_in_time(
-            self.user,
-            self.current_tournament,
-            time=self.before_entry_end_hour
-        )
-        user_tournament_group.update_score(100)
-        user_tournament_group.claim_reward(1)
+    def test_claim_rewards_multiple_times(self):
+        UserTournamentGroup.enter_tournament(self.user, self.passed_tournament).update_score(100)
+        self.passed_tournament.settle()
+        UserTournamentGroup.claim_rewards(self.user, self.passed_tournament.id)
+
+        self.assertEqual(UserTournamentGroup.claim_rewards(self.user, self.passed_tournament.id), (0, 0))
+
+
+class TournamentSettlementTest(TestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(date=timezone.now().date() - timedelta(days=1))
+        self.groups = [TournamentGroup.objects.create(tournament=self.tournament) for _ in range(3)]
+        self.entries = [
+            UserTournamentGroup.objects.create(
+                user=User.objects.create(username=f'test{i}'),
+                group=self.groups[i % 3],
+                score=random.randint(0, 8)
+            )
+            for i in range(60)
+        ]
+
+    def test_settle_stores_final_ranks_and_rewards(self):
+        # Lock, rank update and settled flag, inside a savepoint.
+        with self.assertNumQueries(5):
+            self.tournament.settle()
+
+        for entry in self.entries:
+            entry.refresh_from_db()
+            dense_rank = UserTournamentGroup.objects\
+                .filter(group=entry.group, score__gte=entry.score)\
+                .distinct('score')\
+                .count()
+            rank = UserTournamentGroup.objects.filter(group=entry.group, score__gt=entry.score).count() + 1
+
+            self.assertEqual(entry.final_rank, dense_rank)
+            if rank <= TournamentGroup.RANKING_REWARD_GROUPS[-1]["end"]:
+                self.assertEqual(entry.reward_amount, TournamentGroup.get_ranks_reward(dense_rank))
+            else:
+                self.assertEqual(entry.reward_amount, 0)
+
+    def test_settle_passed_tournaments_once(self):
+        current_tournament = Tournament.objects.create(date=timezone.now().date())
+
+        Tournament.settle_passed_tournaments()
+
+        self.assertTrue(Tournament.objects.get(pk=self.tournament.pk).settled)
+        self.assertFalse(Tournament.objects.get(pk=current_tournament.pk).settled)
+
+        with self.assertNumQueries(1):
+            Tournament.settle_passed_tournaments()
+
+
+class ConcurrentEnterTournamentTest(TransactionTestCase):
+    THREAD_COUNT = 12
+    USERS_PER_THREAD = 8
+
+    def test_groups_never_overfill(self):
+        tournament = Tournament.objects.create(date=timezone.now().date())
+        users = [
+            User.objects.create(username=f'test{i}', coins=Tournament.ENTRY_FEE, current_level=15)
+            for i in range(self.THREAD_COUNT * self.USERS_PER_THREAD)
+        ]
+
+        def enter(thread_users):
+            try:
+                for user in thread_users:
+                    UserTournamentGroup.enter_tournament(user, tournament)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=enter, args=(users[i::self.THREAD_COUNT],))
+            for i in range(self.THREAD_COUNT)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        groups = TournamentGroup.objects.filter(tournament=tournament)
+        self.assertEqual(groups.count(), -(-len(users) // TournamentGroup.GROUP_SIZE))
+        for group in groups:
+            self.assertLessEqual(group.member_count, TournamentGroup.GROUP_SIZE)
+            self.assertEqual(group.member_count, group.users.count())
+
+
+class ConcurrentClaimRewardsTest(TransactionTestCase):
+    THREAD_COUNT = 8
+
+    def test_rewards_are_paid_once(self):
+        user = User.objects.create(username='test', coins=0)
+        for days in range(1, 4):
+            tournament = Tournament.objects.create(date=timezone.now().date() - timedelta(days=days))
+            group = TournamentGroup.objects.create(tournament=tournament)
+            UserTournamentGroup.objects.create(user=user, group=group, score=1)
+            tournament.settle()
+
+        barrier = threading.Barrier(self.THREAD_COUNT)
+        rewards = []
+
+        def claim():
+            try:
+                barrier.wait()
+                rewards.append(UserTournamentGroup.claim_rewards(User.objects.get(pk=user.pk))[1])
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=claim) for _ in range(self.THREAD_COUNT)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
 
-        with self.assertRaises(ValueError):
-            user_tournament_group.claim_reward(1)
+        expected = TournamentGroup.get_ranks_reward(1) * 3
+        self.assertEqual(sum(rewards), expected)
+        self.assertEqual(User.objects.get(pk=user.pk).coins, expected)
@@ -0,0 +1,117 @@
+import threading
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tournament.models import Tournament, TournamentEntryTicket, TournamentGroup, UserTournamentGroup
+from tournament.queue import entry_queue
+from user.models import User
+
+
+def create_users(count, **kwargs):
+    return [
+        User.objects.create(
+            username=f'test{i}',
+            current_level=kwargs.get('current_level', Tournament.USER_LEVEL_REQUIREMENT),
+            coins=kwargs.get('coins', Tournament.ENTRY_FEE)
+        )
+        for i in range(count)
+    ]
+
+
+@override_settings(TOURNAMENT_ENTRY_QUEUE=True)
+@mock.patch.object(entry_queue._worker, 'start')
+class EntryQueueTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.tournament = Tournament.objects.create(date=timezone.now().date())
+        self.users = create_users(3)
+        self.client.force_authenticate(user=self.users[0])
+        self.before_entry_end_hour = timezone.make_aware(
+            datetime.combine(timezone.now().date(), datetime.min.time())
+        ) + timedelta(hours=Tournament.ENTRY_END_HOUR - 1)
+
+    def _enter(self):
+        with mock.patch('django.utils.timezone.now') as mock_now:
+            mock_now.return_value = self.before_entry_end_hour
+            return self.client.post(reverse('enter-tournament'))
+
+    def test_enter_returns_ticket_and_debits_fee(self, _):
+        response = self._enter()
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], TournamentEntryTicket.STATUS_PENDING)
+        self.assertEqual(User.objects.get(pk=self.users[0].pk).coins, 0)
+        self.assertFalse(UserTournamentGroup.objects.exists())
+
+        response = self._enter()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_status_reports_assigned_group(self, _):
+        ticket = self._enter().data['ticket']
+        url = reverse('tournament-entry-status', kwargs={'ticket': ticket})
+
+        self.assertIsNone(self.client.get(url).data['group'])
+
+        entry_queue.drain()
+
+        response = self.client.get(url)
+        entry = UserTournamentGroup.objects.get(user=self.users[0])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], TournamentEntryTicket.STATUS_ASSIGNED)
+        self.assertEqual(response.data['group'], entry.group_id)
+
+        self.client.force_authenticate(user=self.users[1])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_drain_assigns_in_batches_and_refunds_rejections(self, _):
+        for user in self.users:
+            TournamentEntryTicket.enqueue(user, self.tournament)
+        User.objects.filter(pk=self.users[2].pk).update(coins=Tournament.ENTRY_FEE)
+        UserTournamentGroup.enter_tournament(User.objects.get(pk=self.users[2].pk), self.tournament)
+
+        self.assertEqual(entry_queue.drain(batch_size=2), 3)
+
+        tickets = TournamentEntryTicket.objects.order_by('id')
+        self.assertEqual(
+            [ticket.status for ticket in tickets],
+            [TournamentEntryTicket.STATUS_ASSIGNED] * 2 + [TournamentEntryTicket.STATUS_REJECTED]
+        )
+        self.assertEqual(tickets[2].reason, UserTournamentGroup.REJECTED_ALREADY_ENTERED)
+        self.assertEqual(User.objects.get(pk=self.users[2].pk).coins, Tournament.ENTRY_FEE)
+        self.assertEqual(User.objects.get(pk=self.users[0].pk).coins, 0)
+
+
+class ConcurrentEntryQueueTest(TransactionTestCase):
+    WORKER_COUNT = 4
+
+    def test_workers_assign_each_ticket_once(self):
+        tournament = Tournament.objects.create(date=timezone.now().date())
+        users = create_users(3 * TournamentGroup.GROUP_SIZE)
+        with mock.patch.object(entry_queue._worker, 'start'):
+            for user in users:
+                TournamentEntryTicket.enqueue(user, tournament)
+
+        def work():
+            try:
+                entry_queue.drain(batch_size=10)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=work) for _ in range(self.WORKER_COUNT)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertFalse(TournamentEntryTicket.objects.exclude(status=TournamentEntryTicket.STATUS_ASSIGNED).exists())
+        self.assertEqual(UserTournamentGroup.objects.count(), len(users))
+        for group in TournamentGroup.objects.filter(tournament=tournament):
+            self.assertEqual(group.member_count, group.users.count())
+            self.assertLessEqual(group.member_count, TournamentGroup.GROUP_SIZE)
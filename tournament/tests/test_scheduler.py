@@ -0,0 +1,119 @@
+import threading
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from tournament.models import Tournament, TournamentEntryTicket, TournamentGroup
+from tournament.scheduler import TournamentScheduler, catch_up, cleanup
+from user.models import User, UserDeletion
+
+
+class CatchUpTest(TestCase):
+    def run_catch_up(self, hour):
+        now = timezone.make_aware(datetime.combine(timezone.now().date(), datetime.min.time())) + timedelta(hours=hour)
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            catch_up()
+
+        return now.date()
+
+    def test_creates_todays_tournament(self):
+        today = self.run_catch_up(Tournament.ENTRY_END_HOUR - 1)
+
+        self.assertEqual(list(Tournament.objects.values_list('date', flat=True)), [today])
+
+    def test_creates_tomorrows_tournament_after_entry_ends(self):
+        today = self.run_catch_up(Tournament.ENTRY_END_HOUR)
+        self.run_catch_up(Tournament.ENTRY_END_HOUR + 1)
+
+        self.assertEqual(
+            sorted(Tournament.objects.values_list('date', flat=True)),
+            [today, today + timedelta(days=1)]
+        )
+
+    def test_provisions_groups_of_new_tournaments(self):
+        yesterday = Tournament.objects.create(date=timezone.now().date() - timedelta(days=1), settled=True)
+        TournamentGroup.objects.create(tournament=yesterday, level_bucket=0, member_count=TournamentGroup.GROUP_SIZE)
+
+        today = self.run_catch_up(Tournament.ENTRY_END_HOUR)
+
+        for date in (today, today + timedelta(days=1)):
+            self.assertEqual(
+                list(TournamentGroup.objects.filter(tournament__date=date).values_list('level_bucket', 'member_count')),
+                [(0, 0)]
+            )
+
+    def test_settles_passed_tournaments(self):
+        passed = Tournament.objects.create(date=timezone.now().date() - timedelta(days=2))
+
+        self.run_catch_up(1)
+
+        passed.refresh_from_db()
+        self.assertTrue(passed.settled)
+
+    def test_cleanup(self):
+        user = User.objects.create(username='test', coins=Tournament.ENTRY_FEE)
+        settled = Tournament.objects.create(date=timezone.now().date() - timedelta(days=2), settled=True)
+        current = Tournament.objects.create(date=timezone.now().date())
+        TournamentEntryTicket.objects.create(user=user, tournament=settled, status=TournamentEntryTicket.STATUS_ASSIGNED)
+        TournamentEntryTicket.objects.create(user=user, tournament=current, status=TournamentEntryTicket.STATUS_ASSIGNED)
+        TournamentGroup.objects.create(tournament=settled, member_count=1)
+        TournamentGroup.objects.create(tournament=settled)
+        TournamentGroup.objects.create(tournament=current)
+        UserDeletion.objects.create(user_id=1)
+        UserDeletion.objects.create(user_id=2)
+        UserDeletion.objects.filter(user_id=1).update(created_at=timezone.now() - timedelta(days=31))
+
+        cleanup()
+
+        self.assertEqual(list(TournamentEntryTicket.objects.values_list('tournament', flat=True)), [current.id])
+        self.assertEqual(list(UserDeletion.objects.values_list('user_id', flat=True)), [2])
+        self.assertEqual(
+            sorted(TournamentGroup.objects.values_list('tournament', 'member_count')),
+            sorted([(settled.id, 1), (current.id, 0)])
+        )
+
+
+class LeaderElectionTest(TransactionTestCase):
+    def in_thread(self, function):
+        result = []
+
+        def run():
+            try:
+                result.append(function())
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+        return result[0]
+
+    def test_one_leader_at_a_time(self):
+        leader = TournamentScheduler()
+        follower = TournamentScheduler()
+
+        self.assertTrue(leader._acquire())
+        self.assertTrue(leader._holds_lock())
+        self.assertFalse(self.in_thread(follower._acquire))
+
+        leader._release()
+
+        self.assertFalse(leader._holds_lock())
+        self.assertTrue(self.in_thread(follower._acquire))
+        connection.close()
+
+    def test_leader_steps_down_when_it_loses_the_lock(self):
+        scheduler = TournamentScheduler()
+
+        with mock.patch('tournament.scheduler.catch_up'), \
+                mock.patch('tournament.scheduler.BackgroundScheduler') as background_scheduler, \
+                mock.patch.object(scheduler, '_holds_lock', return_value=False), \
+                self.settings(SCHEDULER_LEADER_CHECK_SECONDS=0), \
+                self.assertLogs('tournament.scheduler', 'WARNING'):
+            scheduler._lead()
+
+        background_scheduler.return_value.start.assert_called_once()
+        background_scheduler.return_value.shutdown.assert_called_once()
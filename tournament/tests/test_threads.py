@@ -0,0 +1,32 @@
+import threading
+
+from django.test import SimpleTestCase
+
+from GoodBlast.threads import BackgroundThread
+
+
+class BackgroundThreadTest(SimpleTestCase):
+    def test_starts_once_and_finishes_its_round_on_stop(self):
+        rounds = []
+        started = threading.Event()
+
+        def run():
+            started.set()
+            while True:
+                stopped = thread.wait(60)
+                rounds.append(stopped)
+                if stopped:
+                    return
+
+        thread = BackgroundThread(run, 'test-thread')
+        thread.start()
+        thread.start()
+        started.wait()
+
+        self.assertEqual(len([t for t in threading.enumerate() if t.name == 'test-thread']), 1)
+        self.assertTrue(thread.is_alive())
+
+        thread.stop()
+
+        self.assertEqual(rounds, [True])
+        self.assertFalse(thread.is_alive())
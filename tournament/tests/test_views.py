@@ -1,11 +1,14 @@
 from datetime import timedelta, datetime
 from unittest import mock
 
+from django.test import override_settings
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 
+from leaderboard.standings import country_standings
+from tournament.membership import NOT_ENTERED
 from tournament.models import Tournament, UserTournamentGroup, TournamentGroup
 from user.models import User
 
@@ -83,6 +86,35 @@ class EnterTournamentViewTest(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_failure_due_to_already_entered_with_stale_cache(self):
+        Tournament.objects.create(date=timezone.now().date())
+        User.objects.filter(pk=self.user.pk).update(coins=2 * Tournament.ENTRY_FEE)
+
+        mocked_datetime = timezone.make_aware(datetime.combine(timezone.now().date(), datetime.min.time()))
+        mocked_datetime += timedelta(hours=Tournament.ENTRY_END_HOUR - 1)
+
+        with mock.patch('django.utils.timezone.now') as mock_now:
+            mock_now.return_value = mocked_datetime
+            response = self.client.post(self.url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            with mock.patch('tournament.views.membership_cache.get', return_value=NOT_ENTERED):
+                response = self.client.post(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['message'], "You have already entered the tournament.")
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.coins, Tournament.ENTRY_FEE)
+
+    def test_failure_due_to_no_tournament(self):
+        mocked_datetime = timezone.make_aware(datetime.combine(timezone.now().date(), datetime.min.time()))
+        mocked_datetime += timedelta(hours=Tournament.ENTRY_END_HOUR - 1)
+
+        with mock.patch('django.utils.timezone.now') as mock_now:
+            mock_now.return_value = mocked_datetime
+            response = self.client.post(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_failure_due_to_no_user(self):
         self.client.logout()
 
@@ -91,6 +123,53 @@ class EnterTournamentViewTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+@override_settings(INTERNAL_API_KEY='internal-key')
+class BulkEnterTournamentViewTest(APITestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.tournament = Tournament.objects.create(date=timezone.now().date())
+        self.users = [
+            User.objects.create(
+                username=f'test{i}',
+                country='US',
+                current_level=Tournament.USER_LEVEL_REQUIREMENT,
+                coins=Tournament.ENTRY_FEE
+            )
+            for i in range(3)
+        ]
+        self.url = reverse('bulk-enter-tournament')
+        self.before_entry_end_hour = timezone.make_aware(
+            datetime.combine(timezone.now().date(), datetime.min.time())
+        ) + timedelta(hours=Tournament.ENTRY_END_HOUR - 1)
+
+    def _post(self, data, api_key='internal-key'):
+        with mock.patch('django.utils.timezone.now') as mock_now:
+            mock_now.return_value = self.before_entry_end_hour
+            return self.client.post(self.url, data, format='json', HTTP_X_INTERNAL_API_KEY=api_key)
+
+    def test_success(self):
+        self.users[2].coins = 0
+        self.users[2].save()
+
+        response = self._post({'users': [user.id for user in self.users]})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['tournament'], self.tournament.id)
+        self.assertEqual([entry['user'] for entry in response.data['entered']], [self.users[0].id, self.users[1].id])
+        self.assertEqual(response.data['rejected'], {self.users[2].id: UserTournamentGroup.REJECTED_INSUFFICIENT_COINS})
+
+    def test_failure_due_to_invalid_api_key(self):
+        response = self._post({'users': [self.users[0].id]}, api_key='wrong-key')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(UserTournamentGroup.objects.exists())
+
+    def test_failure_due_to_empty_users(self):
+        response = self._post({'users': []})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class ClaimTournamentRewardViewTest(APITestCase):
     def setUp(self) -> None:
         self.client = APIClient()
@@ -142,6 +221,24 @@ class ClaimTournamentRewardViewTest(APITestCase):
         self.assertEqual(response.data.get('coins'), TournamentGroup.get_ranks_reward(1) * 2 + self.old_coins)
         self.assertEqual(self.user.coins, TournamentGroup.get_ranks_reward(1) * 2 + self.old_coins)
 
+    def test_claims_settled_rewards_in_one_update_per_table(self):
+        now = timezone.now()
+        for days in range(1, 6):
+            tournament = Tournament.objects.create(date=now.date() - timezone.timedelta(days=days))
+            group = TournamentGroup.objects.create(tournament=tournament)
+            UserTournamentGroup.objects.create(user=self.user, group=group, score=1)
+            tournament.settle()
+
+        # Settlement catch-up, savepoint, rows UPDATE ... RETURNING, coins UPDATE ... RETURNING, release.
+        with self.assertNumQueries(5):
+            response = self.client.post(self.url)
+
+        expected_coins = self.old_coins + TournamentGroup.get_ranks_reward(1) * 5
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data.get('coins'), expected_coins)
+        self.assertEqual(User.objects.get(pk=self.user.pk).coins, expected_coins)
+        self.assertFalse(UserTournamentGroup.objects.filter(user=self.user, claimed_reward=False).exists())
+
     def test_failure_due_to_already_claimed(self):
         now = timezone.now()
         tournament = Tournament.objects.create(date=now.date())
@@ -222,6 +319,40 @@ class ProgressInTournamentTest(APITestCase):
         self.assertEqual(self.user.coins, first_coins + User.LEVEL_COMPLETE_COIN_REWARD)
         self.assertEqual(self.user.current_level, first_levels + 1)
 
+    def test_single_round_trip(self):
+        tournament = Tournament.objects.create(date=timezone.now().date())
+        group = TournamentGroup.objects.create(tournament=tournament)
+        user_group = UserTournamentGroup.objects.create(user=self.user, group=group, score=1)
+
+        # Including the work done once the request commits: the standings change is merged and written later.
+        with mock.patch.object(country_standings._flusher, 'start'):
+            with self.assertNumQueries(1), self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('user-progress', kwargs={"username": self.user.username}))
+
+        self.assertEqual(len(country_standings), 1)
+
+        user_group.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {
+            "coins": Tournament.ENTRY_FEE + User.LEVEL_COMPLETE_COIN_REWARD,
+            "current_level": Tournament.USER_LEVEL_REQUIREMENT + 1,
+        })
+        self.assertEqual(user_group.score, 2)
+
+    def test_only_current_tournament_score_changes(self):
+        passed_tournament = Tournament.objects.create(date=timezone.now().date() - timedelta(days=1))
+        group = TournamentGroup.objects.create(tournament=passed_tournament)
+        user_group = UserTournamentGroup.objects.create(user=self.user, group=group, score=1)
+
+        response = self.client.post(reverse('user-progress', kwargs={"username": self.user.username}))
+
+        user_group.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data.get('current_level'), Tournament.USER_LEVEL_REQUIREMENT + 1)
+        self.assertEqual(user_group.score, 1)
+
 
 class UserTournamentScoreDetailsViewTest(APITestCase):
     def setUp(self) -> None:
@@ -1,9 +1,12 @@
 from django.urls import path
 
-from tournament.views import EnterTournament, ClaimTournamentReward, UserTournamentScoreDetails
+from tournament.views import EnterTournament, BulkEnterTournament, TournamentEntryStatus, ClaimTournamentReward, \
+    UserTournamentScoreDetails
 
 urlpatterns = [
     path('enter', EnterTournament.as_view(), name='enter-tournament'),
+    path('enter/bulk', BulkEnterTournament.as_view(), name='bulk-enter-tournament'),
+    path('enter/<int:ticket>', TournamentEntryStatus.as_view(), name='tournament-entry-status'),
     path('claim-reward', ClaimTournamentReward.as_view(), name='claim-tournament-reward'),
     path('<int:tournament>', UserTournamentScoreDetails.as_view(), name='user-tournament-score-details'),
 ]
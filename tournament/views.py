@@ -1,16 +1,19 @@
-from django.db.models import Window, F
-from django.db.models.functions import Rank
+from django.conf import settings
+from django.db import IntegrityError
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.generics import GenericAPIView, RetrieveAPIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from tournament.models import Tournament, UserTournamentGroup, TournamentGroup
-from tournament.serializer import TournamentIDSerializer
+from GoodBlast.renderers import FastRenderingMixin
+from tournament.membership import membership_cache, NOT_ENTERED
+from tournament.models import Tournament, UserTournamentGroup, TournamentEntryTicket
+from tournament.permissions import HasInternalApiKey
+from tournament.serializer import TournamentIDSerializer, BulkEntrySerializer
 
 
-class EnterTournament(GenericAPIView):
+class EnterTournament(FastRenderingMixin, GenericAPIView):
     permission_classes = [IsAuthenticated, ]
 
     def post(self, request, *args, **kwargs):
@@ -32,13 +35,45 @@ class EnterTournament(GenericAPIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
         tournament = Tournament.get_current_tournament()
+        if tournament is None:
+            return Response({
+                "message": "There is no active tournament."
+            }, status=status.HTTP_404_NOT_FOUND)
 
-        if UserTournamentGroup.objects.filter(user=user, group__tournament=tournament).exists():
+        # Only an entry is trusted from the cache, enter_tournament confirms non-membership under a lock.
+        if membership_cache.get(user.pk, tournament) != NOT_ENTERED:
             return Response({
                 "message": "You have already entered the tournament."
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        tournament_group = UserTournamentGroup.enter_tournament(user, tournament)
+        if settings.TOURNAMENT_ENTRY_QUEUE:
+            try:
+                ticket = TournamentEntryTicket.enqueue(user, tournament)
+            except IntegrityError:
+                return Response({
+                    "message": "You have already entered the tournament."
+                }, status=status.HTTP_400_BAD_REQUEST)
+            except ValueError:
+                return Response({
+                    "message": f"You should have at least {Tournament.ENTRY_FEE} coins to enter the tournament."
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            return Response({
+                "ticket": ticket.id,
+                "tournament": tournament.id,
+                "status": ticket.status
+            }, status=status.HTTP_202_ACCEPTED)
+
+        try:
+            tournament_group = UserTournamentGroup.enter_tournament(user, tournament)
+        except IntegrityError:
+            return Response({
+                "message": "You have already entered the tournament."
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response({
+                "message": f"You should have at least {Tournament.ENTRY_FEE} coins to enter the tournament."
+            }, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({
             "tournament": tournament.id,
@@ -47,7 +82,58 @@ class EnterTournament(GenericAPIView):
         }, status=status.HTTP_200_OK)
 
 
-class UserTournamentScoreDetails(GenericAPIView):
+class TournamentEntryStatus(FastRenderingMixin, GenericAPIView):
+    permission_classes = [IsAuthenticated, ]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            ticket = TournamentEntryTicket.objects\
+                .select_related('entry')\
+                .get(pk=kwargs['ticket'], user=request.user)
+        except TournamentEntryTicket.DoesNotExist:
+            return Response({
+                "message": "Tournament entry does not exist."
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            "ticket": ticket.id,
+            "tournament": ticket.tournament_id,
+            "status": ticket.status,
+            "group": ticket.entry.group_id if ticket.entry else None,
+            "reason": ticket.reason or None
+        }, status=status.HTTP_200_OK)
+
+
+class BulkEnterTournament(FastRenderingMixin, GenericAPIView):
+    authentication_classes = []
+    permission_classes = [HasInternalApiKey, ]
+
+    def post(self, request, *args, **kwargs):
+        serializer = BulkEntrySerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        if timezone.now().hour >= Tournament.ENTRY_END_HOUR:
+            return Response({
+                "message": f"Tournament entry hour {Tournament.ENTRY_END_HOUR} UTC has passed."
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        tournament = Tournament.get_current_tournament()
+        if tournament is None:
+            return Response({
+                "message": "There is no active tournament."
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        entries, rejected = UserTournamentGroup.bulk_enter_tournament(serializer.validated_data['users'], tournament)
+
+        return Response({
+            "tournament": tournament.id,
+            "entered": [{"user": entry.user_id, "group": entry.group_id} for entry in entries],
+            "rejected": rejected
+        }, status=status.HTTP_200_OK)
+
+
+class UserTournamentScoreDetails(FastRenderingMixin, GenericAPIView):
     permission_classes = [IsAuthenticated, ]
 
     def get(self, request, *args, **kwargs):
@@ -60,7 +146,7 @@ class UserTournamentScoreDetails(GenericAPIView):
 
         user_tournament_group = UserTournamentGroup.objects.filter(
             user=user,
-            group__tournament__id=tournament_id
+            tournament_id=tournament_id
         ).first()
 
         if not user_tournament_group:
@@ -69,13 +155,13 @@ class UserTournamentScoreDetails(GenericAPIView):
             }, status=status.HTTP_404_NOT_FOUND)
 
         return Response({
-            "tournament": user_tournament_group.group.tournament.id,
-            "group": user_tournament_group.group.id,
+            "tournament": user_tournament_group.tournament_id,
+            "group": user_tournament_group.group_id,
             "score": user_tournament_group.score
         }, status=status.HTTP_200_OK)
 
 
-class ClaimTournamentReward(GenericAPIView):
+class ClaimTournamentReward(FastRenderingMixin, GenericAPIView):
     permission_classes = [IsAuthenticated, ]
 
     def post(self, request, *args, **kwargs):
@@ -86,34 +172,20 @@ class ClaimTournamentReward(GenericAPIView):
 
         user = request.user
 
-        users_passed_completed_groups = UserTournamentGroup.objects.filter(
-            claimed_reward=False,
-            group__tournament__date__lt=timezone.now().date(),
-        ).annotate(
-            rank=Window(
-                expression=Rank(),
-                order_by=F('score').desc(),
-                partition_by=F('group')
-            )
-        ).filter(rank__lte=TournamentGroup.RANKING_REWARD_GROUPS[-1]["end"])
-
-        users_passed_completed_groups = users_passed_completed_groups.filter(pk__in=users_passed_completed_groups, user=user)
+        # Settlement normally runs from the scheduler, this only catches up on tournaments it has not reached yet.
+        Tournament.settle_passed_tournaments(entries__user=user, entries__claimed_reward=False)
 
+        tournament_id = None
         if tournament_id_parameter:
             tournament_id = serializer.validated_data.get('tournament')
-            users_passed_completed_groups = users_passed_completed_groups.filter(group__tournament__id=tournament_id)
 
-        if not users_passed_completed_groups:
+        claimed, _ = UserTournamentGroup.claim_rewards(user, tournament_id)
+
+        if not claimed:
             return Response({
                 "message": f"There is no tournament you have ever completed and not received the rewards."
             }, status=status.HTTP_404_NOT_FOUND)
 
-        for group in users_passed_completed_groups:
-            rank = group.get_rank()
-            group.claim_reward(rank)
-
-        user.refresh_from_db(fields=('coins',))
-
         return Response({
             "message": "Successfully claimed tournament rewards.",
             "coins": user.coins
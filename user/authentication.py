@@ -0,0 +1,30 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from user.models import User
+from user.revocation import revoked_users
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that builds the user from the claims of the access
+    token instead of loading it on every request, see User.from_claims.
+    Tokens issued without the claims fall back to loading the user, tokens
+    of users deleted since they were issued are rejected from
+    user.revocation.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        if not all(claim in validated_token for claim in User.TOKEN_CLAIMS):
+            return super().get_user(validated_token)
+
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        if validated_token['deleted'] or user_id in revoked_users:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        return User.from_claims(user_id, validated_token)
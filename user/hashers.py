@@ -0,0 +1,103 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    The hashers of this module read their cost from the PASSWORD_* settings,
+    so it can be tuned per deployment. Hashes made with another cost are
+    rehashed on the next login.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return settings.PASSWORD_SCRYPT_WORK_FACTOR
+
+    @property
+    def block_size(self):
+        return settings.PASSWORD_SCRYPT_BLOCK_SIZE
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_SCRYPT_PARALLELISM
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """
+    Argon2id, needs argon2-cffi installed.
+    """
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class PasswordHashingPool:
+    """
+    Bounded pool of PASSWORD_HASHING_WORKERS threads hashing and verifying
+    passwords. hashlib and argon2 release the GIL while hashing, so the pool
+    bounds the CPU a burst of signups and logins takes; the calling request
+    thread still waits for its hash.
+
+    Only the hashing runs in the pool, saving a rehashed password is left to
+    the caller and its database connection.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=settings.PASSWORD_HASHING_WORKERS or os.cpu_count(),
+                        thread_name_prefix='password-hashing'
+                    )
+                    self._pid = os.getpid()
+
+        return self._executor
+
+    def run(self, function, *args):
+        return self._get_executor().submit(function, *args).result()
+
+
+password_pool = PasswordHashingPool()
+
+
+def make_password(password):
+    return password_pool.run(hashers.make_password, password)
+
+
+def _check_password(password, encoded):
+    must_update = []
+    is_correct = hashers.check_password(password, encoded, setter=must_update.append)
+    return is_correct, bool(must_update)
+
+
+def check_password(password, encoded):
+    """
+    Returns whether the password matches the encoded hash, and whether the
+    hash should be remade with the preferred hasher and cost.
+    """
+    return password_pool.run(_check_password, password, encoded)
@@ -0,0 +1,157 @@
+import csv
+import itertools
+import json
+import random
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django_countries import countries
+
+from tournament.models import Tournament, UserTournamentGroup
+from user.hashers import make_password
+from user.models import User
+
+
+def parse_weights(value):
+    """
+    Parses "TR=5,US=3,DE" into ([TR, US, DE], [5, 3, 1]).
+    """
+    choices, weights = [], []
+    for item in value.split(','):
+        choice, _, weight = item.strip().partition('=')
+        choices.append(choice)
+        weights.append(float(weight or 1))
+
+    return choices, weights
+
+
+class Command(BaseCommand):
+    help = (
+        "Inserts users in chunks for load testing, read from a CSV or JSONL file with username, country and optional "
+        "current_level and coins fields, or generated with --count. All users share one password."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', nargs='?', help="CSV or JSONL file of users, read from stdin when it is -.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Defaults to the extension of the file.")
+        parser.add_argument('--count', type=int, help="Number of synthetic users to generate instead of reading a file.")
+        parser.add_argument('--prefix', default='user', help="Username prefix of synthetic users.")
+        parser.add_argument('--start', type=int, default=0, help="Number of the first synthetic username.")
+        parser.add_argument('--countries', default='TR,US,DE,GB,FR', help="Weighted countries, e.g. TR=5,US=3,DE.")
+        parser.add_argument('--levels', default='1-100', help="Weighted level ranges, e.g. 1-9=5,10-99=3,100-500.")
+        parser.add_argument('--password', default='password')
+        parser.add_argument('--enter', action='store_true', help="Enter the inserted users into today's tournament.")
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--seed', type=int, help="Random seed of synthetic users.")
+
+    def handle(self, *args, **options):
+        tournament = None
+        if options['enter']:
+            tournament = Tournament.get_current_tournament()
+            if tournament is None:
+                raise CommandError("There is no tournament today.")
+
+        if options['count'] is not None:
+            rows = self._generate(options)
+        elif options['file']:
+            rows = self._read(options)
+        else:
+            raise CommandError("Give a file of users or --count.")
+
+        # Hashed once, hashing a password per user would take most of the time.
+        password = make_password(options['password'])
+        started = time.perf_counter()
+        inserted = skipped = entered = 0
+        rejected = {}
+
+        while chunk := list(itertools.islice(rows, options['batch_size'])):
+            users = [
+                User(
+                    password=password,
+                    username=row['username'],
+                    country=row['country'],
+                    current_level=row.get('current_level', 1),
+                    coins=row.get('coins', 1000)
+                )
+                for row in chunk
+            ]
+            user_ids = User.bulk_insert(users)
+            inserted += len(user_ids)
+            skipped += len(users) - len(user_ids)
+
+            if tournament is not None and user_ids:
+                entries, chunk_rejected = UserTournamentGroup.bulk_enter_tournament(user_ids, tournament)
+                entered += len(entries)
+                rejected.update(chunk_rejected)
+
+            if options['verbosity'] > 1:
+                self.stdout.write(f"Inserted {inserted} users.")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Inserted {inserted} users in {elapsed:.1f}s ({inserted / max(elapsed, 1e-9):.0f}/s), "
+            f"skipped {skipped} taken usernames."
+        ))
+        if tournament is not None:
+            self.stdout.write(self.style.SUCCESS(
+                f"Entered {entered} users into tournament {tournament.id}, rejected {len(rejected)}."
+            ))
+
+    def _generate(self, options):
+        try:
+            country_choices, country_weights = parse_weights(options['countries'])
+            level_choices, level_weights = parse_weights(options['levels'])
+            level_ranges = [tuple(int(level) for level in choice.split('-')) for choice in level_choices]
+        except ValueError as error:
+            raise CommandError(f"Invalid distribution: {error}")
+
+        for country in country_choices:
+            if not countries.alpha2(country):
+                raise CommandError(f"Invalid country: {country}")
+
+        generator = random.Random(options['seed'])
+        for number in range(options['start'], options['start'] + options['count']):
+            level_range = generator.choices(level_ranges, level_weights)[0]
+            yield {
+                'username': f"{options['prefix']}{number}",
+                'country': countries.alpha2(generator.choices(country_choices, country_weights)[0]),
+                'current_level': generator.randint(level_range[0], level_range[-1]),
+            }
+
+    def _read(self, options):
+        path = options['file']
+        file_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+        try:
+            file = sys.stdin if path == '-' else open(path, newline='')
+        except OSError as error:
+            raise CommandError(f"Could not read {path}: {error}")
+
+        try:
+            if file_format == 'jsonl':
+                rows = ((number, line) for number, line in enumerate(file, 1) if line.strip())
+            else:
+                rows = enumerate(csv.DictReader(file), 2)
+
+            for number, row in rows:
+                try:
+                    yield self._clean(json.loads(row) if file_format == 'jsonl' else row)
+                except (AttributeError, KeyError, TypeError, ValueError) as error:
+                    self.stderr.write(f"Line {number}: invalid user {error}")
+        finally:
+            if file is not sys.stdin:
+                file.close()
+
+    @staticmethod
+    def _clean(row):
+        user = {'username': str(row['username']).strip(), 'country': countries.alpha2(str(row['country']))}
+        if not 0 < len(user['username']) <= User._meta.get_field('username').max_length:
+            raise ValueError(f"username {user['username']!r}")
+        if not user['country']:
+            raise ValueError(f"country {row['country']!r}")
+
+        for field in ('current_level', 'coins'):
+            if row.get(field) not in (None, ''):
+                user[field] = int(row[field])
+
+        return user
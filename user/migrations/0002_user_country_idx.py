@@ -0,0 +1,17 @@
+# Generated by Django 4.2.9 on 2026-10-18 10:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(fields=["country"], name="user_country_idx"),
+        ),
+    ]
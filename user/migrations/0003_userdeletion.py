@@ -0,0 +1,36 @@
+# Generated by Django 4.2.9 on 2026-10-18 10:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0002_user_country_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserDeletion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("user_id", models.BigIntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["created_at"], name="user_deletion_created_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -1,7 +1,15 @@
-from django.db import models
+import csv
+import io
+
+from django.db import connection, models, transaction
+from django.db.models import F, Q
 from django.contrib.auth.models import BaseUserManager, AbstractBaseUser
+from django.utils import timezone
 from django_countries.fields import CountryField
 
+from GoodBlast.db import update_returning
+from user import hashers
+
 
 class UserManager(BaseUserManager):
     def create_user(self, username, country, password=None):
@@ -48,24 +56,142 @@ class User(AbstractBaseUser):
     REQUIRED_FIELDS = ['country', ]
 
     LEVEL_COMPLETE_COIN_REWARD = 100
+    # Immutable fields carried by access tokens, see user.authentication.
+    TOKEN_CLAIMS = ('username', 'country', 'deleted')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['country'], name='user_country_idx'),
+        ]
+
+    @classmethod
+    def from_claims(cls, user_id, claims):
+        """
+        Builds the user carried by the claims of a token. Its other fields are
+        deferred and loaded together the first time one of them is read.
+        """
+        values = {'id': user_id, **{claim: claims[claim] for claim in cls.TOKEN_CLAIMS}}
+        field_names = [field.attname for field in cls._meta.concrete_fields if field.attname in values]
+        return cls.from_db(None, field_names, [values[field_name] for field_name in field_names])
+
+    @classmethod
+    @transaction.atomic
+    def bulk_insert(cls, users):
+        """
+        Inserts unsaved users, skipping the ones whose username is taken, and
+        returns the ids of the inserted ones. On PostgreSQL the rows are
+        streamed into a temporary table with COPY and moved with a single
+        INSERT ... ON CONFLICT DO NOTHING.
+        """
+        now = timezone.now()
+        for user in users:
+            user.created_at = user.updated_at = now
+
+        if connection.vendor != 'postgresql':
+            taken = set(
+                cls._base_manager.filter(username__in=[user.username for user in users]).values_list('username', flat=True)
+            )
+            users = list({user.username: user for user in users if user.username not in taken}.values())
+            return [user.pk for user in cls.objects.bulk_create(users)]
+
+        table = connection.ops.quote_name(cls._meta.db_table)
+        fields = [
+            field for field in cls._meta.concrete_fields
+            if not field.primary_key and field.attname != 'last_login'
+        ]
+        columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+
+        rows = io.StringIO()
+        writer = csv.writer(rows)
+        for user in users:
+            writer.writerow([field.get_db_prep_save(getattr(user, field.attname), connection) for field in fields])
+        rows.seek(0)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE TEMPORARY TABLE user_import AS SELECT {columns} FROM {table} WITH NO DATA")
+            cursor.copy_expert(f"COPY user_import ({columns}) FROM STDIN WITH (FORMAT csv)", rows)
+            cursor.execute(f"""
+                INSERT INTO {table} ({columns})
+                SELECT {columns} FROM user_import
+                ON CONFLICT (username) DO NOTHING
+                RETURNING id
+            """)
+            user_ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute("DROP TABLE user_import")
+
+        return user_ids
+
+    def get_token_claims(self):
+        return {'username': self.username, 'country': str(self.country), 'deleted': self.deleted}
+
+    def set_password(self, raw_password):
+        self.password = hashers.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        is_correct, must_update = hashers.check_password(raw_password, self.password)
+        if is_correct and must_update:
+            self.set_password(raw_password)
+            self._password = None
+            self.save(update_fields=['password'])
+
+        return is_correct
+
+    def refresh_from_db(self, using=None, fields=None):
+        deferred_fields = self.get_deferred_fields()
+        if fields is not None and deferred_fields.issuperset(fields):
+            # Loads every deferred field of a claims-backed user in one query instead of one per field.
+            fields = list(deferred_fields)
+
+        super().refresh_from_db(using, fields)
+
+    def _increment(self, condition=Q(), **amounts):
+        if self._state.adding:
+            self.save()
+
+        fields = [*amounts, 'updated_at']
+        rows = update_returning(
+            User.objects.filter(condition, pk=self.pk),
+            fields,
+            updated_at=timezone.now(),
+            **{field: F(field) + amount for field, amount in amounts.items()}
+        )
+
+        if not rows:
+            return False
+
+        for field, value in zip(fields, rows[0]):
+            setattr(self, field, value)
+
+        return True
 
     def complete_levels(self, level_count=1):
-        self.current_level += level_count
-        self.coins += self.LEVEL_COMPLETE_COIN_REWARD * level_count
-        self.save()
+        self._increment(
+            current_level=level_count,
+            coins=self.LEVEL_COMPLETE_COIN_REWARD * level_count
+        )
 
     def gain_coin(self, amount):
-        self.coins += amount
-        self.save()
+        self._increment(coins=amount)
 
     def lose_coin(self, amount):
-        current_coin = self.coins - amount
-
-        if current_coin < 0:
+        if not self._increment(Q(coins__gte=amount), coins=-amount):
             raise ValueError("Not enough coins")
 
-        self.coins = current_coin
-        self.save()
-
     def __str__(self):
         return self.username
+
+
+class UserDeletion(models.Model):
+    """
+    Change log of deleted users, read incrementally by user.revocation to
+    reject the access tokens they were issued. Kept as a plain id since the
+    user row may be gone.
+    """
+    user_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='user_deletion_created_idx'),
+        ]
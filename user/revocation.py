@@ -0,0 +1,97 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+
+class RevocationList:
+    """
+    Users deleted within the lifetime of an access token, checked by
+    user.authentication so claims-backed tokens of deleted users are
+    rejected without loading the user.
+
+    Deletions made in this process are added when they commit, the ones made
+    by other processes are read from the UserDeletion log every
+    REVOCATION_REFRESH_INTERVAL_MS by one request at a time, while the
+    others keep reading the current list. Each refresh reads the log from
+    COMMIT_LAG before the previous one, so rows of transactions that
+    committed late are not missed.
+    """
+
+    COMMIT_LAG = timedelta(minutes=1)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._deleted_at = {}
+        self._refreshed_at = None
+        self._next_refresh = 0
+
+    def __contains__(self, user_id):
+        # Only the first load is waited for, a refresh already running elsewhere is not.
+        if time.monotonic() >= self._next_refresh and self._refresh_lock.acquire(blocking=self._refreshed_at is None):
+            try:
+                if time.monotonic() >= self._next_refresh:
+                    self.refresh()
+            finally:
+                self._refresh_lock.release()
+
+        return user_id in self._deleted_at
+
+    def add(self, user_id):
+        with self._lock:
+            self._deleted_at[user_id] = timezone.now()
+
+    def refresh(self):
+        from user.models import UserDeletion
+
+        now = timezone.now()
+        expired = now - api_settings.ACCESS_TOKEN_LIFETIME
+        with self._lock:
+            since = expired if self._refreshed_at is None else self._refreshed_at - self.COMMIT_LAG
+            self._next_refresh = time.monotonic() + settings.REVOCATION_REFRESH_INTERVAL_MS / 1000
+
+        deletions = UserDeletion.objects\
+            .filter(created_at__gte=since)\
+            .values_list('user_id', 'created_at')
+
+        with self._lock:
+            self._deleted_at.update(deletions)
+            # Tokens issued before an expired deletion have expired as well.
+            self._deleted_at = {
+                user_id: deleted_at for user_id, deleted_at in self._deleted_at.items() if deleted_at >= expired
+            }
+            self._refreshed_at = now
+
+    def clear(self):
+        with self._lock:
+            self._deleted_at.clear()
+            self._refreshed_at = None
+            self._next_refresh = 0
+
+
+revoked_users = RevocationList()
+
+
+def record_deletion(user_id):
+    from user.models import UserDeletion
+
+    UserDeletion.objects.create(user_id=user_id)
+    transaction.on_commit(lambda: revoked_users.add(user_id))
+
+
+@receiver(post_save, sender='user.User')
+def record_soft_deletion(sender, instance, created, **kwargs):
+    if instance.deleted:
+        record_deletion(instance.pk)
+
+
+@receiver(post_delete, sender='user.User')
+def record_hard_deletion(sender, instance, **kwargs):
+    record_deletion(instance.pk)
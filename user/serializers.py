@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
 from django_countries.serializers import CountryFieldMixin
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
 from user.models import User
 
@@ -23,3 +24,14 @@ class UserSerializer(CountryFieldMixin, serializers.ModelSerializer):
         )
         user.save()
         return user
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        # Copied to the access tokens of this refresh token, see user.authentication.
+        for claim, value in user.get_token_claims().items():
+            token[claim] = value
+
+        return token
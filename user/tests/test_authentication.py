@@ -0,0 +1,162 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from tournament.models import Tournament, UserTournamentGroup
+from user.authentication import ClaimsJWTAuthentication
+from user.models import User, UserDeletion
+from user.revocation import revoked_users
+from user.serializers import ClaimsTokenObtainPairSerializer
+
+
+@override_settings(REVOCATION_REFRESH_INTERVAL_MS=60000)
+class ClaimsJWTAuthenticationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test', password='testpassword', country='TR')
+        self.authentication = ClaimsJWTAuthentication()
+        revoked_users.clear()
+        revoked_users.refresh()
+
+    def _claims_token(self):
+        return ClaimsTokenObtainPairSerializer.get_token(self.user).access_token
+
+    def test_builds_user_from_claims(self):
+        with self.assertNumQueries(0):
+            user = self.authentication.get_user(self._claims_token())
+            self.assertEqual((user.pk, user.username, user.country.code), (self.user.pk, 'test', 'TR'))
+
+        # Every deferred field is loaded by the first read of one.
+        with self.assertNumQueries(1):
+            self.assertEqual((user.coins, user.current_level), (self.user.coins, self.user.current_level))
+
+    def test_rejects_deleted_users(self):
+        token = self._claims_token()
+        token['deleted'] = True
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.get_user(token)
+
+    def test_rejects_users_deleted_after_issue(self):
+        token = self._claims_token()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+
+        with self.assertNumQueries(0), self.assertRaises(AuthenticationFailed):
+            self.authentication.get_user(token)
+
+    def test_rejects_users_soft_deleted_after_issue(self):
+        token = self._claims_token()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.deleted = True
+            self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.get_user(token)
+
+    def test_reads_deletions_of_other_processes(self):
+        token = self._claims_token()
+        UserDeletion.objects.create(user_id=self.user.pk)
+
+        self.authentication.get_user(token)
+        revoked_users.refresh()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.get_user(token)
+
+    def test_refreshes_once_at_a_time(self):
+        token = self._claims_token()
+        UserDeletion.objects.create(user_id=self.user.pk)
+
+        revoked_users._next_refresh = 0
+
+        # Another request is refreshing the list, this one reads the current list.
+        with revoked_users._refresh_lock, self.assertNumQueries(0):
+            self.authentication.get_user(token)
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.get_user(token)
+
+    def test_forgets_deletions_older_than_tokens(self):
+        UserDeletion.objects.create(user_id=self.user.pk)
+        UserDeletion.objects.update(created_at=timezone.now() - timedelta(days=31))
+        revoked_users.clear()
+        revoked_users.refresh()
+
+        self.assertNotIn(self.user.pk, revoked_users)
+
+    def test_loads_users_of_tokens_without_claims(self):
+        with self.assertNumQueries(1):
+            user = self.authentication.get_user(AccessToken.for_user(self.user))
+
+        self.assertEqual(user.get_deferred_fields(), set())
+
+    def test_login_issues_claims(self):
+        response = self.client.post(reverse('token_obtain_pair'), {'username': 'test', 'password': 'testpassword'})
+        access = AccessToken(response.data['access'])
+
+        self.assertEqual(
+            {claim: access[claim] for claim in User.TOKEN_CLAIMS},
+            {'username': 'test', 'country': 'TR', 'deleted': False}
+        )
+
+
+@override_settings(REVOCATION_REFRESH_INTERVAL_MS=60000)
+class AuthenticationQueryCountTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        revoked_users.refresh()
+        self.user = User.objects.create_user(username='test', password='testpassword', country='TR')
+        User.objects.filter(pk=self.user.pk).update(current_level=Tournament.USER_LEVEL_REQUIREMENT)
+        self.user.refresh_from_db()
+
+        self.tournament = Tournament.objects.create(date=timezone.now().date())
+        UserTournamentGroup.enter_tournament(self.user, self.tournament).update_score(3)
+
+    def _count_queries(self, method, url, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with CaptureQueriesContext(connection) as queries:
+            response = method(url)
+        self.assertNotEqual(response.status_code, status.HTTP_401_UNAUTHORIZED, url)
+
+        return len(queries)
+
+    def test_claims_save_the_user_query(self):
+        claims_token = ClaimsTokenObtainPairSerializer.get_token(self.user).access_token
+        loaded_token = AccessToken.for_user(self.user)
+
+        for method, url in (
+            (self.client.get, reverse('global-leaderboard')),
+            (self.client.get, reverse('country-leaderboard')),
+            (self.client.get, reverse('group-leaderboard')),
+            (self.client.get, reverse('user-group-rank')),
+            (self.client.get, reverse('user-tournament-score-details', kwargs={'tournament': self.tournament.id})),
+            (self.client.post, reverse('user-progress', kwargs={'username': self.user.username})),
+        ):
+            # Fills the caches a first request warms, e.g. the group leaderboard snapshot.
+            self._count_queries(method, url, loaded_token)
+
+            self.assertEqual(
+                self._count_queries(method, url, claims_token),
+                self._count_queries(method, url, loaded_token) - 1,
+                url
+            )
+
+    def test_deleted_users_tokens_are_rejected(self):
+        claims_token = ClaimsTokenObtainPairSerializer.get_token(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {claims_token}')
+        url = reverse('user-detail', kwargs={'username': self.user.username})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertEqual(self.client.get(reverse('global-leaderboard')).status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,96 @@
+import json
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import timezone
+
+from tournament.models import Tournament, UserTournamentGroup
+from user.models import User
+
+
+class SeedUsersCommandTest(TestCase):
+    def seed(self, *args):
+        stdout = StringIO()
+        stderr = StringIO()
+        call_command('seed_users', *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def write_file(self, suffix, content):
+        file = tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False)
+        self.addCleanup(file.close)
+        file.write(content)
+        file.flush()
+        return file.name
+
+    def test_generates_users_in_batches(self):
+        stdout, _ = self.seed(
+            '--count', '25', '--batch-size', '10', '--countries', 'TR=3,US', '--levels', '1-9,20-30', '--seed', '1'
+        )
+
+        users = User.objects.filter(username__startswith='user')
+        self.assertEqual(users.count(), 25)
+        self.assertEqual({user.country.code for user in users}, {'TR', 'US'})
+        self.assertTrue(all(1 <= user.current_level <= 9 or 20 <= user.current_level <= 30 for user in users))
+        self.assertIn("Inserted 25 users", stdout)
+
+    def test_users_share_a_working_password(self):
+        self.seed('--count', '3', '--password', 'seedpassword')
+
+        passwords = set(User.objects.values_list('password', flat=True))
+        self.assertEqual(len(passwords), 1)
+        self.assertTrue(User.objects.get(username='user0').check_password('seedpassword'))
+
+    def test_skips_taken_usernames(self):
+        User.objects.create_user(username='user1', password='testpassword', country='GB')
+
+        stdout, _ = self.seed('--count', '3')
+
+        self.assertEqual(User.objects.get(username='user1').country.code, 'GB')
+        self.assertIn("Inserted 2 users", stdout)
+        self.assertIn("skipped 1 taken usernames", stdout)
+
+    def test_reads_csv(self):
+        path = self.write_file('.csv', "username,country,current_level,coins\nalice,tr,7,50\nbob,XX,1,\ncarol,US,,\n")
+
+        _, stderr = self.seed(path)
+
+        alice = User.objects.get(username='alice')
+        self.assertEqual((alice.country.code, alice.current_level, alice.coins), ('TR', 7, 50))
+        self.assertEqual(User.objects.get(username='carol').current_level, 1)
+        self.assertFalse(User.objects.filter(username='bob').exists())
+        self.assertIn("Line 3", stderr)
+
+    def test_reads_jsonl(self):
+        path = self.write_file('.jsonl', "\n".join([
+            json.dumps({'username': 'alice', 'country': 'TR', 'current_level': 12}),
+            "not json",
+            json.dumps({'username': 'bob', 'country': 'DE'}),
+        ]))
+
+        _, stderr = self.seed(path)
+
+        self.assertEqual(
+            set(User.objects.values_list('username', 'current_level')),
+            {('alice', 12), ('bob', 1)}
+        )
+        self.assertIn("Line 2", stderr)
+
+    def test_enters_todays_tournament(self):
+        tournament = Tournament.objects.create(date=timezone.now().date())
+
+        stdout, _ = self.seed('--count', '12', '--batch-size', '5', '--levels', '20-40', '--enter')
+
+        entries = UserTournamentGroup.objects.filter(tournament=tournament)
+        self.assertEqual(entries.count(), 12)
+        self.assertTrue(all(entry.country == entry.user.country for entry in entries.select_related('user')))
+        self.assertIn("Entered 12 users", stdout)
+
+    def test_needs_users(self):
+        with self.assertRaises(CommandError):
+            self.seed()
+
+        with self.assertRaises(CommandError):
+            self.seed('--count', '1', '--countries', 'XX')
@@ -0,0 +1,56 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from user.models import User
+
+PBKDF2_FIRST = ['user.hashers.PBKDF2PasswordHasher', 'user.hashers.ScryptPasswordHasher']
+SCRYPT_FIRST = ['user.hashers.ScryptPasswordHasher', 'user.hashers.PBKDF2PasswordHasher']
+
+
+@override_settings(PASSWORD_PBKDF2_ITERATIONS=1000, PASSWORD_SCRYPT_WORK_FACTOR=2 ** 10)
+class PasswordHashingTest(TestCase):
+    def login(self):
+        return self.client.post(reverse('token_obtain_pair'), {'username': 'test', 'password': 'testpassword'})
+
+    def create_user(self):
+        return User.objects.create_user(username='test', password='testpassword', country='TR')
+
+    @override_settings(PASSWORD_HASHERS=SCRYPT_FIRST)
+    def test_hashes_with_the_first_hasher_and_its_cost(self):
+        user = self.create_user()
+
+        self.assertTrue(user.password.startswith('scrypt$1024$'))
+        self.assertTrue(user.check_password('testpassword'))
+        self.assertFalse(user.check_password('wrongpassword'))
+
+    def test_rehashes_on_login_when_the_hasher_changes(self):
+        with override_settings(PASSWORD_HASHERS=PBKDF2_FIRST):
+            user = self.create_user()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+
+        with override_settings(PASSWORD_HASHERS=SCRYPT_FIRST):
+            self.assertEqual(self.login().status_code, 200)
+
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('scrypt$1024$'))
+
+    @override_settings(PASSWORD_HASHERS=SCRYPT_FIRST)
+    def test_rehashes_on_login_when_the_cost_changes(self):
+        user = self.create_user()
+
+        with override_settings(PASSWORD_SCRYPT_WORK_FACTOR=2 ** 11):
+            self.assertEqual(self.login().status_code, 200)
+
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('scrypt$2048$'))
+
+    @override_settings(PASSWORD_HASHERS=SCRYPT_FIRST)
+    def test_wrong_password_is_not_rehashed(self):
+        user = self.create_user()
+        password = user.password
+
+        with override_settings(PASSWORD_SCRYPT_WORK_FACTOR=2 ** 11):
+            self.assertFalse(user.check_password('wrongpassword'))
+
+        user.refresh_from_db()
+        self.assertEqual(user.password, password)
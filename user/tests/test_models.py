@@ -1,5 +1,11 @@
-from django.test import TestCase
+import threading
 
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from leaderboard.standings import country_standings
+from tournament.models import Tournament, TournamentGroup, UserTournamentGroup
 from user.models import User
 
 
@@ -58,3 +64,72 @@ class UserModelTest(TestCase):
 
         with self.assertRaises(ValueError):
             user.lose_coin(lost_coin)
+
+
+class ConcurrentProgressTest(TransactionTestCase):
+    THREAD_COUNT = 16
+    CALLS_PER_THREAD = 125
+
+    def setUp(self):
+        self.user = User.objects.create(username="testuser", country="US", coins=0, current_level=1)
+        tournament = Tournament.objects.create(date=timezone.now().date())
+        group = TournamentGroup.objects.create(tournament=tournament)
+        self.user_tournament_group = UserTournamentGroup.objects.create(user=self.user, group=group)
+
+    def tearDown(self):
+        # Written before the tables are flushed, while the tournament still exists.
+        country_standings.flush()
+
+    def _progress(self):
+        try:
+            user = User.objects.get(pk=self.user.pk)
+            user_tournament_group = UserTournamentGroup.objects.select_related('group').get(
+                pk=self.user_tournament_group.pk
+            )
+
+            for _ in range(self.CALLS_PER_THREAD):
+                user.complete_levels()
+                user_tournament_group.update_score()
+        finally:
+            connection.close()
+
+    def test_parallel_progress_keeps_every_increment(self):
+        threads = [threading.Thread(target=self._progress) for _ in range(self.THREAD_COUNT)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        calls = self.THREAD_COUNT * self.CALLS_PER_THREAD
+        self.user.refresh_from_db()
+        self.user_tournament_group.refresh_from_db()
+
+        self.assertEqual(self.user.current_level, 1 + calls)
+        self.assertEqual(self.user.coins, User.LEVEL_COMPLETE_COIN_REWARD * calls)
+        self.assertEqual(self.user_tournament_group.score, calls)
+
+    def test_parallel_lose_coin_never_overdraws(self):
+        User.objects.filter(pk=self.user.pk).update(coins=Tournament.ENTRY_FEE * 10)
+        results = []
+
+        def lose_coin():
+            try:
+                user = User.objects.get(pk=self.user.pk)
+                for _ in range(5):
+                    try:
+                        user.lose_coin(Tournament.ENTRY_FEE)
+                        results.append(True)
+                    except ValueError:
+                        results.append(False)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=lose_coin) for _ in range(self.THREAD_COUNT)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.user.refresh_from_db()
+        self.assertEqual(results.count(True), 10)
+        self.assertEqual(self.user.coins, 0)
@@ -4,7 +4,8 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from tournament.models import Tournament, UserTournamentGroup
+from GoodBlast.renderers import FastRenderingMixin
+from tournament.models import UserTournamentGroup
 from user.permissions import IsPersonalAccountOrReadOnly
 from user.serializers import UserSerializer
 from user.models import User
@@ -23,19 +24,12 @@ class UserRetrieveDestroy(RetrieveDestroyAPIView):
     lookup_field = 'username'
 
 
-class UserUpdateProgress(APIView):
+class UserUpdateProgress(FastRenderingMixin, APIView):
     permission_classes = [IsAuthenticated, IsPersonalAccountOrReadOnly, ]
 
     def post(self, request, *args, **kwargs):
         user = request.user
-        user.complete_levels()
-
-        tournament = Tournament.get_current_tournament()
-        user_group = UserTournamentGroup.objects.filter(user=user, group__tournament=tournament)
-
-        if user_group.exists():
-            user_group = user_group.first()
-            user_group.update_score()
+        UserTournamentGroup.record_progress(user)
 
         return Response({
             "coins": user.coins,